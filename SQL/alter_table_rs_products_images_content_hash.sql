@@ -0,0 +1,29 @@
+-- Hash del contenido de cada imagen (ETag de /product_images/raw/<id>)
+-- Permite responder 304 a If-None-Match sin leer image_data.
+-- Requiere PostgreSQL 11+ (función sha256); en versiones anteriores usar
+-- encode(digest(image_data, 'sha256'), 'hex') de la extensión pgcrypto.
+
+ALTER TABLE rs_products_images ADD COLUMN IF NOT EXISTS content_hash varchar(64);
+
+-- Se mantiene automáticamente al insertar o reescribir la imagen
+CREATE OR REPLACE FUNCTION rs_products_images_set_content_hash()
+RETURNS trigger AS $$
+BEGIN
+  NEW.content_hash := encode(sha256(NEW.image_data), 'hex');
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_rs_products_images_content_hash ON rs_products_images;
+CREATE TRIGGER trg_rs_products_images_content_hash
+  BEFORE INSERT OR UPDATE OF image_data ON rs_products_images
+  FOR EACH ROW EXECUTE PROCEDURE rs_products_images_set_content_hash();
+
+-- Imágenes existentes
+UPDATE rs_products_images
+SET content_hash = encode(sha256(image_data), 'hex')
+WHERE content_hash IS NULL AND image_data IS NOT NULL;
+
+-- Búsqueda de duplicados al subir una imagen (mismo producto, mismo contenido)
+CREATE INDEX IF NOT EXISTS idx_rs_products_images_content_hash
+  ON rs_products_images (product_code, content_hash);
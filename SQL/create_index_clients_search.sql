@@ -0,0 +1,21 @@
+-- Índices para la búsqueda paginada de clientes (db.search_clients, /sales/api/clients/search)
+-- La consulta filtra por client_classification y ordena por
+-- (COALESCE(description, ''), code); el índice usa la misma expresión para que el
+-- cursor (keyset) funcione con clientes sin descripción. El saldo se toma del
+-- último registro de clients_balance de cada cliente.
+
+DROP INDEX IF EXISTS idx_clients_search_page;
+CREATE INDEX IF NOT EXISTS idx_clients_search_page
+  ON clients (client_classification, (COALESCE(description, '')), code);
+
+CREATE INDEX IF NOT EXISTS idx_clients_balance_last
+  ON clients_balance (client, emission_date DESC);
+
+-- Opcional: búsqueda por texto (ILIKE '%...%') en código, nombre y RIF.
+-- Requiere la extensión pg_trgm.
+-- CREATE EXTENSION IF NOT EXISTS pg_trgm;
+-- CREATE INDEX IF NOT EXISTS idx_clients_description_trgm
+--   ON clients USING gin (description gin_trgm_ops);
+-- Solo si la tabla tiene la columna client_id (RIF/cédula):
+-- CREATE INDEX IF NOT EXISTS idx_clients_client_id_trgm
+--   ON clients USING gin (client_id gin_trgm_ops);
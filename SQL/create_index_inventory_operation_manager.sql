@@ -0,0 +1,27 @@
+-- Índices para el listado paginado del administrador de documentos (manager.document_manager)
+-- La consulta get_inventory_operations_page ordena por
+-- (COALESCE(document_no, '') DESC, correlative DESC) y filtra siempre por
+-- operation_type y wait; el resto de filtros son opcionales. El índice usa la
+-- misma expresión para que el cursor (keyset) funcione con documentos sin número.
+
+DROP INDEX IF EXISTS idx_inventory_operation_manager_page;
+CREATE INDEX IF NOT EXISTS idx_inventory_operation_manager_page
+  ON inventory_operation (operation_type, wait, (COALESCE(document_no, '')) DESC, correlative DESC);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_operation_emission_date
+  ON inventory_operation (operation_type, wait, emission_date);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_operation_store
+  ON inventory_operation (store, operation_type, wait);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_operation_destination_store
+  ON inventory_operation (destination_store, operation_type, wait);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_operation_user_code
+  ON inventory_operation (user_code, operation_type, wait);
+
+-- Opcional: búsqueda por texto (ILIKE '%...%') en documento/descripción.
+-- Requiere la extensión pg_trgm.
+-- CREATE EXTENSION IF NOT EXISTS pg_trgm;
+-- CREATE INDEX IF NOT EXISTS idx_inventory_operation_description_trgm
+--   ON inventory_operation USING gin (description gin_trgm_ops);
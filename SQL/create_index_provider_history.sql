@@ -0,0 +1,17 @@
+-- Índices para el historial por proveedor de auto_order (get_products_history_by_provider)
+-- Las cuatro consultas en lote filtran por product_code = ANY(...); la de pedidos
+-- abiertos se limita a los últimos REPOSTOCK_ORDER_HISTORY_DAYS días (180 por defecto).
+
+CREATE INDEX IF NOT EXISTS idx_products_stock_product
+  ON products_stock (product_code);
+
+CREATE INDEX IF NOT EXISTS idx_products_units_product
+  ON products_units (product_code);
+
+-- products_failures ya tiene UNIQUE (product_code, store_code)
+
+CREATE INDEX IF NOT EXISTS idx_shopping_operation_order_date
+  ON shopping_operation (operation_type, emission_date, document_no);
+
+CREATE INDEX IF NOT EXISTS idx_products_provider_product_document
+  ON products_provider (product_code, document_no);
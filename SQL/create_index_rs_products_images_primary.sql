@@ -0,0 +1,6 @@
+-- Imagen principal por producto (shoppingDb.get_primary_product_image y listado de
+-- /product_images): filtra por product_code y ordena por
+-- (is_primary DESC, created_at DESC, image_id DESC) tomando la primera fila.
+
+CREATE INDEX IF NOT EXISTS idx_rs_products_images_primary
+  ON rs_products_images (product_code, is_primary DESC, created_at DESC, image_id DESC);
@@ -0,0 +1,99 @@
+-- Última compra por proveedor y producto (historial de compras por proveedor / auto_order)
+-- get_products_history_by_provider leía la última fila de products_provider con
+-- ROW_NUMBER() OVER (PARTITION BY product_code ...) sobre toda la tabla; con esta
+-- tabla derivada la consulta es una lectura por clave.
+-- Se mantiene con triggers sobre products_provider: cada inserción/actualización
+-- solo toca su par (proveedor, producto) y un borrado recalcula ese par (upsert,
+-- seguro con escrituras concurrentes).
+
+CREATE TABLE IF NOT EXISTS rs_last_purchase
+(
+  provider_code character varying(50) NOT NULL,
+  product_code character varying(50) NOT NULL,
+  emission_date timestamp without time zone,
+  unitary_cost double precision,
+  amount double precision,
+  coin_code character varying(50),
+  document_no character varying(50),
+  CONSTRAINT rs_last_purchase_pkey PRIMARY KEY (provider_code, product_code)
+);
+
+-- Última compra de un producto con cualquier proveedor
+CREATE INDEX IF NOT EXISTS idx_rs_last_purchase_product
+  ON rs_last_purchase (product_code, emission_date DESC NULLS LAST);
+
+-- Recalcular un par a partir de products_provider
+-- Upsert en lugar de DELETE + INSERT: dos actualizaciones concurrentes del mismo
+-- par no chocan con la clave primaria (lo que abortaría la escritura en
+-- products_provider). La fila solo se elimina si el par ya no tiene compras.
+CREATE OR REPLACE FUNCTION rs_last_purchase_refresh(p_provider varchar, p_product varchar)
+RETURNS void AS $$
+BEGIN
+  INSERT INTO rs_last_purchase (provider_code, product_code, emission_date, unitary_cost, amount, coin_code, document_no)
+  SELECT provider_code, product_code, emission_date, unitary_cost, amount, coin_code, document_no
+  FROM products_provider
+  WHERE provider_code = p_provider AND product_code = p_product
+  ORDER BY emission_date DESC NULLS LAST
+  LIMIT 1
+  ON CONFLICT (provider_code, product_code) DO UPDATE
+    SET emission_date = EXCLUDED.emission_date,
+        unitary_cost = EXCLUDED.unitary_cost,
+        amount = EXCLUDED.amount,
+        coin_code = EXCLUDED.coin_code,
+        document_no = EXCLUDED.document_no;
+  IF NOT FOUND THEN
+    DELETE FROM rs_last_purchase WHERE provider_code = p_provider AND product_code = p_product;
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rs_last_purchase_on_change()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM rs_last_purchase_refresh(OLD.provider_code, OLD.product_code);
+  END IF;
+  IF TG_OP = 'DELETE' THEN
+    RETURN NULL;
+  END IF;
+  IF NEW.provider_code IS NULL OR NEW.product_code IS NULL THEN
+    RETURN NULL;
+  END IF;
+  IF TG_OP = 'INSERT' THEN
+    -- caso normal: la nueva compra es la más reciente del par
+    INSERT INTO rs_last_purchase (provider_code, product_code, emission_date, unitary_cost, amount, coin_code, document_no)
+    VALUES (NEW.provider_code, NEW.product_code, NEW.emission_date, NEW.unitary_cost, NEW.amount, NEW.coin_code, NEW.document_no)
+    ON CONFLICT (provider_code, product_code) DO UPDATE
+      SET emission_date = EXCLUDED.emission_date,
+          unitary_cost = EXCLUDED.unitary_cost,
+          amount = EXCLUDED.amount,
+          coin_code = EXCLUDED.coin_code,
+          document_no = EXCLUDED.document_no
+      WHERE rs_last_purchase.emission_date IS NULL
+         OR rs_last_purchase.emission_date <= EXCLUDED.emission_date;
+  ELSIF TG_OP = 'UPDATE'
+        AND (NEW.provider_code, NEW.product_code) IS DISTINCT FROM (OLD.provider_code, OLD.product_code) THEN
+    PERFORM rs_last_purchase_refresh(NEW.provider_code, NEW.product_code);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_rs_last_purchase ON products_provider;
+CREATE TRIGGER trg_rs_last_purchase
+  AFTER INSERT OR UPDATE OR DELETE ON products_provider
+  FOR EACH ROW EXECUTE PROCEDURE rs_last_purchase_on_change();
+
+-- Carga inicial (se puede volver a ejecutar para reconstruir la tabla)
+-- El bloqueo SHARE detiene las escrituras en products_provider (y sus triggers)
+-- hasta el COMMIT, así no chocan con la recarga.
+BEGIN;
+LOCK TABLE products_provider IN SHARE MODE;
+TRUNCATE rs_last_purchase;
+INSERT INTO rs_last_purchase (provider_code, product_code, emission_date, unitary_cost, amount, coin_code, document_no)
+SELECT DISTINCT ON (provider_code, product_code)
+  provider_code, product_code, emission_date, unitary_cost, amount, coin_code, document_no
+FROM products_provider
+WHERE provider_code IS NOT NULL AND product_code IS NOT NULL
+ORDER BY provider_code, product_code, emission_date DESC NULLS LAST;
+COMMIT;
@@ -6,12 +6,13 @@ from flask import (
     redirect,
     url_for,
     session,
+    send_file,
 )
 from flask import jsonify
 from dotenv import load_dotenv
 import os, sys
 import datetime
-import pdfkit
+import threading
 
 
 # Robust loader for .env files: intenta UTF-8, UTF-8-SIG y latin-1 como fallback.
@@ -102,14 +103,27 @@ from db import (
     get_product_price_and_unit,
     insert_product_image,
     get_product_images,
+    get_product_image_data,
+    get_product_image_meta,
+    find_product_image_by_hash,
     delete_product_image,
     login_user,
 )
 
-try:
-    import pdfkit
-except Exception:
-    pdfkit = None
+from database import reference_cache
+from permissions import can_access, user_id_from_session
+from reporting import get_metrics as get_pdf_metrics, pdf_cache
+from images import (
+    THUMB_SIZES,
+    process_upload,
+    forget_image,
+    get_thumbnail_path,
+    is_not_modified,
+    not_modified_response,
+    schedule_thumbnails,
+    send_image,
+)
+from images.primary import invalidate as invalidate_primary_image
 
 # Registrar blueprints / módulos después de tener variables de entorno y db importado
 from modules import (
@@ -124,6 +138,15 @@ from modules import (
 app = Flask(__name__, template_folder=template_folder)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "root1574**")
 
+# Sesiones del lado del servidor: la cookie solo lleva el id de sesión.
+# REPOSTOCK_SESSION_BACKEND=cookie vuelve a la sesión firmada en cookie de Flask.
+if (os.environ.get("REPOSTOCK_SESSION_BACKEND") or "sqlite").strip().lower() != "cookie":
+    try:
+        from session_store import SqliteSessionInterface
+        app.session_interface = SqliteSessionInterface()
+    except Exception as e:
+        print(f"No se pudo iniciar el almacén de sesiones ({e}); se usan sesiones en cookie")
+
 ## aqui registro todos los modulos blueprints
 # Registrar blueprint de inventory
 app.register_blueprint(inventory.inventory_bp)
@@ -140,6 +163,38 @@ app.register_blueprint(systems.systems_bp)
 #Registrar blueprint de shopping
 app.register_blueprint(shopping.shopping_bp)
 
+def _warm_reference_cache():
+    errors = reference_cache.warm()
+    if errors:
+        print("No se pudieron precargar datos de referencia:", errors)
+
+
+_warmup_lock = threading.Lock()
+_warmup_started = False
+
+
+def start_reference_warmup():
+    """Precarga los datos de referencia en segundo plano, una sola vez por proceso.
+
+    Se llama al arrancar el servidor (aquí y en service_repo_stock.py) y, si la
+    app la sirve otro WSGI, en la primera petición; importar `app` no lanza hilos.
+    """
+    global _warmup_started
+    if _warmup_started:
+        return
+    with _warmup_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+    threading.Thread(target=_warm_reference_cache, name="reference-warm", daemon=True).start()
+
+
+@app.before_request
+def _warm_reference_cache_once():
+    if not _warmup_started:
+        start_reference_warmup()
+
+
 # Protección global: redirige a login si no hay usuario en sesión.
 # Excepciones: endpoint 'login' y archivos estáticos.
 @app.before_request
@@ -155,38 +210,21 @@ def require_login():
     # permitir favicon
     if request.path.startswith("/favicon.ico"):
         return None
-    # si ya hay sesión, permitir
-    if session.get("user"):
+    # si ya hay sesión, verificar el acceso según su perfil (mapa en memoria, sin I/O)
+    user = session.get("user")
+    if user:
+        try:
+            allowed = can_access(user_id_from_session(user), ep)
+        except Exception as e:
+            # sin mapa de permisos no se puede decidir: no se concede el acceso
+            print("Error verificando permisos:", e)
+            return "No se pudieron verificar los permisos, intente de nuevo", 503
+        if not allowed:
+            return "No tiene permiso para acceder a esta opción", 403
         return None
     # de lo contrario redirigir a login con next
     return redirect(url_for("login", next=request.path))
 
-# Configuración de wkhtmltopdf (Windows):
-# - Usa variable de entorno WKHTMLTOPDF_BIN si existe
-# - Si no, intenta ruta típica por defecto en Windows
-WKHTMLTOPDF_BIN = os.environ.get("WKHTMLTOPDF_BIN")
-if not WKHTMLTOPDF_BIN:
-    # rutas típicas de instalación
-    possibles = [
-        r"C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
-        r"C:\\Program Files (x86)\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
-    ]
-    for p in possibles:
-        if os.path.exists(p):
-            WKHTMLTOPDF_BIN = p
-            break
-
-
-def get_pdfkit_config():
-    if pdfkit is None:
-        return None
-    if not WKHTMLTOPDF_BIN or not os.path.exists(WKHTMLTOPDF_BIN):
-        return None
-    try:
-        return pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_BIN)
-    except Exception:
-        return None
-
 
 @app.route("/logout")
 def logout():
@@ -203,10 +241,8 @@ def logout():
             username = user.get("code") or user.get("description")
     except Exception:
         username = None
-    # Eliminar solo la información de usuario (no tocar otras claves de sesión)
-    session.pop("user_code", None)
-    session.pop("user_description", None)
-    session.pop("user", None)
+    # descartar la sesión completa (en el servidor se elimina su fila)
+    session.clear()
     return render_template("login.html", username=username)
 
 
@@ -277,93 +313,63 @@ def upload_product_image():
         return redirect(url_for("product_images"))
     try:
         data = file.read()
-        mime_type = file.mimetype or "application/octet-stream"
-        filename = file.filename
-        size_bytes = len(data) if data else 0
+        if not data:
+            return redirect(url_for("product_images"))
+        # orientación, tamaño máximo y recompresión (pool acotado)
+        image = process_upload(data, file.mimetype)
+        if find_product_image_by_hash(product_code, image.content_hash):
+            print(f"Imagen duplicada para {product_code}; no se guarda de nuevo")
+            return redirect(url_for("product_images"))
         is_primary = True if (request.form.get("is_primary") in ("1", "true", "on")) else False
-        insert_product_image({
+        image_id = insert_product_image({
             "product_code": product_code,
-            "image_data": data,
-            "filename": filename,
-            "mime_type": mime_type,
-            "size_bytes": size_bytes,
+            "image_data": image.data,
+            "filename": image.filename(file.filename),
+            "mime_type": image.mime_type,
+            "size_bytes": image.size_bytes,
             "is_primary": is_primary,
         })
+        if image_id:
+            # miniaturas en segundo plano para los listados
+            schedule_thumbnails(image_id, image.data, image.content_hash)
+            invalidate_primary_image(product_code)
     except Exception as e:
         print("Error guardando imagen:", e)
     return redirect(url_for("product_images"))
 
 @app.route("/product_images/raw/<int:image_id>", methods=["GET"])
 def product_image_raw(image_id: int):
+    # Las imágenes se sirven tal cual están guardadas; las importadas como texto
+    # base64 se convierten una sola vez con scripts/normalize_product_images.py
     try:
-        rows = get_product_images(image_id=image_id) or []
-        img = rows[0] if rows else None
-        if not img:
+        meta = get_product_image_meta(image_id)
+        if not meta:
             return "Imagen no encontrada", 404
-        from flask import make_response
-        payload = img.get("image_data")
-        try:
-            # Asegurar tipo bytes (psycopg2 puede devolver memoryview)
-            if isinstance(payload, memoryview):
-                payload = payload.tobytes()
-        except NameError:
-            # memoryview no definido en algunos runtimes, intentar conversión directa
-            try:
-                payload = bytes(payload) if payload is not None else b""
-            except Exception:
-                payload = payload or b""
-
-        # Detección y decodificación de contenido base64 almacenado como texto en bytea
-        # Esto permite mostrar imágenes importadas erróneamente como cadena base64.
-        def _looks_like_base64(b: bytes) -> bool:
-            if not b or len(b) < 32:
-                return False
-            # Evitar datos ya binarios (cabeceras típicas de archivos de imagen)
-            if b[:2] in (b"\xFF\xD8", b"\x89P") or b[:4] in (b"GIF8", b"RIFF"):
-                return False
-            try:
-                txt = b.decode("ascii")
-            except Exception:
-                return False
-            # Solo caracteres base64 permitidos + '='
-            for ch in txt.strip():
-                if ch not in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=\n\r":
-                    return False
-            # Longitud múltiplo de 4 tras eliminar saltos
-            core = "".join([c for c in txt if c not in "\n\r"])
-            if len(core) % 4 != 0:
-                return False
-            # Debe terminar con '=', '==', o sin padding pero decodable
-            return True
+        etag = meta.get("content_hash")
+        # el cliente ya la tiene: 304 sin leer el blob
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+        row = get_product_image_data(image_id)
+        if not row:
+            return "Imagen no encontrada", 404
+        payload, mime_type = row
+        return send_image(payload, mime_type, etag)
+    except Exception as e:
+        return f"Error obteniendo imagen: {e}", 500
 
-        if isinstance(payload, bytes) and _looks_like_base64(payload):
-            import base64
-            # Normalizar: quitar saltos de línea
-            cleaned = b"".join(line for line in payload.splitlines())
-            try:
-                decoded = base64.b64decode(cleaned, validate=False)
-                # Heurística de tipo MIME si el existente es genérico
-                mime = (img.get("mime_type") or "application/octet-stream").lower()
-                if mime in ("text/plain", "application/octet-stream", "binary/octet-stream"):
-                    if decoded.startswith(b"\xFF\xD8\xFF"):
-                        mime = "image/jpeg"
-                    elif decoded.startswith(b"\x89PNG\r\n\x1a\n"):
-                        mime = "image/png"
-                    elif decoded.startswith(b"GIF89a") or decoded.startswith(b"GIF87a"):
-                        mime = "image/gif"
-                    elif decoded.startswith(b"RIFF") and b"WEBP" in decoded[:32]:
-                        mime = "image/webp"
-                payload = decoded
-                img["mime_type"] = mime
-            except Exception as e:
-                print(f"Fallo al decodificar base64 imagen_id={image_id}: {e}")
 
-        resp = make_response(payload or b"")
-        resp.headers["Content-Type"] = img.get("mime_type") or "image/jpeg"
-        resp.headers["Cache-Control"] = "public, max-age=86400"
-        return resp
+@app.route("/product_images/thumb/<int:image_id>/<size>", methods=["GET"])
+def product_image_thumb(image_id: int, size: str):
+    """Miniatura desde la caché en disco; solo consulta la base de datos si falta."""
+    if size not in THUMB_SIZES:
+        return "Tamaño no válido", 404
+    try:
+        path = get_thumbnail_path(image_id, size, get_product_image_data)
     except Exception as e:
-        return f"Error obteniendo imagen: {e}", 500
+        return f"Error obteniendo miniatura: {e}", 500
+    if not path:
+        return "Imagen no encontrada", 404
+    return send_file(path, max_age=86400)
 
 
 @app.route("/product_images/delete", methods=["POST"])
@@ -399,7 +405,10 @@ def delete_product_images_route():
     errors = []
     for image_id in ids:
         try:
-            delete_product_image(image_id)
+            product_code = delete_product_image(image_id)
+            forget_image(image_id)
+            if product_code:
+                invalidate_primary_image(product_code)
             deleted.append(image_id)
         except Exception as e:
             errors.append({"id": image_id, "error": str(e)})
@@ -409,6 +418,25 @@ def delete_product_images_route():
     return redirect(url_for("product_images"))
 
 
+@app.route("/api/pdf/metrics", methods=["GET"])
+def api_pdf_metrics():
+    """Métricas del renderizador de PDF (cola, tiempos, rechazos y timeouts) y de la caché."""
+    return jsonify({"ok": True, "metrics": get_pdf_metrics(), "cache": pdf_cache.stats()})
+
+
+@app.route("/api/reference_cache", methods=["GET", "POST"])
+def api_reference_cache():
+    """GET: edad y contadores de los datos de referencia en caché.
+    POST: invalida uno (`name`) o todos para que se recarguen."""
+    if request.method == "POST":
+        data = request.get_json(silent=True) or request.form
+        name = (data.get("name") or "").strip() or None
+        if name and name not in reference_cache.stats():
+            return jsonify({"ok": False, "error": f"Conjunto desconocido: {name}"}), 400
+        reference_cache.invalidate(name)
+    return jsonify({"ok": True, "datasets": reference_cache.stats()})
+
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "GET":
@@ -423,6 +451,9 @@ def login():
     session["user"] = user
     if user:
         try:
+            # id de sesión nuevo al autenticarse (evita fijación de sesión)
+            if hasattr(session, "regenerate"):
+                session.regenerate()
             # Almacenar información mínima del usuario en sesión
             session.permanent = True
             session["user"] = user
@@ -443,6 +474,8 @@ def login():
     return render_template("login.html", error="usuario o contraseña incorrectos", user_code=user_code)
 
 
+
+
 if __name__ == "__main__":
     # app.run(debug=True, host="127.0.0.1", port=os.environ.get("APP_PORT", 5002))
 #    Servidor WSGI de producción (waitress) si está disponible; si no, fallback a Flask
@@ -452,6 +485,9 @@ if __name__ == "__main__":
     except Exception:
         port = 5001
 
+    # precarga en segundo plano para no demorar el arranque si la base de datos tarda
+    start_reference_warmup()
+
     use_waitress = str(os.environ.get("REPOSTOCK_USE_WAITRESS", "1")).lower() in ("1", "true", "yes", "y")
     if use_waitress:
         try:
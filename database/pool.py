@@ -0,0 +1,153 @@
+"""Pool de conexiones PostgreSQL y ejecución concurrente de consultas independientes.
+
+Abrir una conexión psycopg2 por consulta cuesta un handshake completo. Para las
+pantallas que lanzan varias consultas en lote independientes (p. ej. el
+historial por proveedor de auto_order) se usa un ThreadedConnectionPool
+compartido y se ejecutan en paralelo, de modo que la respuesta tarda lo que la
+consulta más lenta y no la suma de todas.
+
+- REPOSTOCK_DB_POOL_MIN / REPOSTOCK_DB_POOL_MAX: conexiones del pool (1 / 8).
+  El máximo nunca es menor que REPOSTOCK_DB_FANOUT_WORKERS.
+- REPOSTOCK_DB_FANOUT_WORKERS: hilos para run_parallel (por defecto 4).
+
+Si todas las conexiones del pool están prestadas, pooled_connection espera a
+que se devuelva una en lugar de fallar con PoolError.
+
+Con DB_ENGINE=sqlite no hay pool: run_parallel ejecuta las tareas en orden con
+una conexión normal.
+
+Uso:
+    from database import pool
+    results = pool.run_parallel({
+        "stocks": lambda conn: ...,
+        "units": lambda conn: ...,
+    })
+"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from .connection import DB_ENGINE, close_connection, get_connection
+
+POOL_MIN = int(os.environ.get("REPOSTOCK_DB_POOL_MIN", "1"))
+POOL_MAX = int(os.environ.get("REPOSTOCK_DB_POOL_MAX", "8"))
+FANOUT_WORKERS = int(os.environ.get("REPOSTOCK_DB_FANOUT_WORKERS", "4"))
+# cada hilo de run_parallel necesita su conexión
+POOL_SIZE = max(1, POOL_MIN, POOL_MAX, FANOUT_WORKERS)
+
+_lock = threading.Lock()
+_pool = None
+# cupos de conexión: getconn lanza PoolError si el pool está agotado
+_slots = threading.BoundedSemaphore(POOL_SIZE)
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _use_pool() -> bool:
+    return DB_ENGINE not in ("sqlite", "sqlite3")
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                from psycopg2.pool import ThreadedConnectionPool
+
+                import db
+
+                _pool = ThreadedConnectionPool(
+                    min(POOL_MIN, POOL_SIZE), POOL_SIZE, **db.DB_CONFIG, options="-c client_encoding=UTF8"
+                )
+    return _pool
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, FANOUT_WORKERS), thread_name_prefix="db-fanout")
+    return _executor
+
+
+@contextmanager
+def pooled_connection() -> Iterator[Any]:
+    """Conexión prestada del pool; se devuelve al salir (descartada si quedó rota).
+
+    Si el pool está agotado espera a que otra petición devuelva una conexión.
+    """
+    if not _use_pool():
+        conn = get_connection()
+        try:
+            yield conn
+        finally:
+            close_connection(conn)
+        return
+
+    pool = _get_pool()
+    _slots.acquire()
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _slots.release()
+        raise
+    broken = False
+    try:
+        yield conn
+    except Exception:
+        broken = bool(getattr(conn, "closed", 0))
+        raise
+    finally:
+        try:
+            if not broken and not conn.closed:
+                # no devolver transacciones abiertas al pool
+                conn.rollback()
+        except Exception:
+            broken = True
+        try:
+            pool.putconn(conn, close=broken or bool(conn.closed))
+        finally:
+            _slots.release()
+
+
+def run_parallel(tasks: dict[str, Callable[[Any], Any]]) -> dict[str, Any]:
+    """Ejecuta cada tarea `fn(conn)` con su propia conexión del pool, en paralelo.
+
+    Retorna {nombre: resultado}. Si una tarea falla se propaga su excepción
+    (después de esperar a las demás para no dejar conexiones prestadas).
+    """
+    def call(fn):
+        with pooled_connection() as conn:
+            return fn(conn)
+
+    if not _use_pool() or len(tasks) <= 1:
+        return {name: call(fn) for name, fn in tasks.items()}
+
+    executor = _get_executor()
+    futures = {name: executor.submit(call, fn) for name, fn in tasks.items()}
+    results, error = {}, None
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            if error is None:
+                error = e
+    if error is not None:
+        raise error
+    return results
+
+
+def close_pool() -> None:
+    """Cierra todas las conexiones del pool (al detener la aplicación)."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+__all__ = ["pooled_connection", "run_parallel", "close_pool", "POOL_MIN", "POOL_MAX", "POOL_SIZE", "FANOUT_WORKERS"]
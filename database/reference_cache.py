@@ -0,0 +1,204 @@
+"""Caché en memoria de datos de referencia (tablas pequeñas que casi no cambian).
+
+Depósitos, departamentos, marcas, monedas, unidades y propiedades del sistema
+se consultaban en cada página. Aquí se cargan una vez y se reutilizan durante
+REPOSTOCK_REFERENCE_TTL segundos (por defecto 300); `invalidate()` fuerza la
+recarga y `warm()` los precarga al iniciar la app.
+
+Cada consulta retorna copias, así quien modifique la lista no altera la caché.
+Si la recarga falla y hay datos anteriores se siguen usando (y se reintenta en
+la próxima petición).
+
+Uso:
+    from database import reference_cache
+    stores = reference_cache.get_stores()
+    store = reference_cache.get_store("01")
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+REFERENCE_TTL = float(os.environ.get("REPOSTOCK_REFERENCE_TTL", "300"))
+
+DEFAULT_COIN_PROPERTY = 65
+DEFAULT_COIN = "02"
+
+
+def _query_all(sql: str) -> list[dict]:
+    # importación diferida: database.connection importa db.py, que usa este módulo
+    from .connection import close_connection, get_connection
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql)
+        columns = [desc[0] for desc in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        close_connection(conn)
+
+
+def _load_system_properties() -> dict:
+    rows = _query_all("SELECT code, system_value FROM system_properties")
+    return {str(r["code"]): r["system_value"] for r in rows}
+
+
+_LOADERS: dict[str, Callable[[], Any]] = {
+    "stores": lambda: _query_all("SELECT * FROM store ORDER BY code"),
+    "departments": lambda: _query_all("SELECT * FROM department ORDER BY code"),
+    "marks": lambda: _query_all("SELECT * FROM marks ORDER BY code"),
+    "coins": lambda: _query_all("SELECT * FROM coin ORDER BY code"),
+    "units": lambda: _query_all("SELECT * FROM units ORDER BY code"),
+    "system_properties": _load_system_properties,
+}
+
+_lock = threading.Lock()
+_load_locks = {name: threading.Lock() for name in _LOADERS}
+# nombre -> (momento de carga (time.time), valor)
+_entries: dict[str, tuple[float, Any]] = {}
+_stats = {name: {"hits": 0, "loads": 0, "errors": 0} for name in _LOADERS}
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, list):
+        return [dict(v) if isinstance(v, dict) else v for v in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def _fresh(name: str) -> Optional[tuple[float, Any]]:
+    entry = _entries.get(name)
+    if entry and time.time() - entry[0] < REFERENCE_TTL:
+        return entry
+    return None
+
+
+def get_reference(name: str) -> Any:
+    """Retorna (una copia de) el conjunto `name`, cargándolo si venció."""
+    if name not in _LOADERS:
+        raise KeyError(f"Datos de referencia desconocidos: {name}")
+    with _lock:
+        entry = _fresh(name)
+        if entry:
+            _stats[name]["hits"] += 1
+            return _copy(entry[1])
+    # una sola carga a la vez por conjunto; las demás peticiones esperan el resultado
+    with _load_locks[name]:
+        with _lock:
+            entry = _fresh(name)
+            if entry:
+                _stats[name]["hits"] += 1
+                return _copy(entry[1])
+        try:
+            value = _LOADERS[name]()
+        except Exception as e:
+            with _lock:
+                _stats[name]["errors"] += 1
+                stale = _entries.get(name)
+            if stale is None:
+                raise
+            print(f"Error recargando datos de referencia '{name}', se usan los anteriores: {e}")
+            return _copy(stale[1])
+        with _lock:
+            _entries[name] = (time.time(), value)
+            _stats[name]["loads"] += 1
+        return _copy(value)
+
+
+def invalidate(name: Optional[str] = None) -> None:
+    """Descarta un conjunto (o todos) para que se recargue en la próxima consulta."""
+    with _lock:
+        if name is None:
+            _entries.clear()
+        else:
+            _entries.pop(name, None)
+
+
+def warm(names: Optional[Iterable[str]] = None) -> dict[str, str]:
+    """Precarga los conjuntos indicados (todos por defecto). Retorna los errores por nombre."""
+    errors = {}
+    for name in names or _LOADERS:
+        try:
+            invalidate(name)
+            get_reference(name)
+        except Exception as e:
+            errors[name] = str(e)
+    return errors
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    """Edad (segundos), tamaño y contadores de cada conjunto."""
+    now = time.time()
+    with _lock:
+        result = {}
+        for name in _LOADERS:
+            entry = _entries.get(name)
+            data = dict(_stats[name])
+            data["age_seconds"] = round(now - entry[0], 1) if entry else None
+            data["size"] = len(entry[1]) if entry else 0
+            data["ttl_seconds"] = REFERENCE_TTL
+            result[name] = data
+        return result
+
+
+# --- accesos directos ---
+
+def get_stores() -> list[dict]:
+    return get_reference("stores")
+
+
+def get_store(code: Optional[str]) -> Optional[dict]:
+    """Depósito por código (sin consultar la base de datos si está en caché)."""
+    if code is None:
+        return None
+    code = str(code).strip()
+    for store in get_reference("stores"):
+        if str(store.get("code")).strip() == code:
+            return store
+    return None
+
+
+def get_departments() -> list[dict]:
+    return get_reference("departments")
+
+
+def get_marks() -> list[dict]:
+    return get_reference("marks")
+
+
+def get_coins() -> list[dict]:
+    return get_reference("coins")
+
+
+def get_units() -> list[dict]:
+    return get_reference("units")
+
+
+def get_system_property(code: Any, default: Any = None) -> Any:
+    return get_reference("system_properties").get(str(code), default)
+
+
+def get_default_coin() -> str:
+    """Moneda por defecto (propiedad del sistema 65), '02' si no está definida."""
+    return get_system_property(DEFAULT_COIN_PROPERTY) or DEFAULT_COIN
+
+
+__all__ = [
+    "REFERENCE_TTL",
+    "get_reference",
+    "invalidate",
+    "warm",
+    "stats",
+    "get_stores",
+    "get_store",
+    "get_departments",
+    "get_marks",
+    "get_coins",
+    "get_units",
+    "get_system_property",
+    "get_default_coin",
+]
@@ -6,6 +6,8 @@ import decimal
 import datetime
 from dotenv import load_dotenv
 
+from database import reference_cache
+
 base_path = os.path.abspath(os.path.dirname(__file__))
 env_path = os.path.join(base_path, ".env")
 load_dotenv(env_path)
@@ -90,120 +92,59 @@ def login_user(code: str, password: str):
         
 
 def get_stores():
-    """Obtiene la lista de depositos de la base de datos."""
-    conn = get_db_connection()
-    try:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT * FROM store")
-            rows = cur.fetchall()
+    """Obtiene la lista de depositos (desde la caché de referencia)."""
+    rows = reference_cache.get_stores()
+
+    # serializar tipos no nativos de JSON (Decimal, datetime)
+    def _serialize_row(r):
+        return {
+            k: (
+                float(v)
+                if isinstance(v, decimal.Decimal)
+                else (
+                    v.isoformat()
+                    if isinstance(v, (datetime.date, datetime.datetime))
+                    else v
+                )
+            )
+            for k, v in r.items()
+        }
 
-            # serializar tipos no nativos de JSON (Decimal, datetime)
-            def _serialize_row(r):
-                return {
-                    k: (
-                        float(v)
-                        if isinstance(v, decimal.Decimal)
-                        else (
-                            v.isoformat()
-                            if isinstance(v, (datetime.date, datetime.datetime))
-                            else v
-                        )
-                    )
-                    for k, v in r.items()
-                }
-
-            return [_serialize_row(r) for r in rows]
-    finally:
-        close_db_connection(conn)
+    return [_serialize_row(r) for r in rows]
 
 
 def get_store_by_code(store_code):
-    """Obtiene la información de un deposito por su código."""
-    conn = get_db_connection()
-    try:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT * FROM store WHERE code = %s", (store_code,))
-            row = cur.fetchone()
-            if row:
-                # serializar tipos no nativos de JSON (Decimal, datetime)
-                def _serialize_row(r):
-                    return {
-                        k: (
-                            float(v)
-                            if isinstance(v, decimal.Decimal)
-                            else (
-                                v.isoformat()
-                                if isinstance(v, (datetime.date, datetime.datetime))
-                                else v
-                            )
-                        )
-                        for k, v in r.items()
-                    }
+    """Obtiene la información de un deposito por su código (desde la caché de referencia)."""
+    row = reference_cache.get_store(store_code)
+    if row:
+        # serializar tipos no nativos de JSON (Decimal, datetime)
+        def _serialize_row(r):
+            return {
+                k: (
+                    float(v)
+                    if isinstance(v, decimal.Decimal)
+                    else (
+                        v.isoformat()
+                        if isinstance(v, (datetime.date, datetime.datetime))
+                        else v
+                    )
+                )
+                for k, v in r.items()
+            }
 
-                return _serialize_row(row)
-            return None
-    finally:
-        close_db_connection(conn)
+        return _serialize_row(row)
+    return None
 
 
 def get_coins():
     """Obtiene la lista de monedas desde la tabla coin.
 
-    Retorna una lista de dicts con claves: code, description.
-    Serializa tipos Decimal y fechas si aparecen.
+    Retorna una lista de dicts con claves: code, description (desde la caché de referencia).
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT code, description FROM coin")
-            rows = cur.fetchall()
-
-            def _serialize_row(r):
-                return {
-                    k: (
-                        float(v)
-                        if isinstance(v, decimal.Decimal)
-                        else (
-                            v.isoformat()
-                            if isinstance(v, (datetime.date, datetime.datetime))
-                            else v
-                        )
-                    )
-                    for k, v in r.items()
-                }
-
-            return [_serialize_row(r) for r in rows]
-    finally:
-        close_db_connection(conn)
-
-
-def get_store_by_code(store_code):
-    """Obtiene la información de un deposito por su código."""
-    conn = get_db_connection()
-    try:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT * FROM store WHERE code = %s", (store_code,))
-            row = cur.fetchone()
-            if row:
-                # serializar tipos no nativos de JSON (Decimal, datetime)
-                def _serialize_row(r):
-                    return {
-                        k: (
-                            float(v)
-                            if isinstance(v, decimal.Decimal)
-                            else (
-                                v.isoformat()
-                                if isinstance(v, (datetime.date, datetime.datetime))
-                                else v
-                            )
-                        )
-                        for k, v in r.items()
-                    }
-
-                return _serialize_row(row)
-            return None
-    finally:
-        close_db_connection(conn)
+    return [
+        {"code": r.get("code"), "description": r.get("description")}
+        for r in reference_cache.get_coins()
+    ]
 
 
 def search_product_failure(code_product, store_code):
@@ -293,85 +234,31 @@ def search_product(code_product):
         close_db_connection(conn)
 
 
-def search_products_for_sales():
-    """Busca todos los productos disponibles en la base de datos.
+def search_products_for_sales(coin: str = None):
+    """Productos activos con sus precios de venta en `coin` y el stock total.
 
-    Retorna una lista de dicts con las claves:
-      - code (código principal)
-      - description
-      - unit_description (si existe unidad principal)
-      - unit_correlative (correlativo de la unidad principal, si existe)
+    Los precios salen de la lista de precios en memoria
+    (modules.sales.services.priceList); aquí solo se consulta el stock.
+    Retorna una lista de dicts con code, description, mark, model,
+    unit_description, unit_correlative, offer_price, minimum_price,
+    higher_price, maximum_price, net_price, coin y stock.
     """
+    from modules.sales.services import priceList
 
-    sql = """
-        SELECT
-        p.code,
-        p.description,
-        p.mark,
-        p.model,
-        -- Precios (se mantienen sin cambios importantes)
-        pu.offer_price * pc.sales_aliquot * 1.16 AS offer_price_01,
-        pu.higher_price * 1.16 AS higher_price_01,
-        pu.minimum_price * 1.16 AS minimum_price_01,
-        
-        -- Precios con conversión/impuestos (se mantiene la lógica original)
-        -- NOTA: El sub-select es necesario para el convert_value_to_coin
-        CASE
-            WHEN p.extract_net_from_unit_price_plus_tax THEN
-                (SELECT convert_value_to_coin(
-                    p.coin,
-                    '<P_COIN>',
-                    ROUND(CAST((pu.offer_price + (pu.offer_price * t.aliquot / 100)) AS NUMERIC), p.rounding_type),
-                    'SALES',
-                        TRUE
-                    ))
-                ELSE
-                    (SELECT convert_value_to_coin(
-                        p.coin,
-                        '<P_COIN>',
-                        pu.offer_price + (pu.offer_price * t.aliquot / 100),
-                        'SALES',
-                        TRUE
-                    ))
-            END AS offer_price,
-            SUM(ps.stock) AS stock            
-        FROM products p
-        JOIN products_units pu ON (pu.product_code = p.code)
-        -- LEFT JOIN es clave para incluir productos sin stock, pero que cumplen las condiciones de WHERE
-        LEFT JOIN products_stock ps ON (p.code = ps.product_code)
-        JOIN coin pc ON (p.coin = pc.code)
-        JOIN taxes t ON (t.code = p.sale_tax)
-
-        WHERE
-            pu.main_unit
-            AND p.code <> 'SERVGAST'
-            AND p.status = '01'
-            OR p.product_type = 'S'
-
-        GROUP BY
-            p.code,
-            pc.code,
-            p.description,
-            p.mark,
-            p.model,
-            pu.offer_price,
-            offer_price_01,
-            higher_price_01,
-            minimum_price_01,
-            t.aliquot
-            
-        ORDER BY
-            p.description
-    """
+    price_list = priceList.get_price_list(coin)
     conn = get_db_connection()
-
     try:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql)
-            rows = cur.fetchall()
-            return [dict(r) for r in rows]
+        with conn.cursor() as cur:
+            cur.execute("SELECT product_code, SUM(stock) FROM products_stock GROUP BY product_code")
+            stock = {str(code).strip(): float(total or 0) for code, total in cur.fetchall()}
     finally:
         close_db_connection(conn)
+    result = []
+    for code, entry in price_list.entries.items():
+        item = dict(entry)
+        item["stock"] = stock.get(code, 0.0)
+        result.append(item)
+    return result
 
 
 def save_product_failure(data):
@@ -737,35 +624,6 @@ def save_transfer_order_items(order_id, items):
         close_db_connection(conn)
 
 
-def get_store_by_code(store_code):
-    """Obtiene la información de un deposito por su código."""
-    conn = get_db_connection()
-    try:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("SELECT * FROM store WHERE code = %s", (store_code,))
-            row = cur.fetchone()
-            if row:
-                # serializar tipos no nativos de JSON (Decimal, datetime)
-                def _serialize_row(r):
-                    return {
-                        k: (
-                            float(v)
-                            if isinstance(v, decimal.Decimal)
-                            else (
-                                v.isoformat()
-                                if isinstance(v, (datetime.date, datetime.datetime))
-                                else v
-                            )
-                        )
-                        for k, v in r.items()
-                    }
-
-                return _serialize_row(row)
-            return None
-    finally:
-        close_db_connection(conn)
-
-
 def get_inventory_operations_by_correlative(
     correlative: int, operation_type: str, wait: bool = True
 ):
@@ -862,6 +720,114 @@ def get_inventory_operations(wait: bool = True, operation_type: str = "TRANSFER"
         close_db_connection(conn)
 
 
+def get_inventory_operations_page(
+    wait: bool = True,
+    operation_type: str = "TRANSFER",
+    limit: int = 50,
+    after_document_no: str = None,
+    after_correlative: int = None,
+    date_from=None,
+    date_to=None,
+    store: str = None,
+    destination_store: str = None,
+    user_code: str = None,
+    q: str = None,
+):
+    """Obtiene una página de operaciones de inventario ordenadas por documento (keyset).
+
+    Usa el par (document_no, correlative) de la última fila recibida como cursor
+    en lugar de OFFSET, así el costo por página no depende del tamaño del historial.
+    Un document_no NULL se ordena y se compara como '' (el cursor lo trae así).
+    Los filtros (fechas, depósitos, usuario y texto en documento/descripción) se
+    aplican en SQL. Ver SQL/create_index_inventory_operation_manager.sql.
+
+    Retorna un dict con:
+      - items: lista de operaciones (mismo formato que get_inventory_operations)
+      - next_cursor: {"document_no", "correlative"} para pedir la siguiente página, o None
+    """
+    try:
+        limit = max(1, min(int(limit or 50), 500))
+    except (TypeError, ValueError):
+        limit = 50
+
+    where = ["io.wait = %s", "io.operation_type = %s"]
+    params = [wait, operation_type]
+    if date_from:
+        where.append("io.emission_date >= %s")
+        params.append(date_from)
+    if date_to:
+        where.append("io.emission_date < (%s::date + 1)")
+        params.append(date_to)
+    if store:
+        where.append("io.store = %s")
+        params.append(store)
+    if destination_store:
+        where.append("io.destination_store = %s")
+        params.append(destination_store)
+    if user_code:
+        where.append("io.user_code = %s")
+        params.append(user_code)
+    if q:
+        where.append("(io.document_no ILIKE %s OR io.description ILIKE %s)")
+        like = f"%{q}%"
+        params.extend([like, like])
+    if after_document_no is not None and after_correlative is not None:
+        where.append("(COALESCE(io.document_no, ''), io.correlative) < (%s, %s)")
+        params.extend([after_document_no, after_correlative])
+
+    sql = f"""
+        SELECT
+            io.*,
+            s_origin.description AS origin_store_description,
+            s_destination.description AS destination_store_description
+        FROM
+            inventory_operation AS io
+        LEFT JOIN
+            store AS s_origin ON io.store = s_origin.code
+        LEFT JOIN
+            store AS s_destination ON io.destination_Store = s_destination.code
+        WHERE
+            {" AND ".join(where)}
+        ORDER BY COALESCE(io.document_no, '') DESC, io.correlative DESC
+        LIMIT %s;
+    """
+    # se pide una fila de más para saber si existe una página siguiente
+    params.append(limit + 1)
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+
+            # serializar tipos no nativos de JSON (Decimal, datetime)
+            def _serialize_row(r):
+                return {
+                    k: (
+                        float(v)
+                        if isinstance(v, decimal.Decimal)
+                        else (
+                            v.isoformat()
+                            if isinstance(v, (datetime.date, datetime.datetime))
+                            else v
+                        )
+                    )
+                    for k, v in r.items()
+                }
+
+            items = [_serialize_row(r) for r in rows[:limit]]
+            next_cursor = None
+            if len(rows) > limit and items:
+                last = items[-1]
+                next_cursor = {
+                    "document_no": last.get("document_no") or "",
+                    "correlative": last.get("correlative"),
+                }
+            return {"items": items, "next_cursor": next_cursor}
+    finally:
+        close_db_connection(conn)
+
+
 # para eliminar operaciones de inventario por su codigo correlativo
 def delete_inventory_operation_by_correlative(correlative: int):
     """Elimina una operación de inventario y sus detalles por correlativo.
@@ -943,6 +909,89 @@ def get_inventory_operations_details_by_correlative(
         close_db_connection(conn)
 
 
+def get_inventory_operations_for_print(
+    correlatives, operation_type: str = "TRANSFER", wait: bool = True
+):
+    """Obtiene encabezados y detalles de varias operaciones para imprimir en lote.
+
+    Usa dos consultas (encabezados y detalles) con correlative = ANY(...) en una
+    sola conexión, en lugar de dos consultas por orden. El detalle trae la
+    ubicación del depósito de origen de cada orden, igual que la vista previa.
+
+    Retorna una lista de dicts {"header": {...}, "details": [...]} en el orden
+    de los correlativos recibidos (se omiten los que no existen).
+    """
+    correlatives = _normalize_correlatives(correlatives)
+    if not correlatives:
+        return []
+    sql_headers = """
+        SELECT
+            io.*,
+            u.description as  user_description,
+            s_origin.description AS origin_store_description,
+            s_destination.description AS destination_store_description
+        FROM
+            inventory_operation AS io
+        LEFT JOIN
+            store AS s_origin ON io.store = s_origin.code
+        LEFT JOIN
+            store AS s_destination ON io.destination_Store = s_destination.code
+        LEFT JOIN
+            users as u on (u.code = io.user_code )
+        WHERE
+            io.correlative = ANY(%s::int[])
+            AND io.operation_type = %s
+            AND io.wait = %s;
+    """
+    sql_details = """
+        SELECT
+            iod.*,
+            u.description AS unit_description,
+            pf.location
+        FROM inventory_operation_details AS iod
+        JOIN inventory_operation AS io
+            ON io.correlative = iod.main_correlative
+        LEFT JOIN products_failures AS pf
+            ON iod.code_product = pf.product_code
+           AND pf.store_code = COALESCE(io.store, iod.destination_store)
+        LEFT JOIN products_units AS pu
+            ON iod.unit = pu.correlative
+        LEFT JOIN units AS u
+            ON u.code = pu.unit
+        WHERE iod.main_correlative = ANY(%s::int[])
+        ORDER BY iod.main_correlative, pf.location NULLS LAST, iod.line NULLS LAST;
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            # serializar tipos no nativos de JSON (Decimal, datetime)
+            def _serialize_row(r):
+                return {
+                    k: (
+                        float(v)
+                        if isinstance(v, decimal.Decimal)
+                        else (
+                            v.isoformat()
+                            if isinstance(v, (datetime.date, datetime.datetime))
+                            else v
+                        )
+                    )
+                    for k, v in r.items()
+                }
+
+            cur.execute(sql_headers, (correlatives, operation_type, wait))
+            headers = {r["correlative"]: _serialize_row(r) for r in cur.fetchall()}
+            found = [c for c in correlatives if c in headers]
+            details = {c: [] for c in found}
+            if found:
+                cur.execute(sql_details, (found,))
+                for r in cur.fetchall():
+                    details[r["main_correlative"]].append(_serialize_row(r))
+            return [{"header": headers[c], "details": details[c]} for c in found]
+    finally:
+        close_db_connection(conn)
+
+
 def update_inventory_operation_detail_amount(
     main_correlative: int, code_product: str, amount: float
 ) -> int:
@@ -1047,6 +1096,166 @@ def update_inventory_operation_type(
         close_db_connection(conn)
 
 
+def _normalize_correlatives(correlatives):
+    """Convierte una lista de correlativos a enteros únicos, descartando vacíos/no numéricos."""
+    result = []
+    seen = set()
+    for c in correlatives or []:
+        try:
+            value = int(c)
+        except (TypeError, ValueError):
+            continue
+        if value not in seen:
+            seen.add(value)
+            result.append(value)
+    return result
+
+
+def _count_inventory_operations(cur, correlatives, wait, operation_type):
+    cur.execute(
+        """
+        SELECT COUNT(*)
+        FROM inventory_operation
+        WHERE correlative = ANY(%s::int[])
+          AND wait = %s
+          AND operation_type = %s;
+        """,
+        (correlatives, wait, operation_type),
+    )
+    return cur.fetchone()[0]
+
+
+def delete_inventory_operations_by_correlatives(
+    correlatives, wait: bool = True, operation_type: str = "TRANSFER", dry_run: bool = False
+):
+    """Elimina en bloque operaciones de inventario (encabezado y detalles) por correlativos.
+
+    Solo afecta operaciones con el wait/operation_type indicados. Encabezados y
+    detalles se eliminan en una sola sentencia (CTE) dentro de una transacción.
+    Con dry_run=True no modifica nada y retorna cuántas operaciones se eliminarían.
+    Retorna la cantidad de operaciones (encabezados) afectadas.
+    """
+    correlatives = _normalize_correlatives(correlatives)
+    if not correlatives:
+        return 0
+    sql = """
+        WITH target AS (
+            SELECT correlative
+            FROM inventory_operation
+            WHERE correlative = ANY(%s::int[])
+              AND wait = %s
+              AND operation_type = %s
+            FOR UPDATE
+        ),
+        deleted_details AS (
+            DELETE FROM inventory_operation_details
+            WHERE main_correlative IN (SELECT correlative FROM target)
+        ),
+        deleted AS (
+            DELETE FROM inventory_operation
+            WHERE correlative IN (SELECT correlative FROM target)
+            RETURNING correlative
+        )
+        SELECT COUNT(*) FROM deleted;
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            if dry_run:
+                return _count_inventory_operations(cur, correlatives, wait, operation_type)
+            cur.execute(sql, (correlatives, wait, operation_type))
+            affected = cur.fetchone()[0]
+        conn.commit()
+        return affected
+    except Exception as e:
+        print(f"Error al eliminar operaciones de inventario en bloque: {e}")
+        conn.rollback()
+        raise
+    finally:
+        close_db_connection(conn)
+
+
+def update_inventory_operations_type_by_correlatives(
+    correlatives,
+    new_operation_type: str,
+    description: str = None,
+    wait: bool = True,
+    operation_type: str = "TRANSFER",
+    dry_run: bool = False,
+):
+    """Cambia en bloque el operation_type de varias operaciones de inventario.
+
+    Si description es None se conserva la descripción actual de cada operación.
+    Con dry_run=True solo retorna cuántas operaciones se actualizarían.
+    """
+    correlatives = _normalize_correlatives(correlatives)
+    if not correlatives:
+        return 0
+    sql = """
+        UPDATE inventory_operation
+        SET operation_type = %s,
+            description = COALESCE(%s, description)
+        WHERE correlative = ANY(%s::int[])
+          AND wait = %s
+          AND operation_type = %s;
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            if dry_run:
+                return _count_inventory_operations(cur, correlatives, wait, operation_type)
+            cur.execute(
+                sql, (new_operation_type, description, correlatives, wait, operation_type)
+            )
+            affected = cur.rowcount
+        conn.commit()
+        return affected
+    except Exception as e:
+        print(f"Error actualizando operation_type en bloque: {e}")
+        conn.rollback()
+        raise
+    finally:
+        close_db_connection(conn)
+
+
+def update_description_inventory_operations_by_correlatives(
+    correlatives,
+    description: str,
+    wait: bool = True,
+    operation_type: str = "TRANSFER",
+    dry_run: bool = False,
+):
+    """Actualiza en bloque la descripción de varias operaciones de inventario.
+
+    Con dry_run=True solo retorna cuántas operaciones se actualizarían.
+    """
+    correlatives = _normalize_correlatives(correlatives)
+    if not correlatives:
+        return 0
+    sql = """
+        UPDATE inventory_operation
+        SET description = %s
+        WHERE correlative = ANY(%s::int[])
+          AND wait = %s
+          AND operation_type = %s;
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            if dry_run:
+                return _count_inventory_operations(cur, correlatives, wait, operation_type)
+            cur.execute(sql, (description, correlatives, wait, operation_type))
+            affected = cur.rowcount
+        conn.commit()
+        return affected
+    except Exception as e:
+        print(f"Error al actualizar la descripción en bloque: {e}")
+        conn.rollback()
+        raise
+    finally:
+        close_db_connection(conn)
+
+
 def search_product(code: str):
     """Busca un producto por código alterno (other_code) y devuelve datos principales.
 
@@ -1386,6 +1595,140 @@ def get_product_price_and_unit(product_code: str):
         close_db_connection(conn)
 
 
+def _serialize_client(r):
+    # serializar tipos no nativos de JSON (Decimal, datetime)
+    return {
+        k: (
+            float(v)
+            if isinstance(v, decimal.Decimal)
+            else (
+                v.isoformat()
+                if isinstance(v, (datetime.date, datetime.datetime))
+                else v
+            )
+        )
+        for k, v in r.items()
+    }
+
+
+# RIF/cédula del cliente: no todas las bases tienen clients.client_id; si falta
+# se busca solo por código y nombre (se detecta en la primera búsqueda)
+_CLIENT_ID_SEARCH = {"enabled": True}
+
+
+def _search_clients_sql(terms, after_description, after_code, with_client_id: bool):
+    where = ["c.client_classification = 'C'"]
+    params = []
+    for term in terms:
+        like = f"%{term}%"
+        if with_client_id:
+            where.append("(c.code ILIKE %s OR c.description ILIKE %s OR c.client_id ILIKE %s)")
+            params.extend([like, like, like])
+        else:
+            where.append("(c.code ILIKE %s OR c.description ILIKE %s)")
+            params.extend([like, like])
+    if after_description is not None and after_code is not None:
+        where.append("(COALESCE(c.description, ''), c.code) > (%s, %s)")
+        params.extend([after_description, after_code])
+
+    sql = f"""
+        WITH page AS (
+            SELECT c.*
+            FROM clients AS c
+            WHERE {" AND ".join(where)}
+            ORDER BY COALESCE(c.description, ''), c.code
+            LIMIT %s
+        )
+        SELECT page.*, COALESCE(b.balance, 0) AS balance
+        FROM page
+        LEFT JOIN LATERAL (
+            SELECT cb.balance
+            FROM clients_balance AS cb
+            WHERE cb.client = page.code
+            ORDER BY cb.emission_date DESC
+            LIMIT 1
+        ) AS b ON TRUE
+        ORDER BY COALESCE(page.description, ''), page.code;
+    """
+    return sql, params
+
+
+def search_clients(q: str = None, limit: int = 50, after_description: str = None, after_code: str = None):
+    """Busca clientes por código, nombre o RIF/cédula (client_id), paginado por keyset.
+
+    - `q`: texto a buscar; '*' separa términos que deben aparecer todos. Vacío o
+      '*' lista todos.
+    - Cursor: (description, code) de la última fila recibida; el costo por página
+      no depende de cuántos clientes haya. Una descripción NULL se ordena y se
+      compara como '' (el cursor la trae así).
+    - El saldo (último registro de clients_balance) se busca solo para las filas
+      de la página. Ver SQL/create_index_clients_search.sql.
+    - Si la tabla clients no tiene la columna client_id se busca solo por código
+      y nombre.
+
+    Retorna {"items": [...], "next_cursor": {"description", "code"} | None}.
+    """
+    try:
+        limit = max(1, min(int(limit or 50), 200))
+    except (TypeError, ValueError):
+        limit = 50
+    terms = [t.strip() for t in (q or "").split("*") if t.strip()]
+
+    conn = get_db_connection()
+    try:
+        with_client_id = _CLIENT_ID_SEARCH["enabled"]
+        sql, params = _search_clients_sql(terms, after_description, after_code, with_client_id)
+        # se pide una fila de más para saber si existe una página siguiente
+        params.append(limit + 1)
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+        except psycopg2.errors.UndefinedColumn:
+            if not (with_client_id and terms):
+                raise
+            conn.rollback()
+            _CLIENT_ID_SEARCH["enabled"] = False
+            sql, params = _search_clients_sql(terms, after_description, after_code, False)
+            params.append(limit + 1)
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+        items = [_serialize_client(r) for r in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and items:
+            last = items[-1]
+            next_cursor = {"description": last.get("description") or "", "code": last.get("code")}
+        return {"items": items, "next_cursor": next_cursor}
+    finally:
+        close_db_connection(conn)
+
+
+def get_client_by_code(code: str):
+    """Obtiene un cliente por su código con su último saldo, o None."""
+    sql = """
+        SELECT c.*, COALESCE(b.balance, 0) AS balance
+        FROM clients AS c
+        LEFT JOIN LATERAL (
+            SELECT cb.balance
+            FROM clients_balance AS cb
+            WHERE cb.client = c.code
+            ORDER BY cb.emission_date DESC
+            LIMIT 1
+        ) AS b ON TRUE
+        WHERE c.code = %s
+        LIMIT 1;
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(sql, ((code or "").strip(),))
+            row = cur.fetchone()
+            return _serialize_client(row) if row else None
+    finally:
+        close_db_connection(conn)
+
+
 def search_products_with_stock_and_price(query: str, store_code: str = None):
     """Busca productos por código principal, código alterno (other_code) o descripción.
     Si `store_code` es provisto, calcula `total_stock` para ese depósito; si no,
@@ -1517,15 +1860,88 @@ def get_product_images(product_code: str = None, image_id: int = None):
         close_db_connection(conn)
 
 
+def find_product_image_by_hash(product_code: str, content_hash: str):
+    """Retorna el image_id de una imagen del producto con el mismo contenido, o None.
+
+    Requiere la columna content_hash; si aún no existe retorna None.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT image_id FROM rs_products_images WHERE product_code = %s AND content_hash = %s LIMIT 1",
+                (product_code, content_hash),
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+    except psycopg2.errors.UndefinedColumn:
+        conn.rollback()
+        return None
+    finally:
+        close_db_connection(conn)
+
+
+def get_product_image_data(image_id: int):
+    """Obtiene solo (image_data, mime_type) de una imagen, sin el resto de columnas.
+
+    Retorna None si la imagen no existe.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT image_data, mime_type FROM rs_products_images WHERE image_id = %s",
+                (image_id,),
+            )
+            row = cur.fetchone()
+            return (row[0], row[1]) if row else None
+    finally:
+        close_db_connection(conn)
+
+
+def get_product_image_meta(image_id: int):
+    """Obtiene content_hash, mime_type y size_bytes de una imagen sin leer el blob.
+
+    Sirve para responder 304 (If-None-Match) sin traer image_data. Si la columna
+    content_hash aún no existe (falta SQL/alter_table_rs_products_images_content_hash.sql)
+    se retorna con content_hash = None. Retorna None si la imagen no existe.
+    """
+    conn = get_db_connection()
+    try:
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(
+                    "SELECT content_hash, mime_type, size_bytes FROM rs_products_images WHERE image_id = %s",
+                    (image_id,),
+                )
+                row = cur.fetchone()
+        except psycopg2.errors.UndefinedColumn:
+            conn.rollback()
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(
+                    "SELECT NULL AS content_hash, mime_type, size_bytes FROM rs_products_images WHERE image_id = %s",
+                    (image_id,),
+                )
+                row = cur.fetchone()
+        return dict(row) if row else None
+    finally:
+        close_db_connection(conn)
+
+
 def delete_product_image(image_id: int):
-    """Elimina una imagen de rs_products_images por su ID."""
+    """Elimina una imagen de rs_products_images por su ID.
+
+    Retorna el product_code de la imagen eliminada (None si no existía).
+    """
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
             cur.execute(
-                "DELETE FROM rs_products_images WHERE image_id = %s", (image_id,)
+                "DELETE FROM rs_products_images WHERE image_id = %s RETURNING product_code", (image_id,)
             )
+            row = cur.fetchone()
         conn.commit()
+        return row[0] if row else None
     except Exception as e:
         conn.rollback()
         raise
@@ -1536,13 +1952,22 @@ def delete_product_image(image_id: int):
 # operaciones de cleintes 
 
 def get_clients():
-    """Obtiene todos los clientes activos."""
+    """Obtiene todos los clientes activos con su último saldo.
+
+    El saldo se toma en una sola pasada sobre clients_balance (DISTINCT ON)
+    en lugar de una subconsulta por cliente.
+    """
     conn = get_db_connection()
     sql = """
         select 
         c.*,
-        coalesce( (select balance from clients_balance cb where cb.client = c.code order by emission_date desc limit 1 ),0) as balance
+        coalesce(b.balance, 0) as balance
         from clients c
+        left join (
+            select distinct on (cb.client) cb.client, cb.balance
+            from clients_balance cb
+            order by cb.client, cb.emission_date desc
+        ) b on b.client = c.code
         where c.client_classification = 'C'
         order by c.description
     """
@@ -1655,25 +2080,35 @@ __all__ = [
     "search_product_failure",
     "get_inventory_operations_by_correlative",
     "get_inventory_operations_details_by_correlative",
+    "get_inventory_operations_for_print",
     "get_document_no_inventory_operation",
     "update_description_inventory_operations",
     "update_minmax_product_failure",
     "update_locations_products_failures",
     "get_inventory_operations",
+    "get_inventory_operations_page",
     "delete_inventory_operation_by_correlative",
     "update_inventory_operation_detail_amount",
     "delete_inventory_operation_detail",
     "search_product",
     "get_product_price_and_unit",
     "update_inventory_operation_type",
+    "delete_inventory_operations_by_correlatives",
+    "update_inventory_operations_type_by_correlatives",
+    "update_description_inventory_operations_by_correlatives",
     "get_product_stock",
     "get_product_stock_by_store",
     "get_product_by_code_or_other_code",
     "search_products_with_stock_and_price",
     "insert_product_image",
     "get_product_images",
+    "get_product_image_data",
+    "find_product_image_by_hash",
+    "get_product_image_meta",
     "delete_product_image",
     "get_clients", 
+    "search_clients",
+    "get_client_by_code",
     "get_user_by_code", 
 ]
 
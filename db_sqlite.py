@@ -9,6 +9,24 @@ from pathlib import Path
 DB_FILENAME = 'repostock.db'
 DB_PATH = Path(__file__).resolve().parent / DB_FILENAME
 
+# Funciones a llamar cuando cambian perfiles/menús/asignaciones (ej. permissions.invalidate)
+_change_listeners = []
+
+
+def on_permissions_change(listener) -> None:
+    """Registra una función sin argumentos que se llama al cambiar asignaciones de perfiles o menús."""
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def _notify_permissions_change() -> None:
+    for listener in list(_change_listeners):
+        try:
+            listener()
+        except Exception as e:
+            print('Error notificando cambio de permisos:', e)
+
+
 def get_connection(db_path: str | Path | None = None) -> sqlite3.Connection:
     """Devuelve una conexión a la base SQLite indicada (por defecto `repostock.db`)."""
     path = Path(db_path) if db_path else DB_PATH
@@ -268,6 +286,7 @@ def assign_menus_to_profile(profile_id: int, menu_ids: list[int]):
     cur.execute('PRAGMA foreign_keys = ON')
     conn.commit()
     conn.close()
+    _notify_permissions_change()
 
 
 def get_menus_by_profile(profile_id: int):
@@ -288,7 +307,7 @@ def get_menus_by_profile(profile_id: int):
     return rows
 
 
-def assign_profile_to_user(user_id: int, profile_id: int):
+def assign_profile_to_user(user_id: str, profile_id: int):
     """Asigna un perfil a un usuario (sobrescribe asignación previa)."""
     conn = get_connection()
     cur = conn.cursor()
@@ -298,6 +317,7 @@ def assign_profile_to_user(user_id: int, profile_id: int):
     cur.execute("INSERT INTO user_profiles (user_id, profile_id) VALUES (?, ?)", (user_id, profile_id))
     conn.commit()
     conn.close()
+    _notify_permissions_change()
 
 
 def get_profile_by_user(user_id: int):
@@ -331,4 +351,7 @@ __all__ = [
     "get_menus",
     "assign_menus_to_profile",
     "get_menus_by_profile",
+    "assign_profile_to_user",
+    "get_profile_by_user",
+    "on_permissions_change",
 ]
\ No newline at end of file
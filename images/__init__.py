@@ -0,0 +1,34 @@
+"""Paquete `images` - miniaturas, caché en disco y respuestas HTTP de imágenes de productos.
+
+    from images import get_thumbnail_path, THUMB_SIZES
+"""
+from .thumbnails import (
+    THUMB_SIZES,
+    sniff_mime,
+    make_thumbnail,
+    schedule as schedule_thumbnails,
+    forget as forget_image,
+    get_thumbnail_path,
+)
+from .processing import ProcessedImage, process_upload
+from .responses import (
+    is_not_modified,
+    not_modified_response,
+    send_image,
+)
+from . import cache as image_cache
+
+__all__ = [
+    "THUMB_SIZES",
+    "sniff_mime",
+    "make_thumbnail",
+    "schedule_thumbnails",
+    "forget_image",
+    "get_thumbnail_path",
+    "ProcessedImage",
+    "process_upload",
+    "is_not_modified",
+    "not_modified_response",
+    "send_image",
+    "image_cache",
+]
@@ -0,0 +1,189 @@
+"""Caché en disco de imágenes de productos, direccionada por contenido.
+
+Cada archivo se guarda como `<hash>_<variante>.<ext>`, donde `hash` es el
+SHA-256 de los bytes originales de la imagen y `variante` el tamaño de la
+miniatura ("sm", "md", "lg") u "orig". Dos imágenes con el mismo contenido
+comparten archivos.
+
+Para responder sin consultar PostgreSQL se guarda además un puntero por
+image_id (`ids/<image_id>`) con el hash de su contenido.
+
+- Carpeta: REPOSTOCK_IMAGE_CACHE_DIR (por defecto <temp>/repostock/image_cache).
+- Tamaño máximo: REPOSTOCK_IMAGE_CACHE_MB (por defecto 200). Al superarlo se
+  eliminan los archivos menos usados (LRU por fecha de modificación). Los
+  punteros no cuentan: si apuntan a un archivo eliminado se regenera.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Any, Optional
+
+IMAGE_CACHE_DIR = os.environ.get("REPOSTOCK_IMAGE_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), "repostock", "image_cache"
+)
+IMAGE_CACHE_MAX_BYTES = int(float(os.environ.get("REPOSTOCK_IMAGE_CACHE_MB", "200")) * 1024 * 1024)
+
+# extensiones posibles de un archivo en caché, en orden de búsqueda
+EXTENSIONS = (".jpg", ".png", ".gif", ".webp", ".bin")
+
+_IDS_DIR = "ids"
+
+_lock = threading.Lock()
+_size: Optional[int] = None
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def content_hash(data: bytes) -> str:
+    """Hash (hex SHA-256) del contenido de la imagen."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _blob_path(digest: str, variant: str, ext: str) -> str:
+    return os.path.join(IMAGE_CACHE_DIR, digest[:2], f"{digest}_{variant}{ext}")
+
+
+def _id_path(image_id: int) -> str:
+    return os.path.join(IMAGE_CACHE_DIR, _IDS_DIR, str(int(image_id)))
+
+
+def _write_atomic(path: str, data: bytes) -> bool:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return True
+    except OSError as e:
+        print(f"No se pudo guardar la imagen en caché: {e}")
+        return False
+
+
+def find(digest: str, variant: str) -> Optional[str]:
+    """Ruta del archivo en caché para (hash, variante) o None."""
+    for ext in EXTENSIONS:
+        path = _blob_path(digest, variant, ext)
+        if os.path.exists(path):
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            with _lock:
+                _stats["hits"] += 1
+            return path
+    with _lock:
+        _stats["misses"] += 1
+    return None
+
+
+def put(digest: str, variant: str, ext: str, data: bytes) -> Optional[str]:
+    """Guarda un archivo de forma atómica, aplica el límite y retorna su ruta."""
+    global _size
+    if not data:
+        return None
+    path = _blob_path(digest, variant, ext)
+    existed = os.path.exists(path)
+    if not _write_atomic(path, data):
+        return None
+    with _lock:
+        _stats["stores"] += 1
+        if not existed:
+            _size = _current_size() + len(data)
+        if IMAGE_CACHE_MAX_BYTES > 0 and _size > IMAGE_CACHE_MAX_BYTES:
+            _evict(keep=path)
+    return path
+
+
+def lookup_id(image_id: int) -> Optional[str]:
+    """Hash del contenido asociado a un image_id, si se conoce."""
+    try:
+        with open(_id_path(image_id), "r", encoding="ascii") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def remember_id(image_id: int, digest: str) -> None:
+    _write_atomic(_id_path(image_id), digest.encode("ascii"))
+
+
+def forget_id(image_id: int) -> None:
+    """Olvida el puntero de un image_id (imagen eliminada o reescrita).
+
+    Los archivos direccionados por contenido se dejan: pueden estar
+    compartidos y el límite de tamaño los eliminará si ya no se usan.
+    """
+    try:
+        os.remove(_id_path(image_id))
+    except OSError:
+        pass
+
+
+def _scan() -> list[tuple[float, int, str]]:
+    entries = []
+    ids_dir = os.path.join(IMAGE_CACHE_DIR, _IDS_DIR)
+    for root, _dirs, files in os.walk(IMAGE_CACHE_DIR):
+        if root == ids_dir:
+            continue
+        for name in files:
+            if name.endswith(".tmp"):
+                continue
+            full = os.path.join(root, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, full))
+    return entries
+
+
+def _current_size() -> int:
+    global _size
+    if _size is None:
+        _size = sum(size for _mtime, size, _path in _scan())
+    return _size
+
+
+def _evict(keep: Optional[str] = None) -> None:
+    """Elimina los archivos más antiguos hasta quedar en el 90% del límite (con _lock tomado)."""
+    global _size
+    entries = sorted(_scan())
+    total = sum(size for _mtime, size, _p in entries)
+    target = int(IMAGE_CACHE_MAX_BYTES * 0.9)
+    for _mtime, size, full in entries:
+        if total <= target:
+            break
+        if full == keep:
+            continue
+        try:
+            os.remove(full)
+            total -= size
+            _stats["evictions"] += 1
+        except OSError:
+            continue
+    _size = total
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        data = dict(_stats)
+        data["bytes"] = _current_size()
+    data["max_bytes"] = IMAGE_CACHE_MAX_BYTES
+    data["dir"] = IMAGE_CACHE_DIR
+    return data
+
+
+__all__ = [
+    "IMAGE_CACHE_DIR",
+    "EXTENSIONS",
+    "content_hash",
+    "find",
+    "put",
+    "lookup_id",
+    "remember_id",
+    "forget_id",
+    "stats",
+]
@@ -0,0 +1,111 @@
+"""Mantenimiento de rs_products_images.
+
+normalize_base64_images(): busca imágenes importadas como texto base64 dentro
+del bytea, las decodifica, corrige mime_type/size_bytes y las reescribe en su
+lugar, por lotes. Después de ejecutarlo la ruta /product_images/raw sirve los
+bytes tal cual, sin revisar el contenido en cada petición.
+
+Ejecutar:
+  py scripts/normalize_product_images.py [--dry-run] [--chunk 200]
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import re
+from typing import Any, Optional
+
+import psycopg2
+
+from db import close_db_connection, get_db_connection
+
+from .thumbnails import forget as forget_image, sniff_mime
+
+_BASE64_RE = re.compile(rb"^[A-Za-z0-9+/]+={0,2}$")
+_DATA_URI_RE = re.compile(rb"^data:[\w.+/-]+;base64,", re.IGNORECASE)
+
+# Candidatas: se descartan en SQL las que ya empiezan con la firma de JPEG o PNG
+# (la gran mayoría) para no traer sus blobs; el resto se verifica en Python.
+_SQL_CANDIDATES = """
+    SELECT image_id, image_data, mime_type
+    FROM rs_products_images
+    WHERE image_id > %s
+      AND octet_length(image_data) >= 32
+      AND get_byte(image_data, 0) NOT IN (255, 137)
+    ORDER BY image_id
+    LIMIT %s
+"""
+
+_SQL_UPDATE = """
+    UPDATE rs_products_images
+    SET image_data = %s, mime_type = %s, size_bytes = %s
+    WHERE image_id = %s
+"""
+
+
+def decode_base64_image(data: bytes) -> Optional[bytes]:
+    """Decodifica una imagen guardada como texto base64 (con o sin prefijo data:).
+
+    Retorna los bytes de la imagen solo si el texto es base64 válido y el
+    resultado tiene la firma de un formato de imagen conocido; si no, None.
+    """
+    if not data or sniff_mime(data):
+        return None
+    text = _DATA_URI_RE.sub(b"", data.strip(), count=1)
+    text = b"".join(text.split())
+    if len(text) % 4 != 0 or not _BASE64_RE.match(text):
+        return None
+    try:
+        decoded = base64.b64decode(text, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return decoded if sniff_mime(decoded) else None
+
+
+def normalize_base64_images(chunk_size: int = 200, dry_run: bool = False) -> dict[str, Any]:
+    """Reescribe en su lugar las imágenes guardadas como base64.
+
+    Recorre la tabla por image_id en lotes de `chunk_size` y confirma cada
+    lote por separado, así una tabla grande no queda bloqueada en una sola
+    transacción. Con `dry_run` solo cuenta. Retorna un resumen.
+    """
+    chunk_size = max(1, int(chunk_size))
+    summary = {"scanned": 0, "converted": 0, "bytes_before": 0, "bytes_after": 0, "converted_ids": []}
+    last_id = 0
+    conn = get_db_connection()
+    try:
+        while True:
+            with conn.cursor() as cur:
+                cur.execute(_SQL_CANDIDATES, (last_id, chunk_size))
+                rows = cur.fetchall()
+            if not rows:
+                break
+            updates = []
+            for image_id, image_data, mime_type in rows:
+                last_id = image_id
+                summary["scanned"] += 1
+                decoded = decode_base64_image(bytes(image_data))
+                if decoded is None:
+                    continue
+                mime = sniff_mime(decoded) or mime_type
+                updates.append((psycopg2.Binary(decoded), mime, len(decoded), image_id))
+                summary["converted"] += 1
+                summary["bytes_before"] += len(image_data)
+                summary["bytes_after"] += len(decoded)
+                summary["converted_ids"].append(image_id)
+            if updates and not dry_run:
+                with conn.cursor() as cur:
+                    cur.executemany(_SQL_UPDATE, updates)
+                conn.commit()
+                for _data, _mime, _size, image_id in updates:
+                    forget_image(image_id)
+            print(f"Lote hasta image_id={last_id}: {len(rows)} revisadas, {len(updates)} convertidas")
+        return summary
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        close_db_connection(conn)
+
+
+__all__ = ["decode_base64_image", "normalize_base64_images"]
@@ -0,0 +1,69 @@
+"""Imagen principal de cada producto (product_code -> image_id, content_hash).
+
+Las tarjetas de producto de compras piden la imagen por código. En lugar de
+traer el blob cada vez, se resuelve el image_id de la imagen principal (la
+marcada is_primary o, si no hay, la más reciente) y se redirige a la URL
+cacheable /product_images/raw/<id> o /product_images/thumb/<id>/<size>.
+
+El resultado (también "sin imagen") queda en memoria; se invalida al subir o
+eliminar imágenes del producto y, por cambios hechos fuera de la app, caduca
+a los REPOSTOCK_PRIMARY_IMAGE_TTL segundos (por defecto 300).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+PRIMARY_IMAGE_TTL = float(os.environ.get("REPOSTOCK_PRIMARY_IMAGE_TTL", "300"))
+PRIMARY_IMAGE_MAX_ENTRIES = 5000
+
+# función que consulta {image_id, content_hash} de la imagen principal, o None
+PrimaryLoader = Callable[[str], Optional[dict]]
+
+_lock = threading.Lock()
+_entries: dict[str, tuple[float, Optional[dict]]] = {}
+
+
+def _key(product_code: str) -> str:
+    # los códigos distinguen mayúsculas: "ab-1" y "AB-1" pueden ser productos distintos
+    return (product_code or "").strip()
+
+
+def resolve_primary(product_code: str, load_primary: PrimaryLoader) -> Optional[dict]:
+    """Retorna {image_id, content_hash} de la imagen principal o None si no tiene.
+
+    La consulta recibe el código tal cual (solo sin espacios), sin cambiar mayúsculas.
+    """
+    key = _key(product_code)
+    if not key:
+        return None
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    value = load_primary(key)
+    with _lock:
+        if len(_entries) >= PRIMARY_IMAGE_MAX_ENTRIES:
+            # descartar los vencidos; si no alcanza, vaciar
+            for k in [k for k, (expires, _v) in _entries.items() if expires <= now]:
+                del _entries[k]
+            if len(_entries) >= PRIMARY_IMAGE_MAX_ENTRIES:
+                _entries.clear()
+        _entries[key] = (now + PRIMARY_IMAGE_TTL, value)
+    return value
+
+
+def invalidate(product_code: Optional[str] = None) -> None:
+    """Olvida la imagen principal de un producto (o de todos si no se indica)."""
+    with _lock:
+        if product_code is None:
+            _entries.clear()
+        else:
+            _entries.pop(_key(product_code), None)
+
+
+__all__ = ["resolve_primary", "invalidate"]
@@ -0,0 +1,111 @@
+"""Procesamiento de imágenes al subirlas.
+
+Las fotos de cámara de teléfono llegan a pesar varios MB. Antes de guardarlas:
+- se corrige la orientación (EXIF),
+- se limita el lado mayor a REPOSTOCK_IMAGE_MAX_SIDE píxeles (por defecto 1600),
+- se recomprime en REPOSTOCK_IMAGE_FORMAT ("jpeg" o "webp", por defecto jpeg)
+  con calidad REPOSTOCK_IMAGE_QUALITY (por defecto 82); las imágenes con
+  transparencia se guardan en PNG si el formato es jpeg,
+- se calcula el hash del resultado para no guardar duplicados del mismo producto.
+
+El trabajo pesado corre en un pool de hilos propio (REPOSTOCK_IMAGE_UPLOAD_WORKERS,
+por defecto 2), así nunca hay más de esa cantidad de imágenes decodificándose a
+la vez aunque lleguen muchas subidas juntas. Las miniaturas en segundo plano
+usan el pool de images.thumbnails, por lo que una cola de miniaturas no hace
+esperar a la subida. Sin Pillow, o si la imagen no se puede abrir, se guarda
+el original.
+"""
+from __future__ import annotations
+
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Optional
+
+from . import cache as image_cache
+from .thumbnails import Image, ImageOps, sniff_mime
+
+IMAGE_MAX_SIDE = max(64, int(os.environ.get("REPOSTOCK_IMAGE_MAX_SIDE", "1600")))
+IMAGE_QUALITY = min(95, max(30, int(os.environ.get("REPOSTOCK_IMAGE_QUALITY", "82"))))
+IMAGE_FORMAT = (os.environ.get("REPOSTOCK_IMAGE_FORMAT") or "jpeg").strip().lower()
+IMAGE_PROCESS_TIMEOUT = float(os.environ.get("REPOSTOCK_IMAGE_TIMEOUT", "30"))
+UPLOAD_WORKERS = max(1, int(os.environ.get("REPOSTOCK_IMAGE_UPLOAD_WORKERS", "2")))
+
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+
+@dataclass
+class ProcessedImage:
+    data: bytes
+    mime_type: str
+    content_hash: str
+    original_size: int
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.data)
+
+    def filename(self, original: Optional[str]) -> str:
+        """Nombre del archivo con la extensión del formato final."""
+        base = os.path.splitext(original or "imagen")[0] or "imagen"
+        return base + _EXTENSIONS.get(self.mime_type, "")
+
+
+def _recompress(data: bytes) -> Optional[tuple[bytes, str]]:
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            # los GIF animados se dejan como están
+            if getattr(img, "is_animated", False):
+                return None
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+            out = io.BytesIO()
+            if IMAGE_FORMAT == "webp":
+                img = img.convert("RGBA" if has_alpha else "RGB")
+                img.save(out, format="WEBP", quality=IMAGE_QUALITY, method=4)
+                return out.getvalue(), "image/webp"
+            if has_alpha:
+                img.save(out, format="PNG", optimize=True)
+                return out.getvalue(), "image/png"
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(out, format="JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+            return out.getvalue(), "image/jpeg"
+    except Exception as e:
+        print(f"No se pudo procesar la imagen subida: {e}")
+        return None
+
+
+def _process(data: bytes, mime_type: Optional[str]) -> ProcessedImage:
+    result = _recompress(data)
+    # si recomprimir no reduce el tamaño (imagen ya pequeña y optimizada) se deja el original
+    if result is None or len(result[0]) >= len(data):
+        result = (data, sniff_mime(data) or mime_type or "application/octet-stream")
+    out, mime = result
+    return ProcessedImage(out, mime, image_cache.content_hash(out), len(data))
+
+
+def process_upload(data: bytes, mime_type: Optional[str] = None) -> ProcessedImage:
+    """Procesa una imagen subida en el pool de subidas y espera el resultado.
+
+    Si el pool no responde a tiempo se guarda el original.
+    """
+    future = _executor.submit(_process, data, mime_type)
+    try:
+        return future.result(timeout=IMAGE_PROCESS_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        print("Procesamiento de imagen excedió el tiempo; se guarda el original")
+        return ProcessedImage(
+            data, sniff_mime(data) or mime_type or "application/octet-stream",
+            image_cache.content_hash(data), len(data),
+        )
+
+
+__all__ = ["ProcessedImage", "process_upload"]
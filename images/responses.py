@@ -0,0 +1,94 @@
+"""Respuestas HTTP para imágenes de productos.
+
+- ETag fuerte = hash SHA-256 del contenido (columna content_hash).
+- If-None-Match -> 304 (ver is_not_modified: se comprueba antes de leer el blob).
+- Range -> 206 con solo el tramo pedido.
+- El blob se sirve desde el memoryview que entrega psycopg2, por tramos, sin
+  copiarlo completo a bytes.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+from typing import Optional
+
+from flask import current_app, request
+from werkzeug.wsgi import wrap_file
+
+IMAGE_MAX_AGE = 86400
+
+
+class BufferReader(io.RawIOBase):
+    """Archivo de solo lectura sobre un buffer (bytes/memoryview) sin copiarlo."""
+
+    def __init__(self, buf):
+        super().__init__()
+        self._view = memoryview(buf).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, min(offset, len(self._view)))
+        return self._pos
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._pos + size)
+        chunk = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return chunk
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+
+def is_not_modified(etag: Optional[str]) -> bool:
+    """True si el cliente ya tiene esta versión (If-None-Match coincide con el ETag)."""
+    return bool(etag) and request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag: str):
+    resp = current_app.response_class(status=304)
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = IMAGE_MAX_AGE
+    return resp
+
+
+def send_image(payload, mime_type: Optional[str], etag: Optional[str] = None):
+    """Responde con la imagen: ETag, Cache-Control, 304 y rangos (206)."""
+    reader = BufferReader(payload if payload is not None else b"")
+    if not etag:
+        etag = hashlib.sha256(reader._view).hexdigest()
+    resp = current_app.response_class(
+        wrap_file(request.environ, reader),
+        mimetype=mime_type or "image/jpeg",
+        direct_passthrough=True,
+    )
+    resp.content_length = len(reader)
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = IMAGE_MAX_AGE
+    return resp.make_conditional(request, accept_ranges=True, complete_length=len(reader))
+
+
+__all__ = ["BufferReader", "is_not_modified", "not_modified_response", "send_image"]
@@ -0,0 +1,163 @@
+"""Miniaturas de imágenes de productos.
+
+Las miniaturas se generan al subir la imagen (en segundo plano, con un pool de
+hilos acotado por REPOSTOCK_IMAGE_WORKERS, por defecto 2) o bajo demanda la
+primera vez que se piden, y se guardan en la caché en disco (images.cache).
+Un acierto de caché no consulta PostgreSQL.
+
+Pillow es opcional: sin Pillow no se puede reducir la imagen y se guarda una
+sola copia del original (variante "orig") que se sirve para cualquier tamaño;
+sigue evitando la consulta a la base de datos.
+"""
+from __future__ import annotations
+
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from . import cache as image_cache
+
+try:
+    from PIL import Image, ImageOps
+except Exception:
+    Image = ImageOps = None
+
+# nombre del tamaño -> lado máximo en píxeles
+THUMB_SIZES = {"sm": 96, "md": 256, "lg": 640}
+
+IMAGE_WORKERS = max(1, int(os.environ.get("REPOSTOCK_IMAGE_WORKERS", "2")))
+JPEG_QUALITY = 82
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="thumbs")
+
+# función que carga (bytes, mime_type) de una imagen por su id, o None
+ImageLoader = Callable[[int], Optional[tuple[bytes, Optional[str]]]]
+
+
+def sniff_mime(data: bytes) -> Optional[str]:
+    """Tipo MIME según la firma de los primeros bytes, o None si no se reconoce."""
+    if data.startswith(b"\xFF\xD8\xFF"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"GIF87a") or data.startswith(b"GIF89a"):
+        return "image/gif"
+    if data.startswith(b"RIFF") and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+_MIME_EXT = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp"}
+
+
+def make_thumbnail(data: bytes, max_side: int) -> Optional[tuple[bytes, str]]:
+    """Reduce la imagen a `max_side` píxeles de lado mayor.
+
+    Retorna (bytes, extensión) en JPEG, o PNG si la imagen tiene transparencia.
+    None si Pillow no está instalado o la imagen no se puede abrir.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_side, max_side))
+            out = io.BytesIO()
+            if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                img.save(out, format="PNG", optimize=True)
+                return out.getvalue(), ".png"
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            return out.getvalue(), ".jpg"
+    except Exception as e:
+        print(f"No se pudo generar la miniatura: {e}")
+        return None
+
+
+def _store_original(digest: str, data: bytes) -> Optional[str]:
+    path = image_cache.find(digest, "orig")
+    if path:
+        return path
+    ext = _MIME_EXT.get(sniff_mime(data) or "", ".bin")
+    return image_cache.put(digest, "orig", ext, data)
+
+
+def _generate(digest: str, data: bytes, size: str) -> Optional[str]:
+    """Genera y guarda una miniatura; si no se puede, guarda el original."""
+    path = image_cache.find(digest, size)
+    if path:
+        return path
+    thumb = make_thumbnail(data, THUMB_SIZES[size])
+    if thumb is None:
+        return _store_original(digest, data)
+    thumb_data, ext = thumb
+    return image_cache.put(digest, size, ext, thumb_data)
+
+
+def _generate_many(digest: str, data: bytes, sizes) -> None:
+    for size in sizes:
+        try:
+            _generate(digest, data, size)
+        except Exception as e:
+            print(f"Error generando miniatura {size} de {digest[:12]}: {e}")
+
+
+def schedule(image_id: int, data: bytes, digest: Optional[str] = None) -> str:
+    """Registra una imagen recién guardada y genera sus miniaturas en segundo plano.
+
+    Retorna el hash del contenido.
+    """
+    digest = digest or image_cache.content_hash(data)
+    image_cache.remember_id(image_id, digest)
+    _executor.submit(_generate_many, digest, data, list(THUMB_SIZES))
+    return digest
+
+
+def forget(image_id: int) -> None:
+    """Olvida una imagen eliminada o reescrita (la próxima petición la recarga)."""
+    image_cache.forget_id(image_id)
+
+
+def _cached_path(digest: str, size: str) -> Optional[str]:
+    return image_cache.find(digest, size) or image_cache.find(digest, "orig")
+
+
+def get_thumbnail_path(image_id: int, size: str, load_image: ImageLoader) -> Optional[str]:
+    """Ruta en disco de la miniatura `size` de la imagen `image_id`.
+
+    Con el puntero y el archivo en caché no se llama a `load_image`. Si falta,
+    carga la imagen, genera el tamaño pedido en el hilo actual y encola el
+    resto. None si la imagen no existe.
+    """
+    if size not in THUMB_SIZES:
+        raise ValueError(f"Tamaño de miniatura no válido: {size}")
+
+    digest = image_cache.lookup_id(image_id)
+    if digest:
+        path = _cached_path(digest, size)
+        if path:
+            return path
+
+    loaded = load_image(image_id)
+    if not loaded or not loaded[0]:
+        return None
+    data = bytes(loaded[0])
+    digest = image_cache.content_hash(data)
+    image_cache.remember_id(image_id, digest)
+    path = _generate(digest, data, size)
+    others = [s for s in THUMB_SIZES if s != size]
+    if Image is not None and others:
+        _executor.submit(_generate_many, digest, data, others)
+    return path
+
+
+__all__ = [
+    "THUMB_SIZES",
+    "sniff_mime",
+    "make_thumbnail",
+    "schedule",
+    "forget",
+    "get_thumbnail_path",
+]
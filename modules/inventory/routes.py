@@ -5,22 +5,14 @@ from flask import (
     Blueprint,
     redirect,
     render_template,
-    render_template_string,
     request,
     jsonify,
     session,
     url_for,
-    make_response,
 )
 
 from modules.inventory.schemas.set_inventory_operation_details import SetInventoryOperationDetailsData
 
-try:
-    import pdfkit
-except Exception:
-    pdfkit = None
-
-
 from modules.inventory.schemas.set_inventory_operation import SetInventoryOperationData
 from modules.inventory.services.inventoryDb import (
     get_departments,
@@ -34,29 +26,16 @@ from modules.inventory.services.inventoryDb import (
     update_minmax_product_failure,
     update_product_failure_params
 )
+from modules.inventory.services.receptionReport import (
+    build_reception_report,
+    get_cached_reception_report,
+)
 
-# Configuración local de wkhtmltopdf para evitar import circular con app.py
-WKHTMLTOPDF_BIN = os.environ.get("WKHTMLTOPDF_BIN")
-if not WKHTMLTOPDF_BIN:
-    for p in [
-        r"C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
-        r"C:\\Program Files (x86)\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
-    ]:
-        if os.path.exists(p):
-            WKHTMLTOPDF_BIN = p
-            break
-
-
-def get_pdfkit_config():
-    if pdfkit is None:
-        return None
-    if not WKHTMLTOPDF_BIN or not os.path.exists(WKHTMLTOPDF_BIN):
-        return None
-    try:
-        return pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_BIN)
-    except Exception:
-        return None
-
+from reporting import send_cached_pdf, send_pdf
+from reporting.collection import collection_order_job
+from reporting.native import get_engine
+from reporting.templates import get_report_template
+from jinja2 import TemplateNotFound
 
 from db import (
     get_correlative_product_unit,
@@ -1022,18 +1001,9 @@ def api_reception_confirm():
         return jsonify({"ok": False, "error": f"Validación de conteo falló: {e}"}), 400
 
     try:
-        # Detectar diferencias entre orden y conteo recibido
-        differences = False
-        for d in details:
-            code = d.get("code_product")
-            try:
-                original = float(d.get("amount") or 0)
-            except Exception:
-                original = 0.0
-            counted_val = float(counts_map.get(code, 0))
-            if abs(original - counted_val) > 1e-9:
-                differences = True
-                break
+        # Detectar diferencias entre orden y conteo recibido (reporte por línea, cacheado)
+        report = build_reception_report(source_correlative, counts_map, header)
+        differences = report["differences"]
 
         document_no = get_document_no_inventory_operation(source_correlative)
         base_msg = (
@@ -1049,6 +1019,17 @@ def api_reception_confirm():
                 "transfer_correlative": source_correlative,
                 "document_no": document_no,
                 "differences": differences,
+                "report_version": report["version"],
+                "report_url": url_for(
+                    "inventory.api_reception_discrepancies",
+                    correlative=source_correlative,
+                    version=report["version"],
+                ),
+                "report_pdf_url": url_for(
+                    "inventory.reception_discrepancies_pdf",
+                    correlative=source_correlative,
+                    version=report["version"],
+                ),
                 "message": (
                     "Recepción validada con diferencias"
                     if differences
@@ -1063,6 +1044,63 @@ def api_reception_confirm():
         )
 
 
+def _reception_report_from_request(correlative):
+    """Obtiene el reporte de diferencias desde caché o lo calcula si se envían `counts`."""
+    version = request.args.get("version") or None
+    counts_json = request.values.get("counts")
+    if counts_json:
+        try:
+            counts_map = json.loads(counts_json)
+        except Exception:
+            counts_map = None
+        if not isinstance(counts_map, dict):
+            return None, ("Formato inválido de counts.", 400)
+        header_rows = get_inventory_operations_by_correlative(
+            correlative, "TRANSFER", False
+        )
+        if not header_rows:
+            return None, ("TRANSFER no encontrada", 404)
+        return build_reception_report(correlative, counts_map, header_rows[0]), None
+    report = get_cached_reception_report(correlative, version)
+    if report is None:
+        return None, (
+            "No hay reporte de diferencias para este TRANSFER; valide la recepción primero.",
+            404,
+        )
+    return report, None
+
+
+@inventory_bp.route("/api/reception/discrepancies/<int:correlative>", methods=["GET", "POST"])
+def api_reception_discrepancies(correlative):
+    """Devuelve el reporte de diferencias de recepción (por línea) en JSON."""
+    try:
+        report, error = _reception_report_from_request(correlative)
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    if error:
+        return jsonify({"ok": False, "error": error[0]}), error[1]
+    return jsonify({"ok": True, "report": report})
+
+
+@inventory_bp.route("/reception/discrepancies/<int:correlative>.pdf", methods=["GET", "POST"])
+def reception_discrepancies_pdf(correlative):
+    """PDF del reporte de diferencias de recepción para revisión de supervisores."""
+    try:
+        report, error = _reception_report_from_request(correlative)
+    except Exception as e:
+        return f"Error consultando diferencias: {e}", 500
+    if error:
+        return error
+
+    try:
+        report_template = get_report_template("report_reception_discrepancies.html", "inventory")
+    except Exception as e:
+        return f"No se pudo leer el reporte: {e}", 500
+    html = report_template.render(report=report)
+
+    return send_pdf(html, f"diferencias_recepcion_{correlative}.pdf")
+
+
 @inventory_bp.route("/check_transfer_reception", methods=["GET"])
 def check_transfer_reception():
     """Pantalla para chequear la recepción de una TRANSFER procesada (wait=false)."""
@@ -1198,54 +1236,24 @@ def collection_preview_pdf():
     except Exception as e:
         return f"Error consultando datos de la orden: {e}", 500
 
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    # Cargar reporte desde carpeta reports/ y renderizar con Jinja
-    report_path = os.path.join(base_path, "reports", "report_collection_order.html")
-    if not os.path.exists(report_path):
+    # Plantilla compilada desde reports/ (se recarga solo si cambia el archivo)
+    try:
+        report_template = get_report_template("report_collection_order.html", "inventory")
+    except TemplateNotFound:
         return (
             "No se encontró el reporte report_collection_order.html en la carpeta reports.",
             500,
         )
-    try:
-        with open(report_path, "r", encoding="utf-8") as f:
-            report_template = f.read()
     except Exception as e:
         return f"No se pudo leer el reporte: {e}", 500
 
-    # Contexto para el reporte
-    context = {
-        "header": header,
-        "details": details,
-        "generated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    }
-    html = render_template_string(report_template, **context)
-
-    if pdfkit is None:
-        return "pdfkit no está instalado en el entorno de Python.", 500
-
-    config = get_pdfkit_config()
-    if not config:
-        return "wkhtmltopdf no está configurado o no se encuentra el ejecutable.", 500
-
-    options = {
-        "page-size": "A4",
-        "encoding": "UTF-8",
-        "margin-top": "10mm",
-        "margin-bottom": "10mm",
-        "margin-left": "10mm",
-        "margin-right": "10mm",
-    }
-    try:
-        pdf = pdfkit.from_string(html, False, configuration=config, options=options)
-    except Exception as e:
-        return f"Error generando PDF: {e}", 500
-
-    resp = make_response(pdf)
-    resp.headers["Content-Type"] = "application/pdf"
-    resp.headers["Content-Disposition"] = (
-        'inline; filename="orden_recoleccion_preview.pdf"'
+    engine = get_engine("collection_order", request.values.get("engine"))
+    cache_key, build_html, build_native = collection_order_job(
+        report_template, header, details, engine
+    )
+    return send_cached_pdf(
+        cache_key, build_html, "orden_recoleccion_preview.pdf", build_native=build_native
     )
-    return resp
 
 
 @inventory_bp.route("/config_param_product_store")
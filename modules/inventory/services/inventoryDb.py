@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Any, Iterable, Optional, Sequence
 from contextlib import contextmanager
 
-from database import get_connection, close_connection
+from database import get_connection, close_connection, reference_cache
 from modules.inventory.schemas.set_inventory_operation import SetInventoryOperationData
 from modules.inventory.schemas.set_inventory_operation_details import SetInventoryOperationDetailsData
 from modules.inventory.schemas.products_failures import ProductsFailuresData
@@ -211,23 +211,11 @@ def get_product_s_for_order_collection( store_origin: str, store_destination: st
         return products
 
 def get_departments() -> Iterable[dict[str, Any]]:
-    conn = get_connection()
     try:
-        cur = conn.cursor()
-        sql_departments = """
-            SELECT 
-            * 
-            FROM department as d
-        """
-        cur.execute(sql_departments)
-        columns = [desc[0] for desc in cur.description]
-        departments = [dict(zip(columns, row)) for row in cur.fetchall()]
-        return departments
+        return reference_cache.get_departments()
     except Exception as e:
         print(f"Error al Buscar Departamentos: {e}")
         return []
-    finally:
-        close_connection(conn)
 
 #obtiene una lista de productos por códigos
 def get_products_by_codes(product_codes: list[str]) -> Iterable[dict[str, Any]]:
@@ -270,81 +258,34 @@ def get_products_by_codes(product_codes: list[str]) -> Iterable[dict[str, Any]]:
     
 
 def get_marks() -> Iterable[dict[str, Any]]:
-    conn = get_connection()
     try:
-        cur = conn.cursor()
-        sql_marks = """
-            SELECT 
-            * 
-            FROM marks as m
-        """
-        cur.execute(sql_marks)
-        columns = [desc[0] for desc in cur.description]
-        marks = [dict(zip(columns, row)) for row in cur.fetchall()]
-        return marks
+        return reference_cache.get_marks()
     except Exception as e:
         print(f"Error al Buscar Marcas: {e}")
         return []
-    finally:
-        close_connection(conn)
 
 def get_stores() -> Iterable[dict[str, Any]]:
-    conn = get_connection()
     try:
-        cur = conn.cursor()
-        sql_stores = """
-            SELECT 
-            * 
-            FROM store as s
-        """
-        cur.execute(sql_stores)
-        columns = [desc[0] for desc in cur.description]
-        stores = [dict(zip(columns, row)) for row in cur.fetchall()]
-        return stores
+        return reference_cache.get_stores()
     except Exception as e:
         print(f"Error al Buscar Tiendas: {e}")
         return []
-    finally:
-        close_connection(conn)
 
 def get_coins():
-    conn = get_connection()
     try:
-        cur = conn.cursor()
-        sql_coins = """
-            SELECT 
-            * 
-            FROM coin as c
-        """
-        cur.execute(sql_coins)
-        columns = [desc[0] for desc in cur.description]
-        coins = [dict(zip(columns, row)) for row in cur.fetchall()]
-        return coins
+        return reference_cache.get_coins()
     except Exception as e:
         print(f"Error al Buscar Monedas: {e}")
         return []
-    finally:
-        close_connection(conn)
 
 
 # obtiene moneda por defecto
-def get_default_coin() -> str:    
-    conn = get_connection()
+def get_default_coin() -> str:
     try:
-        cur = conn.cursor()
-        sql = "select system_value from system_properties where code = 65"
-        cur.execute(sql)
-        row = cur.fetchone()
-
-        if row and row[0]:
-            return row[0]  # Asumiendo que el código de moneda está en la primera columna
-        return "02"  # Retorna '02' como moneda por defecto si no se encuentra ninguna
-
+        return reference_cache.get_default_coin()
     except Exception as e:
         print(f"Error fetching default coin: {e}")
         return "02"
-    finally:
-        close_connection(conn)
 
 
 
@@ -460,7 +401,68 @@ def update_minmax_product_failure(
         close_connection(conn)
 
 
+# calcula en una sola consulta la diferencia por producto entre lo enviado, lo contado
+# en recepción y la existencia actual en el depósito destino del TRANSFER
+def get_reception_discrepancies(correlative: int, counts: dict[str, float]) -> list[dict[str, Any]]:
+    """Devuelve una fila por producto del TRANSFER con las columnas:
+    code_product, description_product, unit_description, ordered, counted,
+    destination_stock, variance (counted - ordered) y status ('ok', 'faltante', 'sobrante').
+
+    Los conteos viajan como dos arreglos paralelos (códigos y cantidades) y se cruzan
+    con los detalles en el servidor, sin recorrer las líneas en Python.
+    """
+    codes = [str(code) for code in counts.keys()]
+    counted = []
+    for code in codes:
+        try:
+            counted.append(float(counts.get(code) or 0))
+        except (TypeError, ValueError):
+            counted.append(0.0)
+
+    sql = """
+        SELECT
+            x.code_product,
+            x.description_product,
+            x.unit_description,
+            x.ordered,
+            x.counted,
+            x.destination_stock,
+            x.counted - x.ordered AS variance,
+            CASE
+                WHEN abs(x.counted - x.ordered) <= 1e-9 THEN 'ok'
+                WHEN x.counted < x.ordered THEN 'faltante'
+                ELSE 'sobrante'
+            END AS status
+        FROM (
+            SELECT
+                iod.code_product,
+                MAX(iod.description_product) AS description_product,
+                MAX(u.description) AS unit_description,
+                SUM(COALESCE(iod.amount, 0))::float8 AS ordered,
+                COALESCE(MAX(c.counted), 0)::float8 AS counted,
+                COALESCE(MAX(ps.stock), 0)::float8 AS destination_stock
+            FROM inventory_operation_details AS iod
+            JOIN inventory_operation AS io ON io.correlative = iod.main_correlative
+            LEFT JOIN unnest(%s::varchar[], %s::float8[]) AS c(code_product, counted)
+                ON c.code_product = iod.code_product
+            LEFT JOIN products_stock AS ps
+                ON ps.product_code = iod.code_product AND ps.store = io.destination_store
+            LEFT JOIN products_units AS pu ON iod.unit = pu.correlative
+            LEFT JOIN units AS u ON u.code = pu.unit
+            WHERE iod.main_correlative = %s
+            GROUP BY iod.code_product
+        ) AS x
+        ORDER BY abs(x.counted - x.ordered) DESC, x.code_product;
+    """
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, (codes, counted, correlative))
+        columns = [desc[0] for desc in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
 __all__ = [
+    "get_reception_discrepancies",
     "save_inventory_operation_header",
     "get_product_s_for_order_collection",
     "get_departments",
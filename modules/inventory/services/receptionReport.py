@@ -0,0 +1,138 @@
+"""Reporte de diferencias de recepción de traslados (TRANSFER).
+
+Calcula, con una sola consulta, la variación por producto entre lo enviado,
+lo contado en recepción y la existencia en el depósito destino, y guarda el
+resultado en memoria por (correlativo, versión). La versión es un hash de los
+conteos recibidos y de las filas que devolvió esa consulta (detalle del
+traslado y existencia destino): si el traslado se edita o la existencia cambia,
+la misma lista de conteos da una versión nueva. Revisar un reporte ya generado
+(JSON o PDF por versión) no vuelve a consultar la base de datos.
+"""
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from modules.inventory.services.inventoryDb import get_reception_discrepancies
+
+# cantidad máxima de reportes guardados en memoria (LRU)
+MAX_CACHED_REPORTS = int(os.environ.get("REPOSTOCK_RECEPTION_REPORTS_CACHE", "200"))
+
+_lock = threading.Lock()
+_reports: "OrderedDict[tuple[int, str], dict[str, Any]]" = OrderedDict()
+_latest_version: dict[int, str] = {}
+
+
+def counts_version(counts: dict[str, Any]) -> str:
+    """Hash estable de un mapa de conteos {codigo: cantidad}."""
+    normalized = {}
+    for code, value in (counts or {}).items():
+        try:
+            normalized[str(code)] = round(float(value or 0), 6)
+        except (TypeError, ValueError):
+            normalized[str(code)] = 0.0
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def report_version(counts: dict[str, Any], lines: list[dict[str, Any]]) -> str:
+    """Hash de los conteos y de los datos leídos (detalle del traslado y existencia destino)."""
+    payload = json.dumps(
+        [counts_version(counts), lines], sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _summarize(lines: list[dict[str, Any]]) -> dict[str, Any]:
+    summary = {
+        "lines": len(lines),
+        "lines_with_difference": 0,
+        "ordered_total": 0.0,
+        "counted_total": 0.0,
+        "shortage_total": 0.0,
+        "surplus_total": 0.0,
+    }
+    for line in lines:
+        summary["ordered_total"] += line["ordered"] or 0.0
+        summary["counted_total"] += line["counted"] or 0.0
+        if line["status"] == "faltante":
+            summary["lines_with_difference"] += 1
+            summary["shortage_total"] += -line["variance"]
+        elif line["status"] == "sobrante":
+            summary["lines_with_difference"] += 1
+            summary["surplus_total"] += line["variance"]
+    for key in ("ordered_total", "counted_total", "shortage_total", "surplus_total"):
+        summary[key] = round(summary[key], 3)
+    return summary
+
+
+def build_reception_report(
+    correlative: int, counts: dict[str, Any], header: Optional[dict[str, Any]] = None
+) -> dict[str, Any]:
+    """Devuelve el reporte de diferencias para los conteos dados.
+
+    Siempre lee los datos actuales; si ya hay un reporte con la misma versión
+    (mismos conteos y mismos datos) se reutiliza, con su `generated_at`.
+    """
+    lines = get_reception_discrepancies(correlative, counts or {})
+    version = report_version(counts, lines)
+    key = (correlative, version)
+    with _lock:
+        cached = _reports.get(key)
+        if cached is not None:
+            _reports.move_to_end(key)
+            _latest_version[correlative] = version
+            return cached
+
+    summary = _summarize(lines)
+    header = header or {}
+    report = {
+        "correlative": correlative,
+        "version": version,
+        "document_no": header.get("document_no"),
+        "emission_date": header.get("emission_date"),
+        "origin_store": header.get("store"),
+        "origin_store_description": header.get("origin_store_description"),
+        "destination_store": header.get("destination_store"),
+        "destination_store_description": header.get("destination_store_description"),
+        "generated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "differences": summary["lines_with_difference"] > 0,
+        "summary": summary,
+        "lines": lines,
+    }
+    with _lock:
+        _reports[key] = report
+        _reports.move_to_end(key)
+        _latest_version[correlative] = version
+        while len(_reports) > MAX_CACHED_REPORTS:
+            (old_corr, old_version), _ = _reports.popitem(last=False)
+            if _latest_version.get(old_corr) == old_version:
+                _latest_version.pop(old_corr, None)
+    return report
+
+
+def get_cached_reception_report(
+    correlative: int, version: Optional[str] = None
+) -> Optional[dict[str, Any]]:
+    """Devuelve el reporte guardado para el correlativo (la última versión si no se indica)."""
+    with _lock:
+        version = version or _latest_version.get(correlative)
+        if not version:
+            return None
+        report = _reports.get((correlative, version))
+        if report is not None:
+            _reports.move_to_end((correlative, version))
+        return report
+
+
+__all__ = [
+    "counts_version",
+    "report_version",
+    "build_reception_report",
+    "get_cached_reception_report",
+]
@@ -1,51 +1,81 @@
 import datetime
 import os
-import sys
-from flask import (Blueprint, render_template, render_template_string, request, redirect, url_for, session)
-import pdfkit
+from flask import (Blueprint, Response, jsonify, render_template, request, redirect, stream_with_context, url_for, session)
 
 
-from db import delete_inventory_operation_by_correlative, get_inventory_operations, get_inventory_operations_by_correlative, get_inventory_operations_details_by_correlative
+from jinja2 import TemplateNotFound
+
+from reporting import PdfRenderError, pdf_bytes_response, pdf_error_response, send_cached_pdf
+from reporting.batch import PDF_MERGE_MAX, iter_file, iter_pdfs, merge_pdfs, stream_zip
+from reporting.collection import collection_order_job
+from reporting.native import ENGINE_NATIVE, ENGINE_WKHTMLTOPDF, get_engine, render_collection_orders
+from reporting.templates import get_report_template
+from db import delete_inventory_operation_by_correlative, delete_inventory_operations_by_correlatives, get_inventory_operations_by_correlative, get_inventory_operations_details_by_correlative, get_inventory_operations_for_print, get_inventory_operations_page, get_stores, update_description_inventory_operations_by_correlatives, update_inventory_operations_type_by_correlatives
 
 manager_bp = Blueprint('manager', __name__, url_prefix='/manager')
 
 manager_bp.template_folder = os.path.join(os.path.dirname(__file__), 'templates')
 
-WKHTMLTOPDF_BIN = os.environ.get("WKHTMLTOPDF_BIN")
-if not WKHTMLTOPDF_BIN:
-    # rutas típicas de instalación
-    possibles = [
-        r"C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
-        r"C:\\Program Files (x86)\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
-    ]
-    for p in possibles:
-        if os.path.exists(p):
-            WKHTMLTOPDF_BIN = p
-            break
-
-
-def get_pdfkit_config():
-    if pdfkit is None:
-        return None
-    if not WKHTMLTOPDF_BIN or not os.path.exists(WKHTMLTOPDF_BIN):
-        return None
-    try:
-        return pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_BIN)
-    except Exception:
-        return None
+# máximo de órdenes por exportación en lote
+PDF_BATCH_MAX = int(os.environ.get("REPOSTOCK_PDF_BATCH_MAX", "200"))
+
 
+def _document_filters_from_request():
+    """Lee filtros y cursor de paginación desde la querystring."""
+    args = request.args
+    return {
+        "limit": args.get("limit", default=50, type=int),
+        # '' es un cursor válido (documento sin número); None es la primera página
+        "after_document_no": args.get("after_document_no"),
+        "after_correlative": args.get("after_correlative", default=None, type=int),
+        "date_from": args.get("date_from") or None,
+        "date_to": args.get("date_to") or None,
+        "store": args.get("store") or None,
+        "destination_store": args.get("destination_store") or None,
+        "user_code": (args.get("user_code") or "").strip().upper() or None,
+        "q": (args.get("q") or "").strip() or None,
+    }
 
-if getattr(sys, "frozen", False):
-    base_path = sys._MEIPASS
-else:
-    base_path = os.path.dirname(os.path.abspath(__file__))
-#ruta de temp
 
 @manager_bp.route("/")
 def document_manager():
-    inventory_operations = get_inventory_operations()
-    print("Inventory Operations:", inventory_operations[0])
-    return render_template("document_manager.html", inventory_operations=inventory_operations)
+    filters = _document_filters_from_request()
+    try:
+        page = get_inventory_operations_page(**filters)
+    except Exception as e:
+        print(f"Error consultando operaciones de inventario: {e}")
+        page = {"items": [], "next_cursor": None}
+    try:
+        stores = get_stores()
+    except Exception as e:
+        print(f"Error consultando depósitos: {e}")
+        stores = []
+    # filtros activos (sin cursor) para construir el enlace a la siguiente página
+    active_filters = {
+        k: v
+        for k, v in filters.items()
+        if v and k not in ("after_document_no", "after_correlative")
+    }
+    return render_template(
+        "document_manager.html",
+        inventory_operations=page["items"],
+        next_cursor=page["next_cursor"],
+        filters=active_filters,
+        stores=stores,
+    )
+
+
+@manager_bp.route("/api/documents", methods=["GET"])
+def api_documents():
+    """Devuelve una página de operaciones de inventario (JSON) con cursor para la siguiente."""
+    filters = _document_filters_from_request()
+    try:
+        page = get_inventory_operations_page(**filters)
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    return jsonify(
+        {"ok": True, "items": page["items"], "next_cursor": page["next_cursor"]}
+    )
 
 
 @manager_bp.route("/document_manager/delete", methods=["POST"])
@@ -62,6 +92,75 @@ def delete_inventory_operation():
     return redirect(url_for("manager.document_manager"))
 
 
+@manager_bp.route("/document_manager/bulk", methods=["POST"])
+def bulk_inventory_operations():
+    """Aplica una acción en bloque sobre varios correlativos.
+
+    Acepta form (desde la lista) o JSON con:
+      - action: "delete" | "change_type" | "update_description"
+      - correlatives: lista de correlativos (con JSON debe ser una lista; si no, 400)
+      - new_operation_type (change_type), description (update_description/change_type)
+      - dry_run: si es verdadero solo retorna cuántas operaciones se afectarían
+    Con JSON responde JSON (400 si la petición es inválida, 500 si falla la base
+    de datos); con form vuelve a la lista.
+    """
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"ok": False, "error": "Se esperaba un objeto JSON"}), 400
+        correlatives = data.get("correlatives") or []
+        if not isinstance(correlatives, list):
+            return jsonify({"ok": False, "error": "correlatives debe ser una lista"}), 400
+    else:
+        data = request.form
+        correlatives = request.form.getlist("correlatives")
+    action = (data.get("action") or "").strip()
+    dry_run = str(data.get("dry_run") or "").lower() in ("1", "true", "yes", "y")
+    description = data.get("description")
+    if isinstance(description, str):
+        description = description.strip() or None
+
+    error = None
+    status = 400
+    affected = 0
+    try:
+        if action == "delete":
+            affected = delete_inventory_operations_by_correlatives(
+                correlatives, dry_run=dry_run
+            )
+        elif action == "change_type":
+            new_operation_type = (data.get("new_operation_type") or "").strip().upper()
+            if not new_operation_type:
+                error = "Falta new_operation_type"
+            else:
+                affected = update_inventory_operations_type_by_correlatives(
+                    correlatives, new_operation_type, description, dry_run=dry_run
+                )
+        elif action == "update_description":
+            if description is None:
+                error = "Falta description"
+            else:
+                affected = update_description_inventory_operations_by_correlatives(
+                    correlatives, description, dry_run=dry_run
+                )
+        else:
+            error = "Acción no válida"
+    except Exception as e:
+        print(f"No se pudo aplicar la acción '{action}' en bloque: {e}")
+        error = str(e)
+        status = 500
+
+    if request.is_json:
+        if error:
+            return jsonify({"ok": False, "error": error}), status
+        return jsonify(
+            {"ok": True, "action": action, "dry_run": dry_run, "affected": affected}
+        )
+    if error:
+        print(f"Acción en bloque rechazada: {error}")
+    return redirect(url_for("manager.document_manager"))
+
+
 @manager_bp.route("/collection/preview.pdf", methods=["POST", "GET"])
 def collection_preview_pdf():
     # Aceptar parámetros por POST (form) o GET (querystring)
@@ -98,52 +197,109 @@ def collection_preview_pdf():
     except Exception as e:
         return f"Error consultando datos de la orden: {e}", 500
 
-    # Cargar reporte desde carpeta reports/ y renderizar con Jinja
-    report_path = os.path.join(base_path, "reports", "report_collection_order.html")
-    if not os.path.exists(report_path):
+    # Plantilla compilada desde reports/ (se recarga solo si cambia el archivo)
+    try:
+        report_template = get_report_template("report_collection_order.html", "manager")
+    except TemplateNotFound:
         return (
             "No se encontró el reporte report_collection_order.html en la carpeta reports.",
             500,
         )
-    try:
-        with open(report_path, "r", encoding="utf-8") as f:
-            report_template = f.read()
     except Exception as e:
         return f"No se pudo leer el reporte: {e}", 500
 
-    # Contexto para el reporte
-    context = {
-        "header": header,
-        "details": details,
-        "generated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    }
-    html = render_template_string(report_template, **context)
-
-    if pdfkit is None:
-        return "pdfkit no está instalado en el entorno de Python.", 500
-
-    config = get_pdfkit_config()
-    if not config:
-        return "wkhtmltopdf no está configurado o no se encuentra el ejecutable.", 500
-
-    options = {
-        "page-size": "A4",
-        "encoding": "UTF-8",
-        "margin-top": "10mm",
-        "margin-bottom": "10mm",
-        "margin-left": "10mm",
-        "margin-right": "10mm",
-    }
+    engine = get_engine("collection_order", request.values.get("engine"))
+    cache_key, build_html, build_native = collection_order_job(
+        report_template, header, details, engine
+    )
+    return send_cached_pdf(
+        cache_key, build_html, "orden_recoleccion_preview.pdf", build_native=build_native
+    )
+
+
+@manager_bp.route("/collection/batch", methods=["GET", "POST"])
+def collection_batch_pdf():
+    """Exporta varias órdenes de recolección en un solo PDF o en un ZIP.
+
+    Parámetros (form o querystring):
+      - correlatives: lista (o separada por comas); si no se envía se usan los
+        filtros del administrador (q, date_from, date_to, store, ...)
+      - format: "pdf" (un documento con todas las órdenes) o "zip" (un PDF por orden)
+    Los encabezados y detalles se consultan en lote y los PDF se generan en el
+    pool compartido; el ZIP se envía por partes.
+    """
+    values = request.values
+    output = (values.get("format") or "pdf").lower()
+    correlatives = values.getlist("correlatives")
+    if len(correlatives) == 1 and "," in correlatives[0]:
+        correlatives = [c.strip() for c in correlatives[0].split(",")]
+    correlatives = [c for c in correlatives if str(c).strip()]
+
     try:
-        pdf = pdfkit.from_string(html, False, configuration=config, options=options)
+        if not correlatives:
+            filters = _document_filters_from_request()
+            filters["limit"] = PDF_BATCH_MAX
+            filters["after_document_no"] = filters["after_correlative"] = None
+            page = get_inventory_operations_page(**filters)
+            correlatives = [op["correlative"] for op in page["items"]]
+        orders = get_inventory_operations_for_print(correlatives[:PDF_BATCH_MAX])
     except Exception as e:
-        return f"Error generando PDF: {e}", 500
+        return f"Error consultando datos de las órdenes: {e}", 500
+    if not orders:
+        return "No se encontraron órdenes para exportar.", 404
 
-    from flask import make_response
+    try:
+        report_template = get_report_template("report_collection_order.html", "manager")
+    except Exception as e:
+        return f"No se pudo leer el reporte: {e}", 500
+
+    engine = get_engine("collection_order", values.get("engine"))
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    if engine == ENGINE_NATIVE and output != "zip":
+        # el generador nativo arma todas las órdenes en un solo documento
+        try:
+            generated_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            pdf = render_collection_orders(orders, generated_at)
+            return pdf_bytes_response(pdf, f"ordenes_recoleccion_{stamp}.pdf")
+        except Exception as e:
+            print(f"Error en el generador de PDF nativo, se usa wkhtmltopdf: {e}")
+            engine = ENGINE_WKHTMLTOPDF
+
+    jobs = []
+    for order in orders:
+        header = order["header"]
+        cache_key, build_html, build_native = collection_order_job(
+            report_template, header, order["details"], engine
+        )
+        name = f"orden_recoleccion_{header.get('document_no') or header.get('correlative')}.pdf"
+        jobs.append((name, cache_key, build_html, build_native))
 
-    resp = make_response(pdf)
-    resp.headers["Content-Type"] = "application/pdf"
-    resp.headers["Content-Disposition"] = (
-        'inline; filename="orden_recoleccion_preview.pdf"'
+    if output == "zip":
+        return Response(
+            stream_with_context(stream_zip(iter_pdfs(jobs))),
+            mimetype="application/zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="ordenes_recoleccion_{stamp}.zip"'
+            },
+        )
+
+    if len(jobs) > PDF_MERGE_MAX:
+        return (
+            f"Demasiadas órdenes para un solo PDF ({len(jobs)}, máximo {PDF_MERGE_MAX}); use format=zip.",
+            413,
+        )
+    try:
+        merged = merge_pdfs(jobs)
+    except PdfRenderError as e:
+        return pdf_error_response(e)
+    merged.seek(0, os.SEEK_END)
+    size = merged.tell()
+    merged.seek(0)
+    return Response(
+        stream_with_context(iter_file(merged)),
+        mimetype="application/pdf",
+        headers={
+            "Content-Disposition": f'inline; filename="ordenes_recoleccion_{stamp}.pdf"',
+            "Content-Length": str(size),
+        },
     )
-    return resp
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
 import db
+from modules.sales.services import budgetEngine, priceList
 
 sales_bp = Blueprint(
     "sales", __name__, template_folder="./templates", url_prefix="/sales"
@@ -18,37 +19,92 @@ def product_search_modal():
 
 @sales_bp.route("/api/products/search", methods=["GET"])
 def api_products_search():
+    """Productos con stock (consulta paginada) y precios de la lista en memoria.
+
+    `coin` elige la moneda de los precios (por defecto la del sistema).
+    """
     q = (request.args.get("q") or "").strip()
+    if q == "*":
+        q = ""
+    try:
+        limit = max(1, min(int(request.args.get("limit") or 50), 200))
+        offset = max(0, int(request.args.get("offset") or 0))
+    except ValueError:
+        limit, offset = 50, 0
     try:
-        rows = db.search_products_with_stock_and_price(q) or []
-        return jsonify({"ok": True, "items": rows})
+        page = db.search_products_with_stock_and_price(q, limit=limit, offset=offset)
+        price_list = priceList.get_price_list(request.args.get("coin"))
+        items = []
+        for row in page["items"]:
+            prices = price_list.get(row.get("code")) or {}
+            item = dict(row)
+            item.update({k: prices.get(k) for k in priceList.PRICE_FIELDS})
+            item["net_price"] = prices.get("net_price")
+            item["unit_correlative"] = prices.get("unit_correlative")
+            item["stock"] = float(row.get("total_stock") or 0)
+            items.append(item)
+        return jsonify({
+            "ok": True,
+            "items": items,
+            "total": page["total"],
+            "coin": price_list.coin,
+            "price_list_version": price_list.version,
+        })
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
 @sales_bp.route("/api/budget/add_item", methods=["POST"])
 def api_budget_add_item():
-    code = request.form.get("code") or ""
-    item_get_db = g
-    description = request.form.get("description") or ""
-    unit_description = request.form.get("unit_description") or ""
-    unit_correlative = request.form.get("unit_correlative") or ""
+    """Valora una línea con el motor de presupuestos (precio calculado en el servidor)."""
+    line = {
+        "code": request.form.get("code") or "",
+        "unit_correlative": request.form.get("unit_correlative") or None,
+        "quantity": request.form.get("quantity") or 1,
+    }
     try:
-        offer_price = float(request.form.get("offer_price") or 0)
-        quantity = float(request.form.get("quantity") or 1)
-    except ValueError:
-        offer_price = 0.0
-        quantity = 1.0
+        result = budgetEngine.evaluate_budget([line], coin=request.form.get("coin"))
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    if not result["lines"]:
+        error = result["errors"][0]["error"] if result["errors"] else "Producto no encontrado"
+        return jsonify({"ok": False, "error": error}), 404
+    valued = result["lines"][0]
     item = {
-        "code": code,
-        "description": "description",
-        "unit_description": unit_description,
-        "unit_correlative": unit_correlative,
-        "offer_price": offer_price,
-        "quantity": quantity,
-        "subtotal": round(offer_price * quantity, 2),
+        "code": valued["code"],
+        "description": valued["description"],
+        "unit_description": valued["unit_description"],
+        "unit_correlative": valued["unit_correlative"],
+        "offer_price": valued["unit_price"],
+        "quantity": valued["quantity"],
+        "subtotal": valued["total"],
     }
-    return jsonify({"ok": True, "item": item})
+    return jsonify({"ok": True, "item": item, "coin": result["coin"]})
+
+
+@sales_bp.route("/api/budget/evaluate", methods=["POST"])
+def api_budget_evaluate():
+    """Valora el presupuesto completo en una sola petición.
+
+    JSON: {"client": "...", "coin": "02", "price_field": "offer_price",
+           "lines": [{"code": "...", "unit_correlative": 1, "quantity": 2}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    lines = data.get("lines")
+    if not isinstance(lines, list):
+        return jsonify({"ok": False, "error": "Se esperaba 'lines' como lista"}), 400
+    try:
+        result = budgetEngine.evaluate_budget(
+            lines,
+            coin=data.get("coin"),
+            client=data.get("client"),
+            price_field=data.get("price_field") or "offer_price",
+        )
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    return jsonify({"ok": True, **result})
 
 
 @sales_bp.route("/clients-search-modal", methods=["GET"])
@@ -58,11 +114,21 @@ def clients_search_modal():
 
 @sales_bp.route("/api/clients/search", methods=["GET"])
 def api_clients_search():
-    q = (request.args.get("q") or "").strip().lower()
+    """Busca clientes (código, nombre o RIF) por páginas.
+
+    Parámetros: q, limit y el cursor after_description/after_code que devuelve
+    la página anterior en `next_cursor`.
+    """
+    args = request.args
+    q = (args.get("q") or "").strip()
     try:
-        items = db.get_clients() or []
-      
-        return jsonify({"ok": True, "items": items})
+        page = db.search_clients(
+            q=q,
+            limit=args.get("limit") or 50,
+            after_description=args.get("after_description"),
+            after_code=args.get("after_code"),
+        )
+        return jsonify({"ok": True, "items": page["items"], "next_cursor": page["next_cursor"]})
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
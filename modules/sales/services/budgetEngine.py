@@ -0,0 +1,191 @@
+"""Cálculo de presupuestos de venta en el servidor.
+
+Recibe el presupuesto completo (cliente, moneda y líneas con código, unidad y
+cantidad) y resuelve precios, impuestos y conversión de moneda de todas las
+líneas con una sola consulta (`products` + `products_units` + `taxes` filtrado
+por `product_code = ANY(...)`); el resto es aritmética en Python sobre las filas.
+
+Por cada línea el precio unitario es el mismo que muestra la lista de precios
+(modules.sales.services.priceList): precio de la unidad con impuesto, redondeado
+a `rounding_type` si el producto extrae el neto del precio con impuesto, y
+convertido con las tasas de venta vigentes. Del total de la línea se separan
+neto e impuesto, y los totales del presupuesto son la suma de las líneas.
+
+Las líneas que no se pueden valorar (código inexistente o inactivo, unidad que
+no pertenece al producto, cantidad inválida, NaN o infinita) van en `errors`
+y no suman.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Iterable, Optional
+
+from rounding import round_half_up
+
+from . import priceList
+
+_LINES_SQL = """
+    SELECT
+        p.code,
+        p.description,
+        p.coin,
+        p.rounding_type,
+        p.extract_net_from_unit_price_plus_tax AS extract_net,
+        t.aliquot AS tax_aliquot,
+        pu.correlative AS unit_correlative,
+        pu.main_unit,
+        pu.conversion_factor,
+        pu.offer_price,
+        pu.minimum_price,
+        pu.higher_price,
+        pu.maximum_price,
+        u.description AS unit_description
+    FROM products p
+    JOIN products_units pu ON pu.product_code = p.code
+    JOIN taxes t ON t.code = p.sale_tax
+    LEFT JOIN units u ON u.code = pu.unit
+    WHERE p.code = ANY(%s)
+      AND p.status = '01'
+"""
+
+
+def _float(value: Any, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def normalize_lines(lines: Iterable[dict]) -> list[dict]:
+    """Líneas con code (str), unit_correlative (str o None) y quantity (float; -1 si no es válida)."""
+    result = []
+    for position, line in enumerate(lines or [], start=1):
+        line = line or {}
+        unit = line.get("unit_correlative", line.get("unit"))
+        # NaN/infinito se tratan como cantidad inválida (y no llegan al JSON)
+        quantity = _float(line.get("quantity"), default=-1.0)
+        result.append({
+            "line": position,
+            "code": str(line.get("code") or "").strip(),
+            "unit_correlative": str(unit).strip() if unit not in (None, "") else None,
+            "quantity": quantity if math.isfinite(quantity) else -1.0,
+        })
+    return result
+
+
+def index_units(rows: Iterable[dict]) -> dict[tuple, dict]:
+    """(código, correlativo) -> fila, y (código, None) -> unidad principal."""
+    index = {}
+    for r in rows:
+        code = str(r.get("code")).strip()
+        index[(code, str(r.get("unit_correlative")).strip())] = r
+        if r.get("main_unit"):
+            index[(code, None)] = r
+    return index
+
+
+def compute(lines: list[dict], units: dict[tuple, dict], rates: dict[str, float],
+            coin: str, price_field: str = "offer_price") -> dict:
+    """Valora `lines` (ya normalizadas) con las unidades indexadas y las tasas dadas."""
+    if price_field not in priceList.PRICE_FIELDS:
+        raise ValueError(f"Precio desconocido: {price_field}")
+
+    # factor de conversión por moneda de origen, calculado una vez
+    factors: dict[str, Optional[float]] = {}
+    for row in units.values():
+        source = str(row.get("coin") or "").strip()
+        if source not in factors:
+            factors[source] = priceList.convert(1.0, source, coin, rates)
+
+    valued, errors = [], []
+    for line in lines:
+        row = units.get((line["code"], line["unit_correlative"]))
+        if not line["code"] or row is None:
+            errors.append({**line, "error": "Producto o unidad no encontrada"})
+            continue
+        if not math.isfinite(line["quantity"]) or line["quantity"] <= 0:
+            errors.append({**line, "error": "Cantidad inválida"})
+            continue
+        factor = factors.get(str(row.get("coin") or "").strip())
+        if factor is None:
+            errors.append({**line, "error": f"Sin tasa de cambio para la moneda {row.get('coin')}"})
+            continue
+        valued.append((line, row, factor))
+
+    # aritmética por columnas sobre las líneas válidas
+    aliquots = [_float(r.get("tax_aliquot")) for _l, r, _f in valued]
+    gross = [_float(r.get(price_field)) * (1 + a / 100) for (_l, r, _f), a in zip(valued, aliquots)]
+    for i, (_line, row, _factor) in enumerate(valued):
+        if row.get("extract_net"):
+            digits = int(row["rounding_type"]) if row.get("rounding_type") is not None else 2
+            gross[i] = round_half_up(gross[i], digits)
+    unit_prices = [round_half_up(g * f, 2) for g, (_l, _r, f) in zip(gross, valued)]
+    totals = [round_half_up(p * l["quantity"], 2) for p, (l, _r, _f) in zip(unit_prices, valued)]
+    nets = [round_half_up(t / (1 + a / 100), 2) for t, a in zip(totals, aliquots)]
+
+    result_lines = []
+    for i, (line, row, _factor) in enumerate(valued):
+        result_lines.append({
+            "line": line["line"],
+            "code": row.get("code"),
+            "description": row.get("description"),
+            "unit_correlative": row.get("unit_correlative"),
+            "unit_description": row.get("unit_description"),
+            "quantity": line["quantity"],
+            "tax_aliquot": aliquots[i],
+            "unit_price": unit_prices[i],
+            "net": nets[i],
+            "tax": round_half_up(totals[i] - nets[i], 2),
+            "total": totals[i],
+        })
+
+    return {
+        "coin": coin,
+        "price_field": price_field,
+        "lines": result_lines,
+        "errors": errors,
+        "totals": {
+            "lines": len(result_lines),
+            "net": round_half_up(sum(nets), 2),
+            "tax": round_half_up(sum(totals) - sum(nets), 2),
+            "total": round_half_up(sum(totals), 2),
+        },
+    }
+
+
+def _fetch_units(codes: list[str]) -> list[dict]:
+    from database import close_connection, get_connection
+
+    if not codes:
+        return []
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(_LINES_SQL, (codes,))
+        columns = [desc[0] for desc in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        close_connection(conn)
+
+
+def evaluate_budget(lines: Iterable[dict], coin: Optional[str] = None,
+                    client: Optional[str] = None, price_field: str = "offer_price") -> dict:
+    """Valora un presupuesto completo. Retorna coin, client, lines, errors y totals."""
+    normalized = normalize_lines(lines)
+    codes = sorted({line["code"] for line in normalized if line["code"]})
+    if not coin:
+        from database import reference_cache
+
+        coin = reference_cache.get_default_coin()
+    coin = str(coin).strip()
+    result = compute(normalized, index_units(_fetch_units(codes)), priceList.current_rates(), coin, price_field)
+    result["client"] = (client or "").strip() or None
+    return result
+
+
+__all__ = [
+    "normalize_lines",
+    "index_units",
+    "compute",
+    "evaluate_budget",
+]
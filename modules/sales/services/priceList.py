@@ -0,0 +1,299 @@
+"""Lista de precios de venta por moneda, calculada en lote y guardada en memoria.
+
+Antes cada búsqueda de ventas llamaba a `convert_value_to_coin(...)` por fila
+dentro de un CASE y agrupaba todo el catálogo. Aquí se leen una sola vez las
+unidades principales de los productos activos y las tasas de la tabla `coin`,
+y en Python se calculan para cada moneda pedida:
+
+- precio neto (`net_price`, precio de oferta sin impuesto, en la moneda del producto)
+- precio con impuesto y redondeo (`offer_price`, `minimum_price`,
+  `higher_price`, `maximum_price`) convertido a la moneda pedida
+
+Conversión (equivalente a `convert_value_to_coin(..., 'SALES', ...)`):
+    valor * coin[origen].sales_aliquot / coin[destino].sales_aliquot
+Si el producto tiene `extract_net_from_unit_price_plus_tax`, el precio con
+impuesto se redondea a `rounding_type` decimales (mitad hacia arriba, ver
+rounding.round_half_up) antes de convertir.
+
+Cada lista lleva un número de versión. Como mucho cada
+REPOSTOCK_PRICE_LIST_CHECK segundos (por defecto 30) se compara una huella de
+tasas, alícuotas de impuesto y datos de los productos con la de la lista
+vigente; si cambió, se reconstruyen todas las monedas. `invalidate()` fuerza
+la reconstrucción (p. ej. al editar precios).
+
+Uso:
+    from modules.sales.services import priceList
+    prices = priceList.prices_for(["P001", "P002"], coin="02")
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+from rounding import round_half_up
+
+PRICE_LIST_CHECK_SECONDS = float(os.environ.get("REPOSTOCK_PRICE_LIST_CHECK", "30"))
+
+PRICE_FIELDS = ("offer_price", "minimum_price", "higher_price", "maximum_price")
+
+_ROWS_SQL = """
+    SELECT
+        p.code,
+        p.description,
+        p.mark,
+        p.model,
+        p.coin,
+        p.rounding_type,
+        p.extract_net_from_unit_price_plus_tax AS extract_net,
+        t.aliquot AS tax_aliquot,
+        pu.offer_price,
+        pu.minimum_price,
+        pu.higher_price,
+        pu.maximum_price,
+        pu.correlative AS unit_correlative,
+        u.description AS unit_description
+    FROM products p
+    JOIN products_units pu ON pu.product_code = p.code AND pu.main_unit
+    JOIN taxes t ON t.code = p.sale_tax
+    LEFT JOIN units u ON u.code = pu.unit
+    WHERE p.status = '01'
+      AND p.code <> 'SERVGAST'
+      AND p.product_type IN ('T', 'S')
+    ORDER BY p.description
+"""
+
+# huella barata: cambia si cambia alguna tasa, la alícuota de algún impuesto o
+# cualquier columna que lee _ROWS_SQL de los productos activos y su unidad principal
+_FINGERPRINT_SQL = """
+    SELECT
+        (SELECT COALESCE(string_agg(code || '=' || COALESCE(sales_aliquot::text, ''), ',' ORDER BY code), '')
+           FROM coin) AS rates,
+        (SELECT COUNT(*) || ':' || COALESCE(SUM(hashtext(ROW(
+                    p.code, p.description, p.mark, p.model, p.coin, p.product_type, p.rounding_type,
+                    p.extract_net_from_unit_price_plus_tax, p.sale_tax, t.aliquot,
+                    pu.correlative, pu.unit, u.description,
+                    pu.offer_price, pu.minimum_price, pu.higher_price, pu.maximum_price
+                )::text)::bigint), 0)
+           FROM products p
+           JOIN products_units pu ON pu.product_code = p.code AND pu.main_unit
+           LEFT JOIN taxes t ON t.code = p.sale_tax
+           LEFT JOIN units u ON u.code = pu.unit
+          WHERE p.status = '01') AS prices
+"""
+
+
+def _fetch(sql: str) -> list[dict]:
+    # importación diferida: el cálculo (build_entries) se puede usar sin base de datos
+    from database import close_connection, get_connection
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql)
+        columns = [desc[0] for desc in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        close_connection(conn)
+
+
+def _load_rates() -> dict[str, float]:
+    rates = {}
+    for r in _fetch("SELECT code, sales_aliquot FROM coin"):
+        try:
+            rates[str(r["code"]).strip()] = float(r["sales_aliquot"] or 0)
+        except (TypeError, ValueError):
+            rates[str(r["code"]).strip()] = 0.0
+    return rates
+
+
+def _load_fingerprint() -> tuple:
+    row = _fetch(_FINGERPRINT_SQL)[0]
+    return (row["rates"], row["prices"])
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def convert(value: float, from_coin: str, to_coin: str, rates: dict[str, float]) -> Optional[float]:
+    """Convierte `value` entre monedas con las tasas de venta; None si falta una tasa."""
+    from_coin = str(from_coin or "").strip()
+    to_coin = str(to_coin or "").strip()
+    if from_coin == to_coin:
+        return value
+    from_rate = rates.get(from_coin)
+    to_rate = rates.get(to_coin)
+    if not from_rate or not to_rate:
+        return None
+    return value * from_rate / to_rate
+
+
+def build_entries(rows: Iterable[dict], rates: dict[str, float], coin: str) -> dict[str, dict]:
+    """Calcula los precios de venta de `rows` en la moneda `coin` (código -> precios)."""
+    entries = {}
+    for r in rows:
+        aliquot = _float(r.get("tax_aliquot"))
+        digits = int(r["rounding_type"]) if r.get("rounding_type") is not None else 2
+        extract_net = bool(r.get("extract_net"))
+        entry = {
+            "code": r.get("code"),
+            "description": r.get("description"),
+            "mark": r.get("mark"),
+            "model": r.get("model"),
+            "coin": coin,
+            "unit_description": r.get("unit_description"),
+            "unit_correlative": r.get("unit_correlative"),
+            "tax_aliquot": aliquot,
+            "net_price": round_half_up(_float(r.get("offer_price")), 4),
+        }
+        for field in PRICE_FIELDS:
+            gross = _float(r.get(field)) * (1 + aliquot / 100)
+            if extract_net:
+                gross = round_half_up(gross, digits)
+            converted = convert(gross, r.get("coin"), coin, rates)
+            entry[field] = round_half_up(converted, 2) if converted is not None else None
+        entries[str(r.get("code")).strip()] = entry
+    return entries
+
+
+class PriceList:
+    """Precios de una moneda en una versión dada (no se modifica una vez creada)."""
+
+    def __init__(self, coin: str, version: int, entries: dict[str, dict]):
+        self.coin = coin
+        self.version = version
+        self.entries = entries
+        self.built_at = time.time()
+
+    def get(self, code: str) -> Optional[dict]:
+        entry = self.entries.get(str(code or "").strip())
+        return dict(entry) if entry else None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+_state: dict[str, Any] = {
+    "version": 0,
+    "fingerprint": None,
+    "checked_at": 0.0,
+    "rows": None,
+    "rates": None,
+    "lists": {},  # moneda -> PriceList
+    "builds": 0,
+}
+
+
+def _default_coin() -> str:
+    from database import reference_cache
+
+    return reference_cache.get_default_coin()
+
+
+def _refresh_if_changed() -> None:
+    """Recarga filas y tasas si la huella cambió (o nunca se cargaron)."""
+    now = time.monotonic()
+    with _lock:
+        if _state["rows"] is not None and now - _state["checked_at"] < PRICE_LIST_CHECK_SECONDS:
+            return
+    with _build_lock:
+        with _lock:
+            if _state["rows"] is not None and now - _state["checked_at"] < PRICE_LIST_CHECK_SECONDS:
+                return
+        try:
+            fingerprint = _load_fingerprint()
+        except Exception as e:
+            if _state["rows"] is None:
+                raise
+            print(f"Error verificando la lista de precios, se usa la versión {_state['version']}: {e}")
+            with _lock:
+                _state["checked_at"] = now
+            return
+        if _state["rows"] is not None and fingerprint == _state["fingerprint"]:
+            with _lock:
+                _state["checked_at"] = now
+            return
+        rows = _fetch(_ROWS_SQL)
+        rates = _load_rates()
+        with _lock:
+            _state["rows"] = rows
+            _state["rates"] = rates
+            _state["fingerprint"] = fingerprint
+            _state["checked_at"] = now
+            _state["version"] += 1
+            _state["lists"] = {}
+
+
+def get_price_list(coin: Optional[str] = None) -> PriceList:
+    """Lista de precios vigente para `coin` (moneda por defecto si no se indica)."""
+    coin = str(coin or _default_coin()).strip()
+    _refresh_if_changed()
+    with _lock:
+        current = _state["lists"].get(coin)
+        if current is not None:
+            return current
+        rows, rates, version = _state["rows"], _state["rates"], _state["version"]
+    price_list = PriceList(coin, version, build_entries(rows, rates, coin))
+    with _lock:
+        # si otra petición recargó mientras se calculaba, no guardar una versión vieja
+        if _state["version"] == version:
+            _state["lists"].setdefault(coin, price_list)
+            _state["builds"] += 1
+    return price_list
+
+
+def current_rates() -> dict[str, float]:
+    """Tasas de venta (coin.sales_aliquot) de la versión vigente de la lista."""
+    _refresh_if_changed()
+    with _lock:
+        return dict(_state["rates"] or {})
+
+
+def prices_for(codes: Iterable[str], coin: Optional[str] = None) -> dict[str, dict]:
+    """Precios de los códigos indicados (los que no están activos no aparecen)."""
+    price_list = get_price_list(coin)
+    result = {}
+    for code in codes:
+        entry = price_list.get(code)
+        if entry is not None:
+            result[str(code).strip()] = entry
+    return result
+
+
+def invalidate() -> None:
+    """Descarta todas las listas; la próxima consulta vuelve a cargar precios y tasas."""
+    with _lock:
+        _state["rows"] = None
+        _state["fingerprint"] = None
+        _state["lists"] = {}
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        return {
+            "version": _state["version"],
+            "products": len(_state["rows"] or []),
+            "coins": {c: len(pl) for c, pl in _state["lists"].items()},
+            "builds": _state["builds"],
+            "check_seconds": PRICE_LIST_CHECK_SECONDS,
+        }
+
+
+__all__ = [
+    "PRICE_LIST_CHECK_SECONDS",
+    "PriceList",
+    "convert",
+    "build_entries",
+    "get_price_list",
+    "current_rates",
+    "prices_for",
+    "invalidate",
+    "stats",
+]
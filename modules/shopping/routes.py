@@ -1,5 +1,4 @@
-from flask import Blueprint, render_template, jsonify, request, send_file, session
-import io
+from flask import Blueprint, render_template, jsonify, request, session, redirect, url_for
 from datetime import date
 
 
@@ -7,31 +6,11 @@ from datetime import date
 
 
 
-import pdfkit
-import os
-
-# Configuración de wkhtmltopdf (Windows):
-WKHTMLTOPDF_BIN = os.environ.get("WKHTMLTOPDF_BIN")
-if not WKHTMLTOPDF_BIN:
-    possibles = [
-        r"C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
-        r"C:\\Program Files (x86)\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
-    ]
-    for p in possibles:
-        if os.path.exists(p):
-            WKHTMLTOPDF_BIN = p
-            break
-
-def get_pdfkit_config():
-    if pdfkit is None:
-        return None
-    if not WKHTMLTOPDF_BIN or not os.path.exists(WKHTMLTOPDF_BIN):
-        return None
-    try:
-        return pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_BIN)
-    except Exception:
-        return None
-
+from reporting import send_pdf, send_pdf_native
+from reporting.native import ENGINE_NATIVE, get_engine, render_shopping_operation
+from reporting.templates import render_report
+from images import THUMB_SIZES
+from images.primary import resolve_primary as resolve_primary_image
 
 from modules.shopping.services.schemas.product import Product
 from modules.shopping.services.schemas.product_codes import ProductCodes
@@ -39,17 +18,18 @@ from modules.shopping.services.schemas.product_units import ProductUnits
 from modules.shopping.services.schemas.set_shopping_operation import SetShoppingOperationData
 from modules.shopping.services.schemas.set_shopping_operation_details import SetShoppingOperationDetailData
 
+from modules.shopping.services import providerIndex, suggestions
 from modules.shopping.services.shoppingDb import (
     create_product_codes,
     create_product_units,
     get_default_coin,
     get_products_by_codes_list,
-    get_providers, 
     get_products_for_modal,
+    get_purchase_cadence_by_provider,
     get_product_stock_by_code,
     get_provider_by_code,
     get_product_by_code,
-    get_product_image_by_code,
+    get_primary_product_image,
     get_product_units_by_code,
     get_stores,
     save_shopping_operation,
@@ -60,7 +40,7 @@ from modules.shopping.services.shoppingDb import (
     update_product,
     update_product_unit_price,
     update_product_failure,
-    get_shopping_operation_by_id,
+    get_shopping_operation_for_print,
 )
 
 shopping_bp = Blueprint('shopping', __name__, template_folder='templates', url_prefix='/shopping') 
@@ -100,15 +80,15 @@ def auto_order():
 def api_products_history_by_provider(provider_code):
     try:
         print(f"Buscando historial para proveedor: {provider_code}")
-        products = get_products_history_by_provider(provider_code, None)        
+        products = get_products_history_by_provider(provider_code, None)
         # Procesar fechas para JSON
         for p in products:
             if p.get('last_purchase_date'):
                 p['last_purchase_date'] = p['last_purchase_date'].strftime('%Y-%m-%d')
-            # Calcular cantidad sugerida (ejemplo simple: max - stock actual)
-            # Esto es solo un placeholder, la lógica real puede ser más compleja
-            p['suggested_quantity'] = 0 
-            
+        # Cantidad sugerida para todo el catálogo del proveedor (depósitos opcionales: ?stores=01,02)
+        stores = [s for s in (request.args.get('stores') or '').split(',') if s.strip()] or None
+        cadence = get_purchase_cadence_by_provider(provider_code, suggestions.SUGGEST_WINDOW_DAYS)
+        suggestions.attach_suggestions(products, cadence, stores)
 
         return jsonify({'ok': True, 'items': products})
     except Exception as e:
@@ -145,22 +125,13 @@ def api_products_history_by_product_code(product_code):
 # API para buscar proveedores
 @shopping_bp.route('/api/providers/search', methods=['GET'])
 def api_providers_search():
-    # Por ahora devolvemos todos, el filtrado se puede hacer en cliente o mejorar la query luego
-    providers_objects = get_providers()
-    
-    # Convertir objetos a diccionarios
-    providers = [p.to_dict() for p in providers_objects]
-
-    # Si se quisiera filtrar por query param 'q':
-    q = request.args.get('q', '').lower()
-    if q and q != '*':
-        providers = [
-            p for p in providers 
-            if (p['provider_code'] and q in p['provider_code'].lower()) or 
-               (p['provider_name'] and q in p['provider_name'].lower())
-        ]
-    
-    return jsonify({'ok': True, 'items': providers})
+    """Busca proveedores por código, nombre o RIF en el índice en memoria (?q=&limit=)."""
+    try:
+        result = providerIndex.search(request.args.get('q', ''), request.args.get('limit'))
+        return jsonify({'ok': True, 'items': result['items'], 'total': result['total']})
+    except Exception as e:
+        print(f"Error searching providers: {e}")
+        return jsonify({'ok': False, 'error': str(e)}), 500
 
 
 
@@ -369,14 +340,7 @@ def api_products_search():
     offset = int(request.args.get('offset', 0))
     
     try:
-        products = get_products_for_modal(q, coin, limit, offset)        
-        # Convert Decimal to float for JSON serialization
-        for p in products:
-            if 'maximum_price' in p and p['maximum_price'] is not None:
-                p['maximum_price'] = float(p['maximum_price'])
-            if 'stock' in p and p['stock'] is not None:
-                p['stock'] = float(p['stock'])
-                
+        products = get_products_for_modal(q, coin, limit, offset)
         return jsonify({'ok': True, 'items': products})
     except Exception as e:
         print(f"Error searching products: {e}")
@@ -414,12 +378,15 @@ def api_product_stock(product_code):
 #api para obtener la imagen de un producto por su código
 @shopping_bp.route('/api/product/image/<product_code>', methods=['GET'])
 def api_product_image(product_code):
+    """Redirige a la URL cacheable de la imagen principal (?size=sm|md|lg para miniatura)."""
     try:
-        image_data = get_product_image_by_code(product_code)
-        if image_data:
-            return send_file(io.BytesIO(image_data), mimetype='image/jpeg')
-        else:
+        primary = resolve_primary_image(product_code, get_primary_product_image)
+        if not primary:
             return jsonify({'ok': False, 'error': 'Image not found'}), 404
+        size = request.args.get('size')
+        if size in THUMB_SIZES:
+            return redirect(url_for('product_image_thumb', image_id=primary['image_id'], size=size))
+        return redirect(url_for('product_image_raw', image_id=primary['image_id']))
     except Exception as e:
         print(f"Error getting product image: {e}")
         return jsonify({'ok': False, 'error': str(e)}), 500
@@ -602,44 +569,64 @@ def api_save_shopping_operation():
         return jsonify({'ok': False, 'error': str(e)}), 500
 
 
+def _shopping_operation_print_context(operation: dict) -> dict:
+    """Arma el contexto del reporte de orden de compra (PDF y JSON)."""
+    detalles = [
+        {
+            'codigo': detail['code_product'],
+            'descripcion': detail['description'],
+            'unidad': detail['unit_description'],
+            'cantidad': detail['amount'],
+            'costo': detail['unitary_cost'],
+            'subtotal': detail['subtotal'],
+        }
+        for detail in operation['details']
+    ]
+    return dict(
+        correlativo=str(operation['correlative']),
+        documento_numero=operation['document_no'] or str(operation['correlative']),
+        fecha_emision=operation['emission_date'].strftime('%d/%m/%Y') if operation['emission_date'] else '',
+        detalles=detalles,
+        total_compra=operation['total'],
+    )
+
+
+@shopping_bp.route('/api/operation/<int:operation_id>', methods=['GET'])
+def api_shopping_operation(operation_id):
+    """Misma información que el PDF de la orden de compra, en JSON."""
+    try:
+        operation = get_shopping_operation_for_print(operation_id)
+        if not operation:
+            return jsonify({'ok': False, 'error': 'Operation not found'}), 404
+        context = _shopping_operation_print_context(operation)
+        context['total_compra'] = float(context['total_compra'] or 0)
+        return jsonify({'ok': True, 'operation': context})
+    except Exception as e:
+        print(f"Error fetching shopping operation: {e}")
+        return jsonify({'ok': False, 'error': str(e)}), 500
+
+
 @shopping_bp.route('/pdf/<int:operation_id>', methods=['GET'])
 def get_shopping_operation_pdf(operation_id):
     try:
-        operation = get_shopping_operation_by_id(operation_id)
+        # encabezado + detalle con descripciones y unidades en dos consultas
+        operation = get_shopping_operation_for_print(operation_id)
         if not operation:
             return jsonify({'error': 'Operation not found'}), 404
-        
-        # Preparar detalles
-        detalles = []
-        for detail in operation['details']:
-            # Obtener descripción del producto
-            product = get_product_by_code(detail['code_product'])
-            if product:
-                # Obtener nombre de unidad
-                units = get_product_units_by_code(detail['code_product'])
-                unit_name = next((u['description'] for u in units if u['unit'] == detail['unit']), str(detail['unit']))
-                detalles.append({
-                    'codigo': detail['code_product'],
-                    'descripcion': product['description'],
-                    'unidad': unit_name,
-                    'cantidad': detail['amount'],
-                    'costo': detail['unitary_cost'],
-                    'subtotal': detail['amount'] * detail['unitary_cost']
-                })
-        
+
+        context = _shopping_operation_print_context(operation)
+        filename = f'orden_compra_{operation_id}.pdf'
+
         # Renderizar HTML
-        html = render_template('reports/shopping_operation_pdf.html',
-            correlativo=str(operation['correlative']),
-            documento_numero=operation['document_no'] or str(operation['correlative']),
-            fecha_emision=operation['emission_date'].strftime('%d/%m/%Y') if operation['emission_date'] else '',
-            detalles=detalles,
-            total_compra=operation['total']
-        )
-        
-        # Generar PDF
-        pdf = pdfkit.from_string(html, False, configuration=get_pdfkit_config())
-        
-        return send_file(io.BytesIO(pdf), mimetype='application/pdf', as_attachment=False, download_name=f'orden_compra_{operation_id}.pdf')
+        def build_html():
+            return render_report('shopping_operation_pdf.html', 'shopping', **context)
+
+        # Motor nativo (sin wkhtmltopdf) si está seleccionado para este reporte
+        if get_engine('shopping_operation', request.args.get('engine')) == ENGINE_NATIVE:
+            return send_pdf_native(lambda: render_shopping_operation(**context), build_html, filename)
+
+        # Generar PDF con el renderizador compartido (pool acotado + timeout)
+        return send_pdf(build_html(), filename)
     except Exception as e:
         print(f"Error generating PDF: {e}")
         import traceback
@@ -0,0 +1,84 @@
+"""Precio de costo con impuesto del modal de productos de compras, calculado en Python.
+
+`get_products_for_modal` llamaba dos veces por fila a `convert_value_to_coin`
+(una por rama del CASE). Ahora la consulta solo trae costo, impuesto, moneda y
+redondeo de cada producto de la página, y aquí se calcula `maximum_price` para
+todas las filas de una vez con una instantánea de tasas:
+
+    costo * (1 + alícuota / 100)      -> redondeado a rounding_type decimales
+                                         (mitad hacia arriba) si
+                                         extract_net_from_unit_cost_plus_tax
+    * tasa[moneda del producto] / tasa[moneda pedida]
+
+La instantánea sale de la tabla `coin` en la caché de datos de referencia
+(database.reference_cache), así que no hay consulta de tasas por petición.
+"""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from rounding import round_half_up
+
+# columna de `coin` con la tasa de compras; si no existe se usa la de ventas
+RATE_COLUMNS = ("buy_aliquot", "sales_aliquot")
+
+
+def rate_snapshot(coins: Optional[list[dict]] = None) -> dict[str, float]:
+    """Tasas por código de moneda (de `coins` o de la caché de referencia)."""
+    if coins is None:
+        from database import reference_cache
+
+        coins = reference_cache.get_coins()
+    rates = {}
+    for c in coins:
+        value = None
+        for column in RATE_COLUMNS:
+            if c.get(column) is not None:
+                value = c[column]
+                break
+        try:
+            rates[str(c.get("code")).strip()] = float(value or 0)
+        except (TypeError, ValueError):
+            rates[str(c.get("code")).strip()] = 0.0
+    return rates
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def apply_maximum_price(rows: list[dict], p_coin: str, rates: dict[str, float]) -> list[dict]:
+    """Agrega `maximum_price` (float o None si falta la tasa) a cada fila y elimina
+    las columnas auxiliares de la consulta. Modifica y retorna `rows`.
+    """
+    p_coin = str(p_coin or "").strip()
+    to_rate = rates.get(p_coin)
+    # factores por moneda de origen, calculados una sola vez por página
+    factors: dict[str, Optional[float]] = {}
+    for coin in {str(r.get("coin") or "").strip() for r in rows}:
+        if coin == p_coin:
+            factors[coin] = 1.0
+        elif rates.get(coin) and to_rate:
+            factors[coin] = rates[coin] / to_rate
+        else:
+            factors[coin] = None
+
+    costs = [_float(r.get("unitary_cost")) for r in rows]
+    aliquots = [_float(r.get("tax_aliquot")) for r in rows]
+    gross = [cost * (1 + aliquot / 100) for cost, aliquot in zip(costs, aliquots)]
+    for i, r in enumerate(rows):
+        if r.get("extract_net"):
+            digits = int(r["rounding_type"]) if r.get("rounding_type") is not None else 2
+            gross[i] = round_half_up(gross[i], digits)
+        factor = factors[str(r.get("coin") or "").strip()]
+        r["maximum_price"] = gross[i] * factor if factor is not None else None
+        r["stock"] = _float(r.get("stock"))
+        for column in ("unitary_cost", "tax_aliquot", "extract_net", "rounding_type", "coin"):
+            r.pop(column, None)
+    return rows
+
+
+__all__ = ["RATE_COLUMNS", "rate_snapshot", "apply_maximum_price"]
@@ -0,0 +1,145 @@
+"""Índice en memoria de proveedores para la búsqueda del modal (código, nombre, RIF).
+
+`/shopping/api/providers/search` cargaba toda la tabla `provider`, armaba un
+dataclass Provider por fila, lo convertía a dict y recién entonces filtraba en
+Python, en cada tecla. Aquí se guarda una lista compacta (solo las columnas que
+usa el modal, con las claves de búsqueda ya normalizadas) que se recarga cada
+REPOSTOCK_PROVIDER_INDEX_TTL segundos (por defecto 300) o con `invalidate()`.
+
+Búsqueda (`search`):
+- `*` separa términos que deben aparecer todos (en código, nombre o RIF)
+- primero el código exacto, luego coincidencias por prefijo y al final por
+  contenido; dentro de cada grupo, orden por código
+- como mucho `limit` resultados (PROVIDER_SEARCH_MAX_LIMIT como tope)
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Optional
+
+PROVIDER_INDEX_TTL = float(os.environ.get("REPOSTOCK_PROVIDER_INDEX_TTL", "300"))
+PROVIDER_SEARCH_DEFAULT_LIMIT = 50
+PROVIDER_SEARCH_MAX_LIMIT = 500
+
+_SQL = "SELECT code, description, provider_id, phone FROM provider ORDER BY code"
+
+
+def _norm(value: Optional[str]) -> str:
+    return str(value or "").strip().lower()
+
+
+def _norm_rif(value: Optional[str]) -> str:
+    # J-12345678-9, J123456789 y j 12345678 9 buscan igual
+    return "".join(ch for ch in _norm(value) if ch.isalnum())
+
+
+class _Entry:
+    __slots__ = ("code", "name", "rif", "item")
+
+    def __init__(self, row: dict):
+        code = str(row.get("code") or "").strip()
+        self.code = code.lower()
+        self.name = _norm(row.get("description"))
+        self.rif = _norm_rif(row.get("provider_id"))
+        # mismas claves (y alias) que Provider.to_dict() usa el modal
+        self.item = {
+            "code": code,
+            "description": row.get("description"),
+            "provider_id": row.get("provider_id"),
+            "phone": row.get("phone"),
+            "provider_code": code,
+            "provider_name": row.get("description"),
+            "provider_phone": row.get("phone"),
+        }
+
+    def rank(self, term: str) -> Optional[int]:
+        """0 código exacto, 1 prefijo, 2 contenido, None si no coincide."""
+        if self.code == term:
+            return 0
+        rif_term = _norm_rif(term)
+        if self.code.startswith(term) or self.name.startswith(term) or (rif_term and self.rif.startswith(rif_term)):
+            return 1
+        if term in self.code or term in self.name or (rif_term and rif_term in self.rif):
+            return 2
+        return None
+
+
+def _load() -> list[_Entry]:
+    # importación diferida: el índice se puede probar sin base de datos
+    from database import close_connection, get_connection
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(_SQL)
+        columns = [desc[0] for desc in cur.description]
+        return [_Entry(dict(zip(columns, row))) for row in cur.fetchall()]
+    finally:
+        close_connection(conn)
+
+
+_lock = threading.Lock()
+_state = {"entries": None, "loaded_at": 0.0}
+
+
+def _entries() -> list[_Entry]:
+    now = time.monotonic()
+    entries = _state["entries"]
+    if entries is not None and now - _state["loaded_at"] < PROVIDER_INDEX_TTL:
+        return entries
+    with _lock:
+        if _state["entries"] is not None and now - _state["loaded_at"] < PROVIDER_INDEX_TTL:
+            return _state["entries"]
+        try:
+            _state["entries"] = _load()
+        except Exception as e:
+            if _state["entries"] is None:
+                raise
+            print(f"Error recargando el índice de proveedores, se usa el anterior: {e}")
+        _state["loaded_at"] = now
+        return _state["entries"]
+
+
+def search_entries(entries: list[_Entry], query: Optional[str], limit: int) -> tuple[list[dict], int]:
+    """Filtra y ordena `entries`; retorna (items, total de coincidencias)."""
+    terms = [t for t in (_norm(part) for part in (query or "").split("*")) if t]
+    if not terms:
+        return [dict(e.item) for e in entries[:limit]], len(entries)
+    matches = []
+    for position, entry in enumerate(entries):
+        ranks = [entry.rank(t) for t in terms]
+        if None in ranks:
+            continue
+        matches.append((min(ranks), position, entry))
+    matches.sort(key=lambda m: (m[0], m[1]))
+    return [dict(e.item) for _r, _p, e in matches[:limit]], len(matches)
+
+
+def search(query: Optional[str] = None, limit: Optional[int] = None) -> dict:
+    """Busca proveedores por código, nombre o RIF. Retorna {"items", "total"}."""
+    try:
+        limit = int(limit or PROVIDER_SEARCH_DEFAULT_LIMIT)
+    except (TypeError, ValueError):
+        limit = PROVIDER_SEARCH_DEFAULT_LIMIT
+    limit = max(1, min(limit, PROVIDER_SEARCH_MAX_LIMIT))
+    items, total = search_entries(_entries(), query, limit)
+    return {"items": items, "total": total}
+
+
+def invalidate() -> None:
+    """Descarta el índice; la próxima búsqueda lo recarga."""
+    with _lock:
+        _state["entries"] = None
+        _state["loaded_at"] = 0.0
+
+
+__all__ = [
+    "PROVIDER_INDEX_TTL",
+    "PROVIDER_SEARCH_DEFAULT_LIMIT",
+    "PROVIDER_SEARCH_MAX_LIMIT",
+    "search_entries",
+    "search",
+    "invalidate",
+]
@@ -6,10 +6,12 @@ para facilitar consultas posteriores en este módulo.
 """
 
 from __future__ import annotations
+import os
 from contextlib import contextmanager
 from typing import Any, Iterable, Optional
 
-from database import get_connection, close_connection
+from database import get_connection, close_connection, pool, reference_cache
+from . import modalPricing
 from modules.shopping.services.schemas.product_codes import ProductCodes
 from modules.shopping.services.schemas.product_units import ProductUnits
 from .schemas.set_shopping_operation import SetShoppingOperationData
@@ -313,89 +315,44 @@ def update_product_failure(product_code: str, store_code: str,minimal_stock: flo
 
 
 
-def get_products_for_modal(query, p_coin="02", limit=50, offset=0):
-    """Busca productos para el módulo de compras."""
-    conn = get_connection()
-    try:
-        cur = None
-        try:
-            import psycopg2.extras as _extras
-
-            # Check if conn supports cursor_factory (psycopg2 connection)
-            if hasattr(conn, "cursor"):
-                cur = conn.cursor(cursor_factory=_extras.RealDictCursor)
-        except Exception:
-            pass
+def get_products_for_modal(query, p_coin="02", limit=50, offset=0, rates=None):
+    """Busca productos para el módulo de compras.
 
-        if cur is None:
-            cur = conn.cursor()
-
-        sql = """
-            select 
-            p.code,
-            p.description,
-            p.mark,
-            p.model,
-            case 
-            when p.extract_net_from_unit_cost_plus_tax
-            then
-            (SELECT convert_value_to_coin(
-               p.coin,
-                %s,
-                round(cast((pu.unitary_cost + (pu.unitary_cost * t.aliquot / 100)) as numeric),p.rounding_type) ,
-                'SHOPPING',
-                TRUE
-            ))  
-            else
-            (SELECT convert_value_to_coin(
-               p.coin,
-                %s,
-                pu.unitary_cost + (pu.unitary_cost *  t.aliquot / 100) ,
-                'SHOPPING',
-                TRUE
-            )) 
-            end as maximum_price,
-            coalesce ( sum(ps.stock) ,0) as stock 
-            from products p 
-            join products_units pu on (pu.product_code = p.code)
-            left join products_stock ps on (p.code = ps.product_code)
-            join taxes t on (t.code = p.buy_tax)
-            where 
-            pu.main_unit 
-            and p.code<>'SERVGAST'
-            and  p.status='01'
-            and product_type in ('T','S')
-            AND (p.code ILIKE %s OR p.description ILIKE %s)
-            group by 
+    La consulta solo trae la página de productos (costo, impuesto, moneda,
+    redondeo y stock); `maximum_price` se calcula en Python con la instantánea
+    de tasas `rates` (modalPricing.rate_snapshot() si no se pasa).
+    """
+    sql = """
+        SELECT
             p.code,
             p.description,
             p.mark,
             p.model,
-            pu.unitary_cost,
-            t.aliquot,
-            p.extract_net_from_unit_cost_plus_tax,
             p.coin,
-            p.rounding_type
-            order by description
-            LIMIT %s OFFSET %s
-        """
-
-        # Replace * with % for wildcard search and ensure it's wrapped in % for "contains" behavior
-        formatted_query = query.replace("*", "%")
-        search_pattern = f"%{formatted_query}%"
-        cur.execute(
-            sql, (p_coin, p_coin, search_pattern, search_pattern, limit, offset)
-        )
-        rows = cur.fetchall()
-
-        # Convert to dicts if necessary
-        if rows and isinstance(rows[0], tuple):
-            columns = [desc[0] for desc in cur.description]
-            return [dict(zip(columns, row)) for row in rows]
-
-        return rows
-    finally:
-        close_connection(conn)
+            p.rounding_type,
+            p.extract_net_from_unit_cost_plus_tax AS extract_net,
+            pu.unitary_cost,
+            t.aliquot AS tax_aliquot,
+            (SELECT COALESCE(SUM(ps.stock), 0) FROM products_stock ps WHERE ps.product_code = p.code) AS stock
+        FROM products p
+        JOIN products_units pu ON pu.product_code = p.code AND pu.main_unit
+        JOIN taxes t ON t.code = p.buy_tax
+        WHERE p.code <> 'SERVGAST'
+          AND p.status = '01'
+          AND p.product_type IN ('T', 'S')
+          AND (p.code ILIKE %s OR p.description ILIKE %s)
+        ORDER BY p.description
+        LIMIT %s OFFSET %s
+    """
+    search_pattern = f"%{(query or '').replace('*', '%')}%"
+    if rates is None:
+        rates = modalPricing.rate_snapshot()
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, (search_pattern, search_pattern, limit, offset))
+        columns = [desc[0] for desc in cur.description]
+        rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+    return modalPricing.apply_maximum_price(rows, p_coin, rates)
 
 
 # devuelve un producto por su código
@@ -508,25 +465,35 @@ def get_provider_by_code(code: str) -> Optional[Provider]:
         close_connection(conn)
 
 
-#Obtiene la imagen del producto 
-def get_product_image_by_code(code: str) -> Optional[bytes]:
-    """Obtiene la imagen de un producto por su código."""
-    conn = get_connection()
-    try:
+def get_primary_product_image(code: str) -> Optional[dict]:
+    """Obtiene image_id y content_hash de la imagen principal del producto (sin el blob).
+
+    La principal es la marcada is_primary o, si no hay, la más reciente.
+    Retorna None si el producto no tiene imágenes.
+    """
+    sql = """
+        SELECT image_id, {hash_column} AS content_hash
+        FROM rs_products_images
+        WHERE product_code = %s
+        ORDER BY is_primary DESC, created_at DESC, image_id DESC
+        LIMIT 1;
+    """
+    with get_db_connection() as conn:
         cur = conn.cursor()
-        sql = "SELECT image_data FROM rs_products_images WHERE product_code = %s;"
-        cur.execute(sql, (code,))
+        try:
+            cur.execute(sql.format(hash_column="content_hash"), (code,))
+        except Exception as e:
+            # sin la columna content_hash (SQL/alter_table_rs_products_images_content_hash.sql)
+            if getattr(e, "pgcode", None) != "42703":  # undefined_column
+                raise
+            conn.rollback()
+            cur = conn.cursor()
+            cur.execute(sql.format(hash_column="NULL"), (code,))
         row = cur.fetchone()
+        if not row:
+            return None
+        return {"image_id": row[0], "content_hash": row[1]}
 
-        if row and row[0]:
-            return row[0]  # Asumiendo que la imagen está en la primera columna
-        return None
-
-    except Exception as e:
-        print(f"Error fetching product image: {e}")
-        return None
-    finally:
-        close_connection(conn)
 
 # Obtiene las unidades alternas del producto
 def get_product_units_by_code(code: str) -> list[dict]:
@@ -558,25 +525,12 @@ def get_product_units_by_code(code: str) -> list[dict]:
 
 #devuelve monedas 
 def get_coins():
-    """Obtiene la lista de monedas disponibles."""
-    conn = get_connection()
+    """Obtiene la lista de monedas disponibles (desde la caché de referencia)."""
     try:
-        cur = conn.cursor()
-        sql = "SELECT * FROM coin ORDER BY code;"
-        cur.execute(sql)
-        rows = cur.fetchall()
-
-        # Get column names
-        colnames = [desc[0] for desc in cur.description]
-        coins = [dict(zip(colnames, row)) for row in rows]
-        
-        return coins
-
+        return reference_cache.get_coins()
     except Exception as e:
         print(f"Error fetching coins: {e}")
         return []
-    finally:
-        close_connection(conn)
 
 
 def create_product(product: Product) -> str:
@@ -757,23 +711,173 @@ def create_product_codes(product_codes: ProductCodes) -> None:
 
 #obtiene moneda por defecto para productos
 
-def get_default_coin() -> str:    
-    conn = get_connection()
+def get_default_coin() -> str:
+    """Moneda por defecto (propiedad del sistema 65, desde la caché de referencia)."""
     try:
-        cur = conn.cursor()
-        sql = "select system_value from system_properties where code = 65"
-        cur.execute(sql)
-        row = cur.fetchone()
-
-        if row and row[0]:
-            return row[0]  # Asumiendo que el código de moneda está en la primera columna
-        return "02"  # Retorna '02' como moneda por defecto si no se encuentra ninguna
-
+        return reference_cache.get_default_coin()
     except Exception as e:
         print(f"Error fetching default coin: {e}")
         return "02"
-    finally:
-        close_connection(conn)
+
+
+# Consultas en lote del historial por proveedor: nombre de la clave en cada producto -> SQL
+_HISTORY_ENRICHMENT_SQL = {
+    "stocks": """
+        SELECT * FROM products_stock WHERE product_code = ANY(%(codes)s)
+    """,
+    "units": """
+        SELECT
+        pu.*,
+        u.description as unit_description
+        FROM products_units pu
+        LEFT JOIN units u ON pu.unit = u.code
+        WHERE pu.product_code = ANY(%(codes)s)
+    """,
+    "parameters": """
+        SELECT
+        pf.*,
+        store.code as store_code,
+        store.description as store_description
+        FROM products_failures AS pf
+        LEFT JOIN store ON (pf.store_code = store.code)
+        WHERE pf.product_code = ANY(%(codes)s)
+    """,
+    # pedidos (ORDER) recientes que incluyen el producto, con cualquier proveedor;
+    # `pending` indica que el pedido aún no se recibió
+    "product_in_order": """
+        SELECT
+        pp.product_code,
+        so.document_no,
+        so.emission_date,
+        so.provider_code,
+        so.provider_name,
+        pp.amount,
+        pp.unitary_cost,
+        COALESCE(so.pending, FALSE) AS pending
+        FROM shopping_operation AS so
+        JOIN products_provider AS pp ON (pp.document_no = so.document_no)
+        WHERE so.operation_type = 'ORDER'
+        AND so.emission_date >= CURRENT_DATE - %(order_days)s
+        AND pp.product_code = ANY(%(codes)s)
+        ORDER BY so.document_no DESC
+    """,
+}
+
+# días hacia atrás de pedidos que se muestran en el historial por proveedor
+ORDER_HISTORY_DAYS = int(os.environ.get("REPOSTOCK_ORDER_HISTORY_DAYS", "180"))
+
+
+def _group_by_code(conn, sql: str, product_codes: list[str]) -> dict[str, list[dict]]:
+    """Ejecuta `sql` y agrupa las filas por product_code."""
+    cur = conn.cursor()
+    cur.execute(sql, {"codes": product_codes, "order_days": ORDER_HISTORY_DAYS})
+    columns = [desc[0] for desc in cur.description]
+    grouped: dict[str, list[dict]] = {}
+    for row in cur.fetchall():
+        d = dict(zip(columns, row))
+        code = d.get("product_code")
+        if code:
+            grouped.setdefault(code, []).append(d)
+    return grouped
+
+
+# columnas del historial por proveedor; `pv` es la última compra del par (proveedor, producto)
+_LAST_PURCHASE_COLUMNS = """
+    p.description as product_description,
+    p.code as product_code,
+    p.mark as product_mark,
+    p.department as product_department,
+    d.description as department_description,
+    pv.unitary_cost as product_provider_unitary_cost,
+    p.buy_tax,
+    p.sale_tax,
+    to_char(pv.emission_date, 'DD-MM-YYYY') as product_provider_emission_date,
+    pv.amount as product_provider_amount,
+    pv.coin_code as product_provider_coin,
+    pv.document_no as product_provider_document_no
+"""
+
+# consultas anteriores sobre products_provider (si aún no se creó rs_last_purchase)
+_LEGACY_LAST_PURCHASE = """
+    (SELECT *, ROW_NUMBER() OVER (PARTITION BY product_code ORDER BY emission_date DESC) as rn
+     FROM products_provider {where}) as pv
+"""
+
+
+def _fetch_last_purchases(conn, cur, provider_code: str, product_code: Optional[str]) -> None:
+    """Ejecuta en `cur` la consulta de últimas compras según los filtros.
+
+    Lee de rs_last_purchase (SQL/create_table_rs_last_purchase.sql); si la tabla
+    no existe usa la consulta con ROW_NUMBER() sobre products_provider.
+    """
+    if product_code and provider_code:
+        # producto específico con el proveedor, aunque no tenga historial
+        sql = f"""
+            SELECT {_LAST_PURCHASE_COLUMNS}
+            FROM products as p
+            LEFT JOIN rs_last_purchase as pv ON (pv.product_code = p.code AND pv.provider_code = %s)
+            LEFT JOIN department as d ON (d.code = p.department)
+            WHERE p.status = '01' AND p.code = %s
+        """
+        legacy = f"""
+            SELECT {_LAST_PURCHASE_COLUMNS}
+            FROM products as p
+            LEFT JOIN {_LEGACY_LAST_PURCHASE.format(where="WHERE provider_code = %s")}
+                ON (p.code = pv.product_code AND pv.rn = 1)
+            LEFT JOIN department as d ON (d.code = p.department)
+            WHERE p.status = '01' AND p.code = %s
+        """
+        params = legacy_params = (provider_code, product_code)
+    elif product_code:
+        # producto específico: su última compra con cualquier proveedor
+        sql = f"""
+            SELECT {_LAST_PURCHASE_COLUMNS}
+            FROM products as p
+            LEFT JOIN LATERAL (
+                SELECT * FROM rs_last_purchase lp
+                WHERE lp.product_code = p.code
+                ORDER BY lp.emission_date DESC NULLS LAST
+                LIMIT 1
+            ) as pv ON TRUE
+            LEFT JOIN department as d ON (d.code = p.department)
+            WHERE p.status = '01' AND p.code = %s
+        """
+        legacy = f"""
+            SELECT {_LAST_PURCHASE_COLUMNS}
+            FROM products as p
+            LEFT JOIN {_LEGACY_LAST_PURCHASE.format(where="WHERE product_code = %s")}
+                ON (p.code = pv.product_code AND pv.rn = 1)
+            LEFT JOIN department as d ON (d.code = p.department)
+            WHERE p.status = '01' AND p.code = %s
+        """
+        params = (product_code,)
+        legacy_params = (product_code, product_code)
+    else:
+        # todo lo comprado al proveedor
+        sql = f"""
+            SELECT {_LAST_PURCHASE_COLUMNS}
+            FROM rs_last_purchase as pv
+            JOIN products as p ON (p.code = pv.product_code)
+            LEFT JOIN department as d ON (d.code = p.department)
+            WHERE pv.provider_code = %s AND p.status = '01'
+            ORDER BY p.code
+        """
+        legacy = f"""
+            SELECT {_LAST_PURCHASE_COLUMNS}
+            FROM {_LEGACY_LAST_PURCHASE.format(where="WHERE provider_code = %s")}
+            JOIN products as p ON (p.code = pv.product_code)
+            LEFT JOIN department as d ON (d.code = p.department)
+            WHERE pv.rn = 1 AND p.status = '01'
+            ORDER BY p.code
+        """
+        params = legacy_params = (provider_code,)
+    try:
+        cur.execute(sql, params)
+    except Exception as e:
+        if getattr(e, "pgcode", None) != "42P01":  # undefined_table
+            raise
+        conn.rollback()
+        cur.execute(legacy, legacy_params)
 
 
 def get_products_history_by_provider(provider_code: str, product_code: str = None) -> list[dict]:
@@ -785,101 +889,12 @@ def get_products_history_by_provider(provider_code: str, product_code: str = Non
     conn = get_connection()
     try:
         cur = conn.cursor()
-        p_code = str(provider_code).strip()
-
-        if product_code:
-             # 1a. Caso con product_code: Buscar producto específico (LEFT JOIN desde products)
-             # Esto asegura que devolvemos el producto aunque no tenga historial con el proveedor
-             sql_products_provider = """
-                SELECT
-                    p.description as product_description,
-                    p.code as product_code,
-                    p.mark as product_mark,
-                    p.department as product_department,
-                    d.description as department_description,
-                    pv.unitary_cost as product_provider_unitary_cost,
-                    p.buy_tax,
-                    p.sale_tax,
-                    to_char(pv.emission_date, 'DD-MM-YYYY') as product_provider_emission_date,
-                    pv.amount as product_provider_amount,
-                    pv.coin_code as product_provider_coin,
-                    pv.document_no as product_provider_document_no
-                FROM products as p
-                LEFT JOIN (
-                    SELECT 
-                        *,
-                        ROW_NUMBER() OVER (PARTITION BY product_code ORDER BY emission_date DESC) as rn
-                    FROM products_provider
-                    WHERE provider_code = %s
-                ) as pv ON (p.code = pv.product_code AND pv.rn = 1)
-                LEFT JOIN department as d ON (d.code = p.department)
-                WHERE p.status = '01'
-                AND p.code = %s
-                ORDER BY p.code
-            """
-             cur.execute(sql_products_provider, (p_code, product_code))
-        elif not provider_code:
-
-            sql_products_provider = """
-                SELECT
-                    p.description as product_description,
-                    p.code as product_code,
-                    p.mark as product_mark,
-                    p.department as product_department,
-                    d.description as department_description,
-                    pv.unitary_cost as product_provider_unitary_cost,
-                    p.buy_tax,
-                    p.sale_tax,
-                    to_char(pv.emission_date, 'DD-MM-YYYY') as product_provider_emission_date,
-                    pv.amount as product_provider_amount,
-                    pv.coin_code as product_provider_coin,
-                    pv.document_no as product_provider_document_no
-                FROM products as p
-                LEFT JOIN (
-                    SELECT 
-                        *,
-                        ROW_NUMBER() OVER (PARTITION BY product_code ORDER BY emission_date DESC) as rn
-                    FROM products_provider
-                ) as pv ON (p.code = pv.product_code AND pv.rn = 1)
-                LEFT JOIN department as d ON (d.code = p.department)
-                WHERE p.status = '01'
-                AND p.code = %s
-                ORDER BY p.code
-            """
+        p_code = str(provider_code or "").strip()
+        product_code = str(product_code or "").strip() or None
 
-            # Ejecutar consulta para el caso sin proveedor pero con product_code
-            cur.execute(sql_products_provider, (product_code,))
-
-        else:
-            # 1b. Caso sin product_code: Listar todo el historial del proveedor (FROM products_provider)
-            sql_products_provider = """
-                SELECT
-                    p.description as product_description,
-                    p.code as product_code,
-                    p.mark as product_mark,
-                    p.department as product_department,
-                    d.description as department_description,
-                    pv.unitary_cost as product_provider_unitary_cost,
-                    p.buy_tax,
-                    p.sale_tax,
-                    to_char(pv.emission_date, 'DD-MM-YYYY') as product_provider_emission_date,
-                    pv.amount as product_provider_amount,
-                    pv.coin_code as product_provider_coin,
-                    pv.document_no as product_provider_document_no
-                FROM (
-                    SELECT 
-                        *,
-                        ROW_NUMBER() OVER (PARTITION BY product_code ORDER BY emission_date DESC) as rn
-                    FROM products_provider
-                    WHERE provider_code = %s
-                ) as pv
-                LEFT JOIN products as p ON (p.code = pv.product_code)
-                LEFT JOIN department as d ON (d.code = p.department)
-                WHERE pv.rn = 1
-                AND p.status = '01'
-                ORDER BY p.code
-            """
-            cur.execute(sql_products_provider, (p_code,))
+        if not p_code and not product_code:
+            return []
+        _fetch_last_purchases(conn, cur, p_code, product_code)
 
         rows = cur.fetchall()
         
@@ -888,124 +903,27 @@ def get_products_history_by_provider(provider_code: str, product_code: str = Non
 
         colnames = [desc[0] for desc in cur.description]
         products_provider_list = [dict(zip(colnames, row)) for row in rows]
+        # las consultas en lote usan conexiones del pool; esta ya no hace falta
+        close_connection(conn)
+        conn = None
         
         # Obtener lista de códigos para consultas en lote
-        product_codes = [p['product_code'] for p in products_provider_list if p.get('product_code')]
-        
+        product_codes = sorted({p['product_code'] for p in products_provider_list if p.get('product_code')})
+
         if not product_codes:
             return products_provider_list
 
-        product_codes_tuple = tuple(product_codes)
-
-        # 2. Consultas en lote (Bulk queries)
-        
-        # Stocks
-        sql_stocks = """
-            SELECT * FROM products_stock WHERE product_code IN %s
-        """
-        cur.execute(sql_stocks, (product_codes_tuple,))
-        stock_rows = cur.fetchall()
-        stock_cols = [desc[0] for desc in cur.description]
-        
-        stocks_by_code = {}
-        for row in stock_rows:
-            d = dict(zip(stock_cols, row))
-            p_code_val = d.get('product_code')
-            if p_code_val:
-                if p_code_val not in stocks_by_code:
-                    stocks_by_code[p_code_val] = []
-                stocks_by_code[p_code_val].append(d)
-
-        # Units
-        sql_units = """
-            SELECT 
-            pu.*,
-            u.description as unit_description
-            FROM products_units pu
-            LEFT JOIN units u ON pu.unit = u.code
-            WHERE pu.product_code IN %s
-        """
-        
-        cur.execute(sql_units, (product_codes_tuple,))
-        unit_rows = cur.fetchall()
-        unit_cols = [desc[0] for desc in cur.description]
-        
-        units_by_code = {}
-        for row in unit_rows:
-            d = dict(zip(unit_cols, row))
-            p_code_val = d.get('product_code')
-            if p_code_val:
-                if p_code_val not in units_by_code:
-                    units_by_code[p_code_val] = []
-                units_by_code[p_code_val].append(d)
-
-        # Parameters
-        sql_params = """
-            SELECT 
-            pf.*,
-            store.code as store_code,
-            store.description as store_description
-            FROM products_failures AS pf
-            LEFT JOIN store ON (pf.store_code = store.code)
-            WHERE product_code IN %s
-        """
-        cur.execute(sql_params, (product_codes_tuple,))
-        param_rows = cur.fetchall()
-        param_cols = [desc[0] for desc in cur.description]
-        
-        params_by_code = {}
-        for row in param_rows:
-            d = dict(zip(param_cols, row))
-            p_code_val = d.get('product_code')
-            if p_code_val:
-                if p_code_val not in params_by_code:
-                    params_by_code[p_code_val] = []
-                params_by_code[p_code_val].append(d)
-
-          # devuelve las compras relacionadas al producto con otros proveedores
-        sql_product_in_order = """
-            select 
-            pp.product_code,
-            so.document_no,
-            so.emission_date,
-            so.provider_code,
-            so.provider_name,
-            pp.amount,
-            pp.unitary_cost
-            from shopping_operation as so
-            left join products_provider as pp on (pp.document_no = so.document_no )
-            where so.operation_type = 'ORDER'
-            and pp.product_code IN %s
-            order by so.document_no desc
-            """
-        cur.execute(sql_product_in_order, (product_codes_tuple,))
-        order_rows = cur.fetchall()
-        order_cols = [desc[0] for desc in cur.description]
-
-        product_in_order = {}
-        for row in order_rows: 
-            d = dict(zip(order_cols, row))
-            p_code_val = d.get('product_code')
-            if p_code_val:
-                if p_code_val not in product_in_order:
-                    product_in_order[p_code_val] = []
-                product_in_order[p_code_val].append(d)
+        # 2. Consultas en lote independientes, en paralelo con conexiones del pool
+        enrichment = pool.run_parallel({
+            name: (lambda c, q=sql: _group_by_code(c, q, product_codes))
+            for name, sql in _HISTORY_ENRICHMENT_SQL.items()
+        })
 
         # 3. Asignar detalles a cada producto
         for product in products_provider_list:
             code = product.get('product_code')
-            product['stocks'] = stocks_by_code.get(code, [])
-            product['units'] = units_by_code.get(code, [])
-            product['parameters'] = params_by_code.get(code, [])
-            product['product_in_order'] = product_in_order.get(code, [])
-
-        
-
-      
-
-
-
-
+            for name in _HISTORY_ENRICHMENT_SQL:
+                product[name] = enrichment[name].get(code, [])
 
         return products_provider_list
 
@@ -1015,7 +933,30 @@ def get_products_history_by_provider(provider_code: str, product_code: str = Non
         traceback.print_exc()
         return []
     finally:
-        close_connection(conn)
+        if conn is not None:
+            close_connection(conn)
+
+def get_purchase_cadence_by_provider(provider_code: str, days: int = 90) -> dict[str, dict]:
+    """Compras al proveedor en los últimos `days` días, por producto.
+
+    Retorna {product_code: {"purchases": n, "quantity": total, "last_date": fecha}}.
+    """
+    sql = """
+        SELECT product_code, COUNT(*) AS purchases, COALESCE(SUM(amount), 0) AS quantity,
+               MAX(emission_date) AS last_date
+        FROM products_provider
+        WHERE provider_code = %s
+          AND emission_date >= CURRENT_DATE - %s
+        GROUP BY product_code
+    """
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, (str(provider_code or "").strip(), int(days)))
+        return {
+            code: {"purchases": int(n), "quantity": float(qty or 0), "last_date": last}
+            for code, n, qty, last in cur.fetchall()
+        }
+
 
 # devuelve historico de un producto por su código
 
@@ -1063,20 +1004,9 @@ def get_products_by_codes_list(product_codes: list[str]) -> list[dict]:
         close_connection(conn)
 
 def get_stores() -> list[dict]:
-    """Obtiene la lista de tiendas disponibles."""
-    conn = get_connection()
+    """Obtiene la lista de tiendas disponibles (desde la caché de referencia)."""
     try:
-        cur = conn.cursor()
-        sql = "SELECT * FROM store ORDER BY code;"
-        cur.execute(sql)
-        rows = cur.fetchall()
-
-        # Get column names
-        colnames = [desc[0] for desc in cur.description]
-        stores = [dict(zip(colnames, row)) for row in rows]
-        
-        return stores
-
+        return reference_cache.get_stores()
     except Exception as e:
         print(f"Error fetching stores: {e}")
         return []
@@ -1118,7 +1048,53 @@ def get_shopping_operation_by_id(operation_id: int) -> dict:
             close_connection(conn)
         except Exception:
             pass
-  
+
+
+def get_shopping_operation_for_print(operation_id: int) -> Optional[dict]:
+    """Obtiene una operación de compra lista para imprimir o mostrar.
+
+    Usa una consulta para el encabezado y una sola consulta para el detalle,
+    que ya trae la descripción del producto y el nombre de la unidad, en lugar
+    de consultar el producto y sus unidades por cada línea.
+
+    Retorna el encabezado (columnas de shopping_operation) con la clave
+    `details`: lista de dicts con code_product, description, unit,
+    unit_description, amount, unitary_cost y subtotal. None si no existe.
+    """
+    sql_header = """
+        SELECT * FROM shopping_operation WHERE correlative = %s
+    """
+    sql_details = """
+        SELECT
+            sod.line,
+            sod.code_product,
+            COALESCE(p.description, sod.description_product) AS description,
+            sod.unit,
+            COALESCE(u.description, sod.unit::text) AS unit_description,
+            COALESCE(sod.amount, 0)::float8 AS amount,
+            COALESCE(sod.unitary_cost, 0)::float8 AS unitary_cost,
+            (COALESCE(sod.amount, 0) * COALESCE(sod.unitary_cost, 0))::float8 AS subtotal
+        FROM shopping_operation_details AS sod
+        LEFT JOIN products AS p ON p.code = sod.code_product
+        LEFT JOIN units AS u ON u.code::text = sod.unit::text
+        WHERE sod.main_correlative = %s
+        ORDER BY sod.line NULLS LAST, sod.code_product;
+    """
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql_header, (operation_id,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        colnames = [desc[0] for desc in cur.description]
+        operation = dict(zip(colnames, row))
+
+        cur.execute(sql_details, (operation_id,))
+        detail_colnames = [desc[0] for desc in cur.description]
+        operation["details"] = [dict(zip(detail_colnames, r)) for r in cur.fetchall()]
+        return operation
+
+
 __all__ = [
     "get_db_connection",
     "execute_query",
@@ -1129,15 +1105,17 @@ __all__ = [
     "get_provider_by_code",
     "get_providers",
     "get_products_for_modal",
-    "get_product_image_by_code",
+    "get_primary_product_image",
     "save_shopping_operation_detail",
     "get_product_units_by_code",
     "get_coins",
     "create_product",
     "get_products_history_by_provider",
+    "get_purchase_cadence_by_provider",
     "get_stores",
     "get_product_in_order_by_code",
     "get_products_by_codes_list",
     "get_shopping_operation_by_id",
+    "get_shopping_operation_for_print",
 ]
 
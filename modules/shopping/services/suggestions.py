@@ -0,0 +1,99 @@
+"""Cantidades sugeridas de compra para la pantalla auto_order.
+
+Para todos los productos que vende un proveedor calcula, en una sola pasada
+por columnas (listas paralelas, una posición por producto):
+
+- existencia: suma de `stocks` en los depósitos considerados
+- mínimo / máximo: suma de `parameters` (products_failures) en esos depósitos
+- en pedido: suma de `product_in_order` de los pedidos ORDER abiertos
+  (`pending`, aún no recibidos); los ya recibidos están en la existencia
+- consumo diario estimado a partir de las compras al proveedor en los últimos
+  REPOSTOCK_SUGGEST_WINDOW_DAYS días (cadencia de compra)
+
+Regla:
+    posición = existencia + en pedido
+    con máximo > 0: si posición <= mínimo (o no hay mínimo y posición < máximo)
+                    se sugiere máximo - posición
+    sin máximo:     consumo diario * REPOSTOCK_SUGGEST_COVER_DAYS - posición
+El resultado se redondea hacia arriba a unidades enteras y nunca es negativo.
+"""
+from __future__ import annotations
+
+import math
+import os
+from typing import Any, Iterable, Optional
+
+SUGGEST_WINDOW_DAYS = int(os.environ.get("REPOSTOCK_SUGGEST_WINDOW_DAYS", "90"))
+SUGGEST_COVER_DAYS = float(os.environ.get("REPOSTOCK_SUGGEST_COVER_DAYS", "15"))
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _store_of(row: dict) -> str:
+    return str(row.get("store_code") or row.get("store") or "").strip()
+
+
+def build_columns(products: list[dict], stores: Optional[Iterable[str]] = None) -> dict[str, list]:
+    """Columnas de existencia, mínimo, máximo y cantidad en pedido (abierto) por producto."""
+    selected = {str(s).strip() for s in stores} if stores else None
+
+    def in_stores(row: dict) -> bool:
+        return selected is None or _store_of(row) in selected
+
+    codes, stock, minimum, maximum, on_order = [], [], [], [], []
+    for p in products:
+        codes.append(p.get("product_code"))
+        stock.append(sum(_float(s.get("stock")) for s in p.get("stocks") or () if in_stores(s)))
+        params = [r for r in p.get("parameters") or () if in_stores(r)]
+        minimum.append(sum(_float(r.get("minimal_stock")) for r in params))
+        maximum.append(sum(_float(r.get("maximum_stock")) for r in params))
+        on_order.append(sum(_float(o.get("amount")) for o in p.get("product_in_order") or () if o.get("pending")))
+    return {"code": codes, "stock": stock, "minimum": minimum, "maximum": maximum, "on_order": on_order}
+
+
+def compute(columns: dict[str, list], daily_rate: list[float],
+            cover_days: float = SUGGEST_COVER_DAYS) -> list[float]:
+    """Cantidad sugerida por posición de las columnas (ver reglas del módulo)."""
+    position = [s + o for s, o in zip(columns["stock"], columns["on_order"])]
+    result = []
+    for pos, lo, hi, rate in zip(position, columns["minimum"], columns["maximum"], daily_rate):
+        if hi > 0:
+            reorder = pos <= lo if lo > 0 else pos < hi
+            need = hi - pos if reorder else 0.0
+        else:
+            need = rate * cover_days - pos
+        result.append(float(math.ceil(need)) if need > 0 else 0.0)
+    return result
+
+
+def daily_rates(codes: list[Any], cadence: dict[str, dict], window_days: int = SUGGEST_WINDOW_DAYS) -> list[float]:
+    """Consumo diario estimado por producto: cantidad comprada en la ventana / días."""
+    days = max(1, window_days)
+    return [_float((cadence.get(c) or {}).get("quantity")) / days for c in codes]
+
+
+def attach_suggestions(products: list[dict], cadence: Optional[dict[str, dict]] = None,
+                       stores: Optional[Iterable[str]] = None) -> list[dict]:
+    """Agrega suggested_quantity, total_stock y on_order_quantity a cada producto."""
+    columns = build_columns(products, stores)
+    suggested = compute(columns, daily_rates(columns["code"], cadence or {}))
+    for i, p in enumerate(products):
+        p["total_stock"] = columns["stock"][i]
+        p["on_order_quantity"] = columns["on_order"][i]
+        p["suggested_quantity"] = suggested[i]
+    return products
+
+
+__all__ = [
+    "SUGGEST_WINDOW_DAYS",
+    "SUGGEST_COVER_DAYS",
+    "build_columns",
+    "compute",
+    "daily_rates",
+    "attach_suggestions",
+]
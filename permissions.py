@@ -0,0 +1,201 @@
+"""Mapa de permisos en memoria: usuario -> perfil -> menús / endpoints.
+
+Se construye una vez desde repostock.db (tres consultas) y se reemplaza
+completo cuando cambian las asignaciones (`db_sqlite.assign_menus_to_profile`
+o `assign_profile_to_user` avisan con on_permissions_change). Así la
+verificación de acceso en `require_login` no hace I/O.
+
+Reglas de acceso (can_access):
+- `index`, `login`, `logout` y `static` siempre están permitidos.
+- Un blueprint está protegido si alguno de sus endpoints es la url de un menú
+  (p. ej. `manager.document_manager` protege todo `manager.*`). Los endpoints
+  de blueprints sin menús no se controlan aquí.
+- Un usuario sin perfil asignado puede entrar a todo, salvo que
+  REPOSTOCK_PERMISSIONS_STRICT=1.
+- Con perfil: a los endpoints de los menús de su perfil; a los de ENDPOINT_PARENTS
+  solo si tiene el menú padre; y a los demás endpoints de un blueprint protegido
+  solo si tiene algún menú de ese blueprint (si no, se niega).
+
+Los ids de usuario son texto (`users.id` / `user_profiles.user_id`, p. ej.
+'1' o 'U-123'). Si el mapa no se puede construir, get_map() lanza
+PermissionMapError durante PERMISSIONS_RETRY_SECONDS antes de reintentar.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Optional
+
+import db_sqlite
+
+PERMISSIONS_STRICT = str(os.environ.get("REPOSTOCK_PERMISSIONS_STRICT", "0")).lower() in ("1", "true", "yes", "y")
+
+ALWAYS_ALLOWED = frozenset({"index", "login", "logout", "static"})
+
+# endpoints que no son menú (acciones, APIs, exportaciones) -> endpoint del menú
+# del que dependen; sin ese menú no se permiten aunque el perfil tenga otros del
+# mismo blueprint
+ENDPOINT_PARENTS = {
+    "manager.api_documents": "manager.document_manager",
+    "manager.delete_inventory_operation": "manager.document_manager",
+    "manager.bulk_inventory_operations": "manager.document_manager",
+    "manager.collection_preview_pdf": "manager.document_manager",
+    "manager.collection_batch_pdf": "manager.document_manager",
+}
+
+# tras un error al construir el mapa, segundos antes de volver a consultar repostock.db
+PERMISSIONS_RETRY_SECONDS = 5.0
+
+
+class PermissionMapError(RuntimeError):
+    """No se pudo construir el mapa de permisos."""
+
+
+class PermissionMap:
+    """Instantánea inmutable de menús y asignaciones."""
+
+    def __init__(self, menus: list[dict], profile_menus: dict[int, set[int]], user_profiles: dict[str, int]):
+        self.menus = tuple(menus)
+        self.menus_by_id = {m["id"]: m for m in menus}
+        self.user_profiles = dict(user_profiles)
+        self.profile_menu_ids = {pid: frozenset(ids) for pid, ids in profile_menus.items()}
+        self.profile_endpoints = {
+            pid: frozenset(
+                self.menus_by_id[mid]["url"] for mid in ids
+                if mid in self.menus_by_id and self.menus_by_id[mid]["url"]
+            )
+            for pid, ids in self.profile_menu_ids.items()
+        }
+        self.guarded_endpoints = frozenset(m["url"] for m in menus if m["url"]) - ALWAYS_ALLOWED
+        self.guarded_blueprints = frozenset(
+            b for b in (_blueprint_of(e) for e in self.guarded_endpoints) if b
+        )
+        self.profile_blueprints = {
+            pid: frozenset(b for b in (_blueprint_of(e) for e in endpoints) if b)
+            for pid, endpoints in self.profile_endpoints.items()
+        }
+
+    def profile_of(self, user_id: Optional[str]) -> Optional[int]:
+        return self.user_profiles.get(_user_key(user_id)) if user_id is not None else None
+
+
+def _user_key(user_id: Any) -> str:
+    return str(user_id).strip()
+
+
+def _blueprint_of(endpoint: str) -> Optional[str]:
+    return endpoint.rsplit(".", 1)[0] if "." in endpoint else None
+
+
+def _build() -> PermissionMap:
+    conn = db_sqlite.get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id, key, label, url, icon, parent_id, position FROM menus WHERE is_active = 1 ORDER BY parent_id NULLS FIRST, position, id")
+        menus = [dict(r) for r in cur.fetchall()]
+        cur.execute("SELECT profile_id, menu_id FROM profile_menus")
+        profile_menus: dict[int, set[int]] = {}
+        for r in cur.fetchall():
+            profile_menus.setdefault(r["profile_id"], set()).add(r["menu_id"])
+        cur.execute("SELECT user_id, profile_id FROM user_profiles")
+        user_profiles = {_user_key(r["user_id"]): r["profile_id"] for r in cur.fetchall()}
+    finally:
+        conn.close()
+    return PermissionMap(menus, profile_menus, user_profiles)
+
+
+_lock = threading.Lock()
+_map: Optional[PermissionMap] = None
+# (momento del fallo (time.monotonic), mensaje) del último intento fallido
+_failure: Optional[tuple[float, str]] = None
+
+
+def get_map() -> PermissionMap:
+    """Mapa actual; se construye en el primer uso o tras una invalidación.
+
+    Lanza PermissionMapError si no se puede construir (sin reintentar en cada
+    petición: el error se recuerda PERMISSIONS_RETRY_SECONDS).
+    """
+    global _map, _failure
+    current = _map
+    if current is not None:
+        return current
+    with _lock:
+        if _map is not None:
+            return _map
+        if _failure and time.monotonic() - _failure[0] < PERMISSIONS_RETRY_SECONDS:
+            raise PermissionMapError(_failure[1])
+        try:
+            _map = _build()
+        except Exception as e:
+            _failure = (time.monotonic(), f"No se pudo construir el mapa de permisos: {e}")
+            raise PermissionMapError(_failure[1]) from e
+        _failure = None
+        return _map
+
+
+def invalidate() -> None:
+    """Descarta el mapa; la próxima consulta lo reconstruye."""
+    global _map, _failure
+    with _lock:
+        _map = None
+        _failure = None
+
+
+db_sqlite.on_permissions_change(invalidate)
+
+
+def user_id_from_session(user: Any) -> Optional[str]:
+    """Id local (repostock.db) del usuario en sesión: su código de Postgres."""
+    if not isinstance(user, dict):
+        return None
+    code = str(user.get("code") or "").strip()
+    return code or None
+
+
+def menus_for_user(user_id: Optional[str]) -> list[dict]:
+    """Menús activos visibles para el usuario (todos si no tiene perfil y no es estricto)."""
+    pmap = get_map()
+    profile_id = pmap.profile_of(user_id)
+    if profile_id is None:
+        return [] if PERMISSIONS_STRICT else [dict(m) for m in pmap.menus]
+    allowed = pmap.profile_menu_ids.get(profile_id, frozenset())
+    # incluir los padres de los menús permitidos para poder armar el árbol
+    visible = set(allowed)
+    for mid in allowed:
+        parent = pmap.menus_by_id.get(mid, {}).get("parent_id")
+        while parent is not None and parent not in visible:
+            visible.add(parent)
+            parent = pmap.menus_by_id.get(parent, {}).get("parent_id")
+    return [dict(m) for m in pmap.menus if m["id"] in visible]
+
+
+def can_access(user_id: Optional[str], endpoint: Optional[str]) -> bool:
+    """True si el usuario puede entrar al endpoint (ver reglas en el docstring del módulo)."""
+    if not endpoint or endpoint in ALWAYS_ALLOWED:
+        return True
+    pmap = get_map()
+    blueprint = _blueprint_of(endpoint)
+    if endpoint not in pmap.guarded_endpoints and blueprint not in pmap.guarded_blueprints:
+        return True
+    profile_id = pmap.profile_of(user_id)
+    if profile_id is None:
+        return not PERMISSIONS_STRICT
+    endpoints = pmap.profile_endpoints.get(profile_id, frozenset())
+    if endpoint in pmap.guarded_endpoints:
+        return endpoint in endpoints
+    if endpoint in ENDPOINT_PARENTS:
+        return ENDPOINT_PARENTS[endpoint] in endpoints
+    return blueprint in pmap.profile_blueprints.get(profile_id, frozenset())
+
+
+__all__ = [
+    "PermissionMap",
+    "PermissionMapError",
+    "get_map",
+    "invalidate",
+    "user_id_from_session",
+    "menus_for_user",
+    "can_access",
+]
@@ -0,0 +1,43 @@
+"""Paquete `reporting` - generación de PDFs compartida por todos los módulos.
+
+    from reporting import send_pdf, render_pdf
+"""
+from .renderer import (
+    DEFAULT_OPTIONS,
+    PdfRenderError,
+    PdfUnavailableError,
+    PdfQueueFullError,
+    PdfTimeoutError,
+    is_available,
+    submit_pdf,
+    wait_pdf,
+    render_pdf,
+    get_metrics,
+)
+from .responses import (
+    pdf_bytes_response,
+    pdf_error_response,
+    send_pdf,
+    send_pdf_native,
+    send_cached_pdf,
+)
+from . import cache as pdf_cache
+
+__all__ = [
+    "DEFAULT_OPTIONS",
+    "PdfRenderError",
+    "PdfUnavailableError",
+    "PdfQueueFullError",
+    "PdfTimeoutError",
+    "is_available",
+    "submit_pdf",
+    "wait_pdf",
+    "render_pdf",
+    "get_metrics",
+    "pdf_bytes_response",
+    "pdf_error_response",
+    "send_pdf",
+    "send_pdf_native",
+    "send_cached_pdf",
+    "pdf_cache",
+]
@@ -0,0 +1,254 @@
+"""Generación de PDFs en lote (varias órdenes en un ZIP o en un solo PDF).
+
+Los trabajos se envían al pool compartido (reporting.renderer) con una ventana
+acotada: como máximo `window` PDFs pendientes a la vez, así el lote no llena la
+cola ni retiene en memoria más de `window` documentos. Cada trabajo reutiliza
+la caché de PDFs en disco cuando tiene clave.
+
+- iter_pdfs(jobs): genera (nombre, pdf | error) en el orden de los trabajos.
+- stream_zip(items): genera el ZIP por partes, sin armarlo completo en memoria.
+- merge_pdfs(jobs): un único PDF en un archivo temporal; usa pypdf si está
+  instalado (render en paralelo y unión), si no un solo proceso wkhtmltopdf con
+  varias entradas. Como mucho REPOSTOCK_PDF_MERGE_MAX trabajos (por defecto 100).
+- iter_file(f): entrega un archivo por partes (y lo cierra) para una respuesta.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import zipfile
+from collections import deque
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, Union
+
+from . import cache as pdf_cache
+from .renderer import (
+    PDF_TIMEOUT,
+    PDF_WORKERS,
+    PdfQueueFullError,
+    PdfRenderError,
+    render_pdf_documents,
+    submit_pdf,
+    wait_pdf,
+)
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except Exception:
+    PdfReader = PdfWriter = None
+
+# (nombre del archivo, clave de caché o None, función que arma el HTML,
+# función que genera el PDF con el motor nativo o None). Si el motor nativo
+# falla se renderiza el HTML con wkhtmltopdf, igual que send_cached_pdf.
+Job = tuple[str, Optional[str], Callable[[], str], Optional[Callable[[], bytes]]]
+
+PDF_MERGE_MAX = int(os.environ.get("REPOSTOCK_PDF_MERGE_MAX", "100"))
+
+_QUEUE_FULL_RETRIES = 50
+_QUEUE_FULL_SLEEP = 0.2
+# el PDF unido queda en memoria hasta este tamaño; más grande pasa a disco
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+_CHUNK_SIZE = 64 * 1024
+
+
+def _try_native(name: str, build_native: Optional[Callable[[], bytes]]) -> Optional[bytes]:
+    """PDF del motor nativo; None si el trabajo no lo usa o falla (se usa wkhtmltopdf)."""
+    if build_native is None:
+        return None
+    try:
+        return build_native()
+    except Exception as e:
+        print(f"Error en el generador de PDF nativo para {name}, se usa wkhtmltopdf: {e}")
+        return None
+
+
+def _resolve(entry, job_timeout: float) -> Union[bytes, Exception]:
+    _name, key, value = entry
+    if isinstance(value, (bytes, Exception)):
+        return value
+    try:
+        pdf = wait_pdf(value, job_timeout)
+    except Exception as e:
+        return e
+    if key:
+        pdf_cache.put(key, pdf)
+    return pdf
+
+
+def iter_pdfs(
+    jobs: Iterable[Job],
+    options: Optional[dict[str, Any]] = None,
+    window: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[tuple[str, Union[bytes, Exception]]]:
+    """Renderiza los trabajos en paralelo (ventana acotada) y los entrega en orden.
+
+    Un error en un trabajo no detiene el lote: se entrega la excepción en lugar
+    de los bytes para que el consumidor decida qué hacer.
+    """
+    window = max(1, window or PDF_WORKERS)
+    job_timeout = PDF_TIMEOUT if timeout is None else float(timeout)
+    pending: deque = deque()
+
+    for name, key, build_html, build_native in jobs:
+        pdf = pdf_cache.get(key) if key else None
+        if pdf is None:
+            pdf = _try_native(name, build_native)
+            if pdf is not None and key:
+                pdf_cache.put(key, pdf)
+        if pdf is not None:
+            pending.append((name, None, pdf))
+        else:
+            try:
+                html = build_html()
+            except Exception as e:
+                pending.append((name, None, e))
+                html = None
+            if html is not None:
+                retries = 0
+                while True:
+                    try:
+                        future = submit_pdf(html, options, job_timeout)
+                        pending.append((name, key, future))
+                        break
+                    except PdfQueueFullError as e:
+                        # la cola está ocupada: liberar un cupo propio o esperar
+                        if pending:
+                            entry = pending.popleft()
+                            yield entry[0], _resolve(entry, job_timeout)
+                            continue
+                        retries += 1
+                        if retries > _QUEUE_FULL_RETRIES:
+                            pending.append((name, None, e))
+                            break
+                        time.sleep(_QUEUE_FULL_SLEEP)
+                    except PdfRenderError as e:
+                        pending.append((name, None, e))
+                        break
+        while len(pending) >= window:
+            entry = pending.popleft()
+            yield entry[0], _resolve(entry, job_timeout)
+
+    while pending:
+        entry = pending.popleft()
+        yield entry[0], _resolve(entry, job_timeout)
+
+
+class _StreamBuffer:
+    """Destino de escritura no posicionable: zipfile escribe y aquí se acumula
+    hasta que el generador lo vacía."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(items: Iterable[tuple[str, Union[bytes, Exception]]]) -> Iterator[bytes]:
+    """Genera un ZIP por partes a partir de (nombre, pdf | error).
+
+    Los errores se incluyen como archivos .txt para que el lote no se corte.
+    """
+    buf = _StreamBuffer()
+    # los PDF ya están comprimidos; ZIP_STORED evita gastar CPU en recomprimir
+    with zipfile.ZipFile(buf, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for name, value in items:
+            if isinstance(value, Exception):
+                base = name.rsplit(".", 1)[0]
+                zf.writestr(f"ERROR_{base}.txt", f"No se pudo generar {name}: {value}")
+            else:
+                zf.writestr(name, value)
+            chunk = buf.drain()
+            if chunk:
+                yield chunk
+    chunk = buf.drain()
+    if chunk:
+        yield chunk
+
+
+def can_merge_in_parallel() -> bool:
+    return PdfWriter is not None
+
+
+def merge_pdfs(
+    jobs: list[Job],
+    options: Optional[dict[str, Any]] = None,
+    window: Optional[int] = None,
+) -> IO[bytes]:
+    """Un único PDF con todos los trabajos, en orden, en un archivo temporal.
+
+    Con pypdf: cada documento se renderiza en paralelo (y usa la caché), se
+    guarda en un archivo temporal y luego se unen las páginas. Sin pypdf: un
+    solo wkhtmltopdf con todos los HTML. Retorna el archivo posicionado al
+    inicio; quien lo recibe debe cerrarlo (iter_file lo hace al terminar).
+    """
+    if len(jobs) > PDF_MERGE_MAX:
+        raise PdfRenderError(
+            f"Demasiados documentos para un solo PDF ({len(jobs)}, máximo {PDF_MERGE_MAX}); use el formato ZIP."
+        )
+    out = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+    try:
+        if PdfWriter is None:
+            out.write(render_pdf_documents([job[2]() for job in jobs], options))
+        else:
+            _merge_into(out, jobs, options, window)
+        out.seek(0)
+    except BaseException:
+        out.close()
+        raise
+    return out
+
+
+def _merge_into(out: IO[bytes], jobs: list[Job], options: Optional[dict[str, Any]], window: Optional[int]) -> None:
+    # pypdf lee los objetos de cada documento desde su archivo a medida que los
+    # necesita, así que los PDF renderizados no quedan todos en memoria
+    parts = []
+    try:
+        writer = PdfWriter()
+        for name, value in iter_pdfs(jobs, options, window):
+            if isinstance(value, Exception):
+                raise PdfRenderError(f"No se pudo generar {name}: {value}")
+            part = tempfile.TemporaryFile()
+            parts.append(part)
+            part.write(value)
+            part.seek(0)
+            del value
+            for page in PdfReader(part).pages:
+                writer.add_page(page)
+        writer.write(out)
+    finally:
+        for part in parts:
+            part.close()
+
+
+def iter_file(fileobj: IO[bytes], chunk_size: int = _CHUNK_SIZE) -> Iterator[bytes]:
+    """Entrega el contenido de `fileobj` por partes y lo cierra al terminar."""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+__all__ = [
+    "Job",
+    "PDF_MERGE_MAX",
+    "iter_pdfs",
+    "stream_zip",
+    "can_merge_in_parallel",
+    "merge_pdfs",
+    "iter_file",
+]
@@ -0,0 +1,168 @@
+"""Caché en disco de PDFs generados, direccionada por contenido.
+
+La clave es un hash SHA-256 de los datos que determinan el PDF (nombre del
+reporte, versión de la plantilla, encabezado/detalle y opciones). La misma clave
+se usa como ETag, así una reimpresión con If-None-Match responde 304 sin
+consultar wkhtmltopdf ni leer el archivo.
+
+- Carpeta: REPOSTOCK_PDF_CACHE_DIR (por defecto <temp>/repostock/pdf_cache).
+- Tamaño máximo: REPOSTOCK_PDF_CACHE_MB (por defecto 200). Al superarlo se
+  eliminan los archivos menos usados (LRU por fecha de modificación; cada
+  acierto actualiza la fecha del archivo).
+- REPOSTOCK_PDF_CACHE_MB=0 desactiva la caché.
+"""
+from __future__ import annotations
+
+import datetime
+import decimal
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Optional
+
+PDF_CACHE_DIR = os.environ.get("REPOSTOCK_PDF_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), "repostock", "pdf_cache"
+)
+PDF_CACHE_MAX_BYTES = int(float(os.environ.get("REPOSTOCK_PDF_CACHE_MB", "200")) * 1024 * 1024)
+
+_lock = threading.Lock()
+_size: Optional[int] = None  # tamaño total estimado; se calcula al primer uso
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def is_enabled() -> bool:
+    return PDF_CACHE_MAX_BYTES > 0
+
+
+def _default(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def make_key(*parts: Any) -> str:
+    """Clave estable (hex SHA-256) a partir de valores serializables a JSON."""
+    payload = json.dumps(parts, sort_keys=True, default=_default, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, key[:2], key + ".pdf")
+
+
+def _scan() -> list[tuple[float, int, str]]:
+    entries = []
+    for root, _dirs, files in os.walk(PDF_CACHE_DIR):
+        for name in files:
+            if not name.endswith(".pdf"):
+                continue
+            full = os.path.join(root, name)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, full))
+    return entries
+
+
+def _current_size() -> int:
+    global _size
+    if _size is None:
+        _size = sum(size for _mtime, size, _path_ in _scan())
+    return _size
+
+
+def get(key: str) -> Optional[bytes]:
+    """Retorna los bytes del PDF en caché o None."""
+    if not is_enabled():
+        return None
+    path = _path(key)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    with _lock:
+        _stats["hits"] += 1
+    return data
+
+
+def put(key: str, data: bytes) -> None:
+    """Guarda el PDF de forma atómica y aplica el límite de tamaño."""
+    global _size
+    if not is_enabled() or not data:
+        return
+    path = _path(key)
+    with _lock:
+        # medir el directorio antes de agregar el archivo nuevo (si no, se cuenta dos veces)
+        _current_size()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with _lock:
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            os.replace(tmp, path)
+            _size = _current_size() + len(data) - previous
+            _stats["stores"] += 1
+            if _size > PDF_CACHE_MAX_BYTES:
+                _evict()
+    except OSError as e:
+        print(f"No se pudo guardar el PDF en caché: {e}")
+        return
+
+
+def _evict() -> None:
+    """Elimina los archivos más antiguos hasta quedar en el 90% del límite (con _lock tomado)."""
+    global _size
+    entries = sorted(_scan())
+    total = sum(size for _mtime, size, _p in entries)
+    target = int(PDF_CACHE_MAX_BYTES * 0.9)
+    for _mtime, size, full in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(full)
+            total -= size
+            _stats["evictions"] += 1
+        except OSError:
+            continue
+    _size = total
+
+
+def clear() -> None:
+    """Elimina todos los PDFs de la caché."""
+    global _size
+    with _lock:
+        for _mtime, _size_, full in _scan():
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+        _size = 0
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        data = dict(_stats)
+        data["bytes"] = _current_size() if is_enabled() else 0
+    data["max_bytes"] = PDF_CACHE_MAX_BYTES
+    data["dir"] = PDF_CACHE_DIR
+    return data
+
+
+__all__ = ["is_enabled", "make_key", "get", "put", "clear", "stats"]
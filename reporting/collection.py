@@ -0,0 +1,53 @@
+"""Trabajo de PDF de una orden de recolección, compartido por inventory y manager.
+
+    from reporting.collection import collection_order_job
+    key, build_html, build_native = collection_order_job(template, header, details, engine)
+    return send_cached_pdf(key, build_html, "orden.pdf", build_native=build_native)
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Callable, Optional
+
+from . import cache as pdf_cache
+from .native import ENGINE_NATIVE, ENGINE_WKHTMLTOPDF, render_collection_order
+
+
+def collection_order_job(
+    report_template,
+    header: dict[str, Any],
+    details: list[dict[str, Any]],
+    engine: str = ENGINE_WKHTMLTOPDF,
+) -> tuple[str, Callable[[], str], Optional[Callable[[], bytes]]]:
+    """Clave de caché, función que arma el HTML y (si el motor es nativo) función
+    que genera el PDF directamente, para una orden de recolección.
+
+    La clave depende del motor, la plantilla y los datos de la orden, no de la
+    hora de generación: reimprimir la misma orden sin cambios reutiliza el PDF.
+    Por eso el PDF no lleva la hora de generación (un acierto de caché mostraría
+    la de la primera impresión como si fuera la actual).
+    """
+    cache_key = pdf_cache.make_key(
+        engine,
+        report_template.filename,
+        os.path.getmtime(report_template.filename),
+        header,
+        details,
+    )
+
+    def build_html():
+        # Contexto para el reporte
+        context = {
+            "header": header,
+            "details": details,
+        }
+        return report_template.render(**context)
+
+    build_native = None
+    if engine == ENGINE_NATIVE:
+        build_native = lambda: render_collection_order(header, details)
+
+    return cache_key, build_html, build_native
+
+
+__all__ = ["collection_order_job"]
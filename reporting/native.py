@@ -0,0 +1,509 @@
+"""Generador de PDF nativo (sin wkhtmltopdf) para reportes tabulares.
+
+Las órdenes de recolección y de compra son tablas simples; generarlas con
+wkhtmltopdf implica arrancar un proceso WebKit completo por documento. Este
+módulo escribe el PDF directamente desde los datos:
+
+- fuentes estándar Helvetica / Helvetica-Bold (no se incrustan) con
+  codificación WinAnsi, suficiente para textos en español,
+- tablas con ajuste de línea, encabezado repetido en cada página y
+  numeración "Página x de n",
+- código de barras Code 128 (juego B) para el correlativo.
+
+El motor se elige por reporte (ver get_engine): REPOSTOCK_PDF_ENGINE para
+todos, REPOSTOCK_PDF_ENGINE_<REPORTE> para uno en particular, o el parámetro
+`engine` de la petición. wkhtmltopdf sigue disponible como respaldo.
+"""
+from __future__ import annotations
+
+import os
+import unicodedata
+import zlib
+from typing import Any, Iterable, Optional
+
+from .renderer import is_available
+
+ENGINE_NATIVE = "native"
+ENGINE_WKHTMLTOPDF = "wkhtmltopdf"
+ENGINES = (ENGINE_NATIVE, ENGINE_WKHTMLTOPDF)
+
+# reportes que tienen versión nativa
+NATIVE_REPORTS = ("collection_order", "shopping_operation")
+
+A4 = (595.28, 841.89)
+MM = 72 / 25.4
+
+# Anchos (1/1000 em) de Helvetica y Helvetica-Bold para ASCII 32..126 (AFM estándar)
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+
+# Code 128: anchos de barras/espacios por valor (0..105) y patrón de parada
+_CODE128 = [
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312",
+    "132212", "221213", "221312", "231212", "112232", "122132", "122231", "113222",
+    "123122", "123221", "223211", "221132", "221231", "213212", "223112", "312131",
+    "311222", "321122", "321221", "312212", "322112", "322211", "212123", "212321",
+    "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121",
+    "313121", "211331", "231131", "213113", "213311", "213131", "311123", "311321",
+    "331121", "312113", "312311", "332111", "314111", "221411", "431111", "111224",
+    "111422", "121124", "121421", "141122", "141221", "112214", "112412", "122114",
+    "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112",
+    "421211", "212141", "214121", "412121", "111143", "111341", "131141", "114113",
+    "114311", "411113", "411311", "113141", "114131", "311141", "411131", "211412",
+    "211214", "211232",
+]
+_CODE128_STOP = "2331112"
+_CODE128_START_B = 104
+
+
+def get_engine(report: str, requested: Optional[str] = None) -> str:
+    """Motor a usar para `report`: parámetro de la petición, variable por
+    reporte (REPOSTOCK_PDF_ENGINE_COLLECTION_ORDER, ...) o REPOSTOCK_PDF_ENGINE.
+
+    Si wkhtmltopdf no está disponible y el reporte tiene versión nativa, se usa la nativa.
+    """
+    engine = ENGINE_WKHTMLTOPDF
+    for value in (
+        requested,
+        os.environ.get(f"REPOSTOCK_PDF_ENGINE_{report.upper()}"),
+        os.environ.get("REPOSTOCK_PDF_ENGINE"),
+    ):
+        value = (value or "").strip().lower()
+        if value in ENGINES:
+            engine = value
+            break
+    if report not in NATIVE_REPORTS:
+        return ENGINE_WKHTMLTOPDF
+    # sin wkhtmltopdf instalado, los reportes con versión nativa igual se generan
+    if engine == ENGINE_WKHTMLTOPDF and not is_available():
+        return ENGINE_NATIVE
+    return engine
+
+
+def _plain(ch: str) -> str:
+    """Letra base de un carácter acentuado (para medir su ancho)."""
+    return unicodedata.normalize("NFD", ch)[0]
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    widths = _HELVETICA_BOLD if bold else _HELVETICA
+    total = 0
+    for ch in text:
+        code = ord(_plain(ch)) if ord(ch) > 126 else ord(ch)
+        total += widths[code - 32] if 32 <= code <= 126 else 556
+    return total * size / 1000.0
+
+
+def _pdf_string(text: str) -> bytes:
+    data = text.encode("cp1252", errors="replace")
+    data = data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    return b"(" + data + b")"
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def wrap_text(text: str, width: float, size: float, bold: bool = False) -> list[str]:
+    """Divide el texto en líneas que caben en `width` puntos."""
+    text = " ".join(str(text or "").split())
+    if not text:
+        return [""]
+    lines: list[str] = []
+    current = ""
+    for word in text.split(" "):
+        candidate = f"{current} {word}" if current else word
+        if text_width(candidate, size, bold) <= width:
+            current = candidate
+            continue
+        if current:
+            lines.append(current)
+        # palabra más larga que la columna: cortar por caracteres
+        while text_width(word, size, bold) > width and len(word) > 1:
+            cut = len(word)
+            while cut > 1 and text_width(word[:cut], size, bold) > width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+        current = word
+    lines.append(current)
+    return lines
+
+
+class NativePdf:
+    """Documento PDF mínimo con páginas A4, texto, líneas y rectángulos."""
+
+    def __init__(self, page_size=A4, margin: float = 10 * MM):
+        self.width, self.height = page_size
+        self.margin = margin
+        self.pages: list[list[bytes]] = []
+        self.y = 0.0
+        self.new_page()
+
+    # --- primitivas -----------------------------------------------------
+    def new_page(self) -> None:
+        self.pages.append([])
+        self.y = self.height - self.margin
+
+    @property
+    def bottom(self) -> float:
+        # reservar espacio para el número de página
+        return self.margin + 14
+
+    @property
+    def content_width(self) -> float:
+        return self.width - 2 * self.margin
+
+    def _emit(self, op: str, page: Optional[int] = None) -> None:
+        self.pages[-1 if page is None else page].append(op.encode("latin-1"))
+
+    def text(self, x: float, y: float, text: str, size: float = 9, bold: bool = False, page: Optional[int] = None) -> None:
+        font = "F2" if bold else "F1"
+        self.pages[-1 if page is None else page].append(
+            b"BT /" + font.encode() + b" " + _fmt(size).encode() + b" Tf "
+            + _fmt(x).encode() + b" " + _fmt(y).encode() + b" Td "
+            + _pdf_string(str(text)) + b" Tj ET"
+        )
+
+    def text_right(self, x_right: float, y: float, text: str, size: float = 9, bold: bool = False) -> None:
+        self.text(x_right - text_width(str(text), size, bold), y, text, size, bold)
+
+    def text_center(self, x_center: float, y: float, text: str, size: float = 9, bold: bool = False) -> None:
+        self.text(x_center - text_width(str(text), size, bold) / 2, y, text, size, bold)
+
+    def rect(self, x: float, y: float, w: float, h: float, fill_gray: Optional[float] = None, stroke_gray: Optional[float] = None) -> None:
+        ops = []
+        if fill_gray is not None:
+            ops.append(f"{_fmt(fill_gray)} g")
+        if stroke_gray is not None:
+            ops.append(f"{_fmt(stroke_gray)} G 0.5 w")
+        ops.append(f"{_fmt(x)} {_fmt(y)} {_fmt(w)} {_fmt(h)} re")
+        if fill_gray is not None and stroke_gray is not None:
+            ops.append("B")
+        elif fill_gray is not None:
+            ops.append("f")
+        else:
+            ops.append("S")
+        ops.append("0 g 0 G")
+        self._emit(" ".join(ops))
+
+    # --- bloques de alto nivel -----------------------------------------
+    def ensure_space(self, height: float) -> bool:
+        """Salta de página si no caben `height` puntos; True si saltó."""
+        if self.y - height < self.bottom:
+            self.new_page()
+            return True
+        return False
+
+    def title(self, text: str, size: float = 15) -> None:
+        self.ensure_space(size + 8)
+        self.y -= size
+        self.text(self.margin, self.y, text, size, bold=True)
+        self.y -= 8
+
+    def label_values(self, pairs: Iterable[tuple[str, Any]], columns: int = 2, size: float = 9) -> None:
+        """Pares "Etiqueta: valor" distribuidos en columnas."""
+        pairs = list(pairs)
+        col_w = self.content_width / columns
+        leading = size + 5
+        for i in range(0, len(pairs), columns):
+            self.ensure_space(leading)
+            self.y -= leading
+            for j, (label, value) in enumerate(pairs[i:i + columns]):
+                x = self.margin + j * col_w
+                label = f"{label}: "
+                self.text(x, self.y, label, size, bold=True)
+                lw = text_width(label, size, True)
+                value = wrap_text("" if value is None else str(value), col_w - lw - 6, size)[0]
+                self.text(x + lw, self.y, value, size)
+        self.y -= 6
+
+    def barcode128(self, value: str, height: float = 40, module: float = 1.1, size: float = 9) -> None:
+        """Código de barras Code 128-B centrado con el texto debajo."""
+        value = str(value or "")
+        if not value:
+            return
+        codes = [_CODE128_START_B]
+        for ch in value:
+            code = ord(ch) - 32
+            codes.append(code if 0 <= code <= 94 else ord("?") - 32)
+        checksum = codes[0]
+        for i, code in enumerate(codes[1:], start=1):
+            checksum += code * i
+        codes.append(checksum % 103)
+        pattern = "".join(_CODE128[c] for c in codes) + _CODE128_STOP
+        total = sum(int(w) for w in pattern) * module
+        self.ensure_space(height + size + 10)
+        x = self.margin + (self.content_width - total) / 2
+        top = self.y - 4
+        bar = True
+        ops = []
+        for w in pattern:
+            width = int(w) * module
+            if bar:
+                ops.append(f"{_fmt(x)} {_fmt(top - height)} {_fmt(width)} {_fmt(height)} re")
+            x += width
+            bar = not bar
+        self._emit("0 g " + " ".join(ops) + " f")
+        self.y = top - height - size - 2
+        self.text_center(self.width / 2, self.y, value, size)
+        self.y -= 8
+
+    def table(
+        self,
+        columns: list[dict[str, Any]],
+        rows: Iterable[list[Any]],
+        size: float = 8.5,
+        header_size: float = 7.5,
+        padding: float = 3.5,
+    ) -> None:
+        """Tabla con bordes; columns: [{"title", "width" (fracción), "align"}].
+
+        El encabezado se repite al inicio de cada página.
+        """
+        total = sum(c["width"] for c in columns)
+        widths = [c["width"] / total * self.content_width for c in columns]
+        leading = size + 2.5
+        header_h = header_size + 2 * padding + 2
+
+        def draw_header():
+            self.y -= header_h
+            x = self.margin
+            for col, w in zip(columns, widths):
+                self.rect(x, self.y, w, header_h, fill_gray=0.96, stroke_gray=0.85)
+                title = str(col["title"]).upper()
+                ty = self.y + padding + 1
+                if col.get("align") == "right":
+                    self.text_right(x + w - padding, ty, title, header_size, bold=True)
+                else:
+                    self.text(x + padding, ty, title, header_size, bold=True)
+                x += w
+
+        self.ensure_space(header_h + leading + 2 * padding)
+        draw_header()
+        for row in rows:
+            cells = []
+            for col, w, value in zip(columns, widths, row):
+                text = "" if value is None else str(value)
+                if col.get("wrap", True):
+                    cells.append(wrap_text(text, w - 2 * padding, size))
+                else:
+                    cells.append([text])
+            row_h = max(len(c) for c in cells) * leading + 2 * padding
+            if self.ensure_space(row_h):
+                draw_header()
+            self.y -= row_h
+            x = self.margin
+            for col, w, lines in zip(columns, widths, cells):
+                self.rect(x, self.y, w, row_h, stroke_gray=0.85)
+                ty = self.y + row_h - padding - size
+                for line in lines:
+                    if col.get("align") == "right":
+                        self.text_right(x + w - padding, ty, line, size)
+                    else:
+                        self.text(x + padding, ty, line, size)
+                    ty -= leading
+                x += w
+        self.y -= 8
+
+    def paragraph(self, text: str, size: float = 9, bold: bool = False) -> None:
+        leading = size + 3
+        for line in wrap_text(text, self.content_width, size, bold):
+            self.ensure_space(leading)
+            self.y -= leading
+            self.text(self.margin, self.y, line, size, bold)
+
+    # --- salida -----------------------------------------------------------
+    def render(self, page_numbers: bool = True) -> bytes:
+        if page_numbers:
+            n = len(self.pages)
+            for i in range(n):
+                label = f"Página {i + 1} de {n}"
+                self.text(
+                    self.width - self.margin - text_width(label, 7.5),
+                    self.margin,
+                    label,
+                    7.5,
+                    page=i,
+                )
+
+        objects: list[bytes] = []
+
+        def add(obj: bytes) -> int:
+            objects.append(obj)
+            return len(objects)
+
+        catalog = add(b"")  # se completa al final
+        pages_id = add(b"")
+        font1 = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        font2 = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+        resources = f"<< /Font << /F1 {font1} 0 R /F2 {font2} 0 R >> >>".encode()
+        kids = []
+        for ops in self.pages:
+            stream = zlib.compress(b"\n".join(ops))
+            content = add(
+                f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode()
+                + stream
+                + b"\nendstream"
+            )
+            page = add(
+                f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {_fmt(self.width)} {_fmt(self.height)}] "
+                f"/Contents {content} 0 R /Resources ".encode()
+                + resources
+                + b" >>"
+            )
+            kids.append(page)
+        objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode()
+        objects[pages_id - 1] = (
+            f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode()
+        )
+
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for i, obj in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += f"{i} 0 obj\n".encode() + obj + b"\nendobj\n"
+        xref = len(out)
+        out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+        for off in offsets:
+            out += f"{off:010d} 00000 n \n".encode()
+        out += (
+            f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+        ).encode()
+        return bytes(out)
+
+
+# --- reportes -----------------------------------------------------------
+
+def _amount(value, decimals: int = 3) -> str:
+    try:
+        return f"{float(value or 0):.{decimals}f}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _draw_collection_order(doc: NativePdf, header: dict, details: list[dict], generated_at: str = "") -> None:
+    header = header or {}
+    doc.title("Orden de Recolección")
+    doc.barcode128(str(header.get("correlative") or ""))
+    labels = [("Fecha emisión", header.get("emission_date") or "")]
+    # sin hora de generación en los PDF que se guardan en caché (reporting.collection)
+    if generated_at:
+        labels.append(("Generado", generated_at))
+    labels += [
+        ("Deposito Origen", header.get("origin_store_description") or ""),
+        ("Deposito Destino", header.get("destination_store_description") or ""),
+        ("Correlativo", header.get("correlative") or ""),
+        ("Numero de Documento", header.get("document_no") or ""),
+        ("Descripción", header.get("description") or header.get("correlative") or ""),
+        ("Usuario", " // ".join(str(v) for v in (header.get("user_code"), header.get("user_description")) if v)),
+    ]
+    doc.label_values(labels)
+    doc.table(
+        [
+            {"title": "Código", "width": 16},
+            {"title": "Descripción", "width": 44},
+            {"title": "Unidad", "width": 12},
+            {"title": "Ubicación", "width": 14},
+            {"title": "Cantidad", "width": 14, "align": "right", "wrap": False},
+        ],
+        (
+            [
+                it.get("code_product") or "",
+                it.get("description_product") or "",
+                it.get("unit_description") or "",
+                it.get("location") or "",
+                _amount(it.get("amount")),
+            ]
+            for it in (details or [])
+        ),
+    )
+    doc.paragraph(f"Documento No.: {header.get('description') or ''}", bold=True)
+
+
+def render_collection_order(header: dict, details: list[dict], generated_at: str = "") -> bytes:
+    """PDF de una orden de recolección (mismo contenido que report_collection_order.html)."""
+    doc = NativePdf()
+    _draw_collection_order(doc, header, details, generated_at)
+    return doc.render()
+
+
+def render_collection_orders(orders: list[dict], generated_at: str = "") -> bytes:
+    """Un solo PDF con varias órdenes ({"header", "details"}), cada una desde página nueva."""
+    doc = NativePdf()
+    for i, order in enumerate(orders):
+        if i:
+            doc.new_page()
+        _draw_collection_order(doc, order.get("header"), order.get("details"), generated_at)
+    return doc.render()
+
+
+def render_shopping_operation(
+    correlativo: str,
+    documento_numero: str,
+    fecha_emision: str,
+    detalles: list[dict],
+    total_compra: Any,
+) -> bytes:
+    """PDF de una orden de compra (mismo contenido que shopping_operation_pdf.html)."""
+    doc = NativePdf()
+    doc.title("Orden de Compra")
+    doc.label_values(
+        [
+            ("Correlativo", correlativo),
+            ("Documento N°", documento_numero),
+            ("Fecha de Emisión", fecha_emision),
+        ],
+        columns=3,
+    )
+    doc.table(
+        [
+            {"title": "Código", "width": 15},
+            {"title": "Descripción", "width": 37},
+            {"title": "Unidad", "width": 12},
+            {"title": "Cantidad", "width": 11, "align": "right", "wrap": False},
+            {"title": "Costo", "width": 12, "align": "right", "wrap": False},
+            {"title": "Subtotal", "width": 13, "align": "right", "wrap": False},
+        ],
+        (
+            [
+                item.get("codigo"),
+                item.get("descripcion"),
+                item.get("unidad"),
+                _amount(item.get("cantidad"), 2),
+                _amount(item.get("costo"), 2),
+                _amount(item.get("subtotal"), 2),
+            ]
+            for item in (detalles or [])
+        ),
+    )
+    doc.paragraph(f"Total de la Compra: {_amount(total_compra, 2)}", size=10, bold=True)
+    return doc.render()
+
+
+__all__ = [
+    "ENGINE_NATIVE",
+    "ENGINE_WKHTMLTOPDF",
+    "NATIVE_REPORTS",
+    "get_engine",
+    "NativePdf",
+    "render_collection_order",
+    "render_collection_orders",
+    "render_shopping_operation",
+]
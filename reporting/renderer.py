@@ -0,0 +1,292 @@
+"""Servicio de renderizado de PDF con wkhtmltopdf.
+
+Reemplaza las llamadas directas a `pdfkit.from_string` de cada blueprint por un
+único renderizador compartido:
+
+- Pool de workers acotado (REPOSTOCK_PDF_WORKERS, por defecto 2): nunca hay más
+  procesos wkhtmltopdf corriendo a la vez que workers.
+- Límite de cola (REPOSTOCK_PDF_QUEUE, por defecto 8): si ya hay workers + cola
+  trabajos pendientes se rechaza el nuevo con PdfQueueFullError en lugar de
+  bloquear hilos de waitress indefinidamente.
+- Timeout por trabajo (REPOSTOCK_PDF_TIMEOUT, segundos, por defecto 60): el
+  proceso wkhtmltopdf se mata si lo supera. Un lote de varios documentos en un
+  solo proceso tiene PDF_TIMEOUT por documento, como mucho
+  REPOSTOCK_PDF_BATCH_TIMEOUT (por defecto 300).
+- Espera en cola acotada aparte (REPOSTOCK_PDF_QUEUE_WAIT, segundos; por
+  defecto una ronda completa de la cola con PDF_TIMEOUT por trabajo): quien
+  espera un PDF lo hace como mucho timeout del trabajo + espera en cola.
+- Métricas simples en memoria (ver get_metrics()).
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Optional
+
+PDF_WORKERS = max(1, int(os.environ.get("REPOSTOCK_PDF_WORKERS", "2")))
+PDF_QUEUE = max(0, int(os.environ.get("REPOSTOCK_PDF_QUEUE", "8")))
+PDF_TIMEOUT = float(os.environ.get("REPOSTOCK_PDF_TIMEOUT", "60"))
+PDF_BATCH_TIMEOUT = float(os.environ.get("REPOSTOCK_PDF_BATCH_TIMEOUT", "300"))
+PDF_QUEUE_WAIT = float(
+    os.environ.get("REPOSTOCK_PDF_QUEUE_WAIT") or PDF_TIMEOUT * (PDF_QUEUE // PDF_WORKERS + 1)
+)
+
+# Opciones por defecto usadas por los reportes (mismas que se pasaban a pdfkit)
+DEFAULT_OPTIONS = {
+    "page-size": "A4",
+    "encoding": "UTF-8",
+    "margin-top": "10mm",
+    "margin-bottom": "10mm",
+    "margin-left": "10mm",
+    "margin-right": "10mm",
+}
+
+
+class PdfRenderError(Exception):
+    """Error genérico al generar un PDF."""
+
+
+class PdfUnavailableError(PdfRenderError):
+    """wkhtmltopdf no está instalado o no se encuentra el ejecutable."""
+
+
+class PdfQueueFullError(PdfRenderError):
+    """La cola de renderizado está llena; el cliente debe reintentar más tarde."""
+
+
+class PdfTimeoutError(PdfRenderError):
+    """El renderizado superó el tiempo máximo permitido."""
+
+
+def _find_wkhtmltopdf() -> Optional[str]:
+    """Ubica el ejecutable: variable WKHTMLTOPDF_BIN, rutas típicas de Windows o PATH."""
+    env_bin = os.environ.get("WKHTMLTOPDF_BIN")
+    if env_bin:
+        return env_bin
+    for p in [
+        r"C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
+        r"C:\\Program Files (x86)\\wkhtmltopdf\\bin\\wkhtmltopdf.exe",
+    ]:
+        if os.path.exists(p):
+            return p
+    return shutil.which("wkhtmltopdf")
+
+
+WKHTMLTOPDF_BIN = _find_wkhtmltopdf()
+
+_executor = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf")
+# cupos = trabajos en ejecución + trabajos en espera
+_slots = threading.BoundedSemaphore(PDF_WORKERS + PDF_QUEUE)
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "timeouts": 0,
+    "rejected": 0,
+    "pending": 0,
+    "running": 0,
+    "runs": 0,
+    "total_seconds": 0.0,
+    "max_seconds": 0.0,
+}
+
+
+def _bump(**changes):
+    with _metrics_lock:
+        for key, value in changes.items():
+            _metrics[key] += value
+
+
+def is_available() -> bool:
+    return bool(WKHTMLTOPDF_BIN) and os.path.exists(WKHTMLTOPDF_BIN)
+
+
+def _build_command(options: dict[str, Any], inputs: Optional[list[str]] = None) -> list[str]:
+    cmd = [WKHTMLTOPDF_BIN, "--quiet"]
+    for key, value in options.items():
+        if value is False or value is None:
+            continue
+        cmd.append("--" + key.lstrip("-"))
+        if value is not True and value != "":
+            cmd.append(str(value))
+    # por defecto leer HTML por stdin; el PDF siempre sale por stdout
+    cmd.extend(inputs or ["-"])
+    cmd.append("-")
+    return cmd
+
+
+def _execute(cmd: list[str], stdin: Optional[bytes], timeout: float) -> bytes:
+    _bump(running=1)
+    started = time.monotonic()
+    kwargs = {}
+    if os.name == "nt":
+        # evitar que se abra una consola por cada PDF cuando corre como servicio
+        kwargs["creationflags"] = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    try:
+        proc = subprocess.run(
+            cmd,
+            input=stdin,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout,
+            **kwargs,
+        )
+    except subprocess.TimeoutExpired:
+        _bump(timeouts=1, failed=1)
+        raise PdfTimeoutError(f"wkhtmltopdf superó el tiempo máximo de {timeout:.0f}s")
+    except OSError as e:
+        _bump(failed=1)
+        raise PdfUnavailableError(f"No se pudo ejecutar wkhtmltopdf: {e}")
+    finally:
+        elapsed = time.monotonic() - started
+        with _metrics_lock:
+            _metrics["running"] -= 1
+            _metrics["runs"] += 1
+            _metrics["total_seconds"] += elapsed
+            _metrics["max_seconds"] = max(_metrics["max_seconds"], elapsed)
+
+    pdf = proc.stdout or b""
+    # wkhtmltopdf puede terminar con código 1 por recursos externos faltantes
+    # aunque el PDF se haya generado correctamente.
+    if not pdf.startswith(b"%PDF"):
+        _bump(failed=1)
+        detail = (proc.stderr or b"").decode("utf-8", "replace").strip()
+        raise PdfRenderError(
+            f"wkhtmltopdf terminó con código {proc.returncode}: {detail or 'sin salida'}"
+        )
+    _bump(completed=1)
+    return pdf
+
+
+def _run_wkhtmltopdf(html: str, options: dict[str, Any], timeout: float) -> bytes:
+    return _execute(_build_command(options), html.encode("utf-8"), timeout)
+
+
+def _run_wkhtmltopdf_many(htmls: list[str], options: dict[str, Any], timeout: float) -> bytes:
+    """Un solo proceso wkhtmltopdf con varios documentos de entrada -> un PDF."""
+    with tempfile.TemporaryDirectory(prefix="repostock_pdf_") as tmp:
+        inputs = []
+        for i, html in enumerate(htmls):
+            path = os.path.join(tmp, f"{i:05d}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(html)
+            inputs.append(path)
+        cmd = _build_command(options, inputs)
+        # los archivos locales requieren este permiso en wkhtmltopdf >= 0.12.6
+        cmd.insert(1, "--enable-local-file-access")
+        return _execute(cmd, None, timeout)
+
+
+def _release_slot(_future):
+    _bump(pending=-1)
+    _slots.release()
+
+
+def _submit(fn, payload, options: Optional[dict[str, Any]], timeout: float):
+    if not is_available():
+        raise PdfUnavailableError(
+            "wkhtmltopdf no está configurado o no se encuentra el ejecutable."
+        )
+    if not _slots.acquire(blocking=False):
+        _bump(rejected=1)
+        raise PdfQueueFullError("Hay demasiados PDF en cola, intente de nuevo en unos segundos.")
+    _bump(submitted=1, pending=1)
+    merged = dict(DEFAULT_OPTIONS)
+    if options:
+        merged.update(options)
+    try:
+        future = _executor.submit(fn, payload, merged, timeout)
+    except Exception:
+        _release_slot(None)
+        raise
+    future.add_done_callback(_release_slot)
+    return future
+
+
+def submit_pdf(html: str, options: Optional[dict[str, Any]] = None, timeout: Optional[float] = None):
+    """Encola un renderizado y retorna el Future con los bytes del PDF.
+
+    Lanza PdfUnavailableError si no hay wkhtmltopdf y PdfQueueFullError si la
+    cola está llena.
+    """
+    job_timeout = PDF_TIMEOUT if timeout is None else float(timeout)
+    return _submit(_run_wkhtmltopdf, html, options, job_timeout)
+
+
+def wait_pdf(future, timeout: Optional[float] = None) -> bytes:
+    """Espera el Future de submit_pdf y retorna los bytes del PDF.
+
+    `timeout` es el límite del trabajo (PDF_TIMEOUT por defecto); a eso se suma
+    la espera en cola, que no depende del trabajo (PDF_QUEUE_WAIT). Lanza
+    PdfTimeoutError si no termina a tiempo.
+    """
+    job_timeout = PDF_TIMEOUT if timeout is None else float(timeout)
+    wait_limit = job_timeout + PDF_QUEUE_WAIT
+    try:
+        return future.result(timeout=wait_limit)
+    except FutureTimeoutError:
+        future.cancel()
+        _bump(timeouts=1)
+        raise PdfTimeoutError("El PDF no se generó a tiempo; la cola está ocupada.")
+
+
+def render_pdf(html: str, options: Optional[dict[str, Any]] = None, timeout: Optional[float] = None) -> bytes:
+    """Renderiza HTML a PDF usando el pool compartido y espera el resultado."""
+    job_timeout = PDF_TIMEOUT if timeout is None else float(timeout)
+    return wait_pdf(submit_pdf(html, options, job_timeout), job_timeout)
+
+
+def render_pdf_documents(
+    htmls: list[str], options: Optional[dict[str, Any]] = None, timeout: Optional[float] = None
+) -> bytes:
+    """Renderiza varios documentos HTML en un único PDF (un proceso, un cupo del pool).
+
+    El timeout por defecto crece con la cantidad de documentos, hasta
+    PDF_BATCH_TIMEOUT.
+    """
+    if not htmls:
+        raise PdfRenderError("No hay documentos para generar el PDF.")
+    job_timeout = min(PDF_TIMEOUT * len(htmls), PDF_BATCH_TIMEOUT) if timeout is None else float(timeout)
+    future = _submit(_run_wkhtmltopdf_many, list(htmls), options, job_timeout)
+    return wait_pdf(future, job_timeout)
+
+
+def get_metrics() -> dict[str, Any]:
+    """Copia de las métricas del renderizador (contadores y tiempos en segundos)."""
+    with _metrics_lock:
+        data = dict(_metrics)
+    runs = data["runs"]
+    data["avg_seconds"] = round(data["total_seconds"] / runs, 3) if runs > 0 else 0.0
+    data["total_seconds"] = round(data["total_seconds"], 3)
+    data["max_seconds"] = round(data["max_seconds"], 3)
+    data["workers"] = PDF_WORKERS
+    data["queue_limit"] = PDF_QUEUE
+    data["timeout"] = PDF_TIMEOUT
+    data["batch_timeout"] = PDF_BATCH_TIMEOUT
+    data["queue_wait"] = PDF_QUEUE_WAIT
+    data["available"] = is_available()
+    data["wkhtmltopdf"] = WKHTMLTOPDF_BIN
+    return data
+
+
+__all__ = [
+    "DEFAULT_OPTIONS",
+    "PdfRenderError",
+    "PdfUnavailableError",
+    "PdfQueueFullError",
+    "PdfTimeoutError",
+    "is_available",
+    "submit_pdf",
+    "wait_pdf",
+    "render_pdf",
+    "render_pdf_documents",
+    "get_metrics",
+]
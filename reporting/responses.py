@@ -0,0 +1,121 @@
+"""Helpers de Flask para responder con PDFs generados por el renderizador compartido."""
+from __future__ import annotations
+
+from typing import Any, Callable, Optional
+
+from flask import make_response, request
+
+from . import cache as pdf_cache
+from .renderer import (
+    PdfQueueFullError,
+    PdfRenderError,
+    PdfTimeoutError,
+    PdfUnavailableError,
+    render_pdf,
+)
+
+
+def pdf_bytes_response(pdf: bytes, filename: str, inline: bool = True):
+    """Arma la respuesta HTTP para unos bytes de PDF ya generados."""
+    resp = make_response(pdf)
+    resp.headers["Content-Type"] = "application/pdf"
+    disposition = "inline" if inline else "attachment"
+    resp.headers["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    return resp
+
+
+def pdf_error_response(error: PdfRenderError):
+    """Traduce los errores del renderizador a (mensaje, status) para Flask."""
+    if isinstance(error, PdfQueueFullError):
+        return str(error), 503, {"Retry-After": "5"}
+    if isinstance(error, PdfTimeoutError):
+        return str(error), 504
+    if isinstance(error, PdfUnavailableError):
+        return str(error), 500
+    return f"Error generando PDF: {error}", 500
+
+
+def send_pdf(
+    html: str,
+    filename: str,
+    options: Optional[dict[str, Any]] = None,
+    inline: bool = True,
+):
+    """Renderiza el HTML con el pool compartido y responde con el PDF (o el error)."""
+    try:
+        pdf = render_pdf(html, options)
+    except PdfRenderError as e:
+        return pdf_error_response(e)
+    return pdf_bytes_response(pdf, filename, inline)
+
+
+def _try_native(build_native: Optional[Callable[[], bytes]]) -> Optional[bytes]:
+    """Genera con el motor nativo; None si no aplica o falla (se usa wkhtmltopdf)."""
+    if build_native is None:
+        return None
+    try:
+        return build_native()
+    except Exception as e:
+        print(f"Error en el generador de PDF nativo, se usa wkhtmltopdf: {e}")
+        return None
+
+
+def send_pdf_native(
+    build_native: Callable[[], bytes],
+    build_html: Callable[[], str],
+    filename: str,
+    options: Optional[dict[str, Any]] = None,
+    inline: bool = True,
+):
+    """Responde con el PDF nativo; si falla, renderiza el HTML con wkhtmltopdf."""
+    pdf = _try_native(build_native)
+    if pdf is not None:
+        return pdf_bytes_response(pdf, filename, inline)
+    return send_pdf(build_html(), filename, options, inline)
+
+
+def send_cached_pdf(
+    key: str,
+    build_html: Callable[[], str],
+    filename: str,
+    options: Optional[dict[str, Any]] = None,
+    inline: bool = True,
+    build_native: Optional[Callable[[], bytes]] = None,
+):
+    """Responde con el PDF identificado por `key` usando la caché en disco.
+
+    - Si el cliente envía If-None-Match con la misma clave responde 304.
+    - Si el PDF está en caché lo devuelve sin renderizar.
+    - Si no, usa build_native() (generador nativo) si se indicó; si falla o no se
+      indicó, llama a build_html() y renderiza con wkhtmltopdf en el pool.
+    La clave debe derivarse de todo lo que determina el contenido (ver cache.make_key).
+    """
+    if request.if_none_match.contains(key):
+        resp = make_response("", 304)
+        resp.set_etag(key)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+
+    pdf = pdf_cache.get(key)
+    if pdf is None:
+        pdf = _try_native(build_native)
+        if pdf is None:
+            try:
+                pdf = render_pdf(build_html(), options)
+            except PdfRenderError as e:
+                return pdf_error_response(e)
+        pdf_cache.put(key, pdf)
+
+    resp = pdf_bytes_response(pdf, filename, inline)
+    resp.set_etag(key)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+__all__ = [
+    "pdf_bytes_response",
+    "pdf_error_response",
+    "send_pdf",
+    "send_pdf_native",
+    "send_cached_pdf",
+]
@@ -0,0 +1,110 @@
+"""Registro de plantillas de reportes (HTML para PDF) compiladas una sola vez.
+
+Antes cada PDF leía el archivo de reports/ y llamaba a render_template_string,
+lo que obligaba a Jinja a parsear y compilar la plantilla en cada petición.
+Aquí se mantiene un Environment de Jinja por módulo que:
+
+- busca primero en modules/<modulo>/reports y luego en reports/ (raíz),
+- compila cada plantilla una vez y la reutiliza desde memoria,
+- la vuelve a cargar solo si cambia el mtime del archivo (auto_reload),
+- guarda el bytecode compilado en disco (REPOSTOCK_TEMPLATE_CACHE_DIR, por
+  defecto <temp>/repostock/jinja_cache) para que el ejecutable de PyInstaller
+  no tenga que recompilar en cada arranque. REPOSTOCK_TEMPLATE_CACHE_DIR=""
+  desactiva la caché de bytecode.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+from typing import Any, Optional
+
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    select_autoescape,
+)
+
+if getattr(sys, "frozen", False):
+    BASE_PATH = sys._MEIPASS
+else:
+    BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_cache_dir_env = os.environ.get("REPOSTOCK_TEMPLATE_CACHE_DIR")
+TEMPLATE_CACHE_DIR = (
+    os.path.join(tempfile.gettempdir(), "repostock", "jinja_cache")
+    if _cache_dir_env is None
+    else _cache_dir_env
+)
+
+_lock = threading.Lock()
+_environments: dict[Optional[str], Environment] = {}
+_bytecode_cache: Optional[FileSystemBytecodeCache] = None
+
+
+def _get_bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    global _bytecode_cache
+    if _bytecode_cache is None and TEMPLATE_CACHE_DIR:
+        try:
+            os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+            _bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+        except OSError as e:
+            print(f"No se pudo crear la caché de plantillas en {TEMPLATE_CACHE_DIR}: {e}")
+    return _bytecode_cache
+
+
+def report_dirs(module: Optional[str] = None) -> list[str]:
+    """Carpetas donde se buscan reportes para un módulo (primero la del módulo)."""
+    dirs = []
+    if module:
+        dirs.append(os.path.join(BASE_PATH, "modules", module, "reports"))
+    dirs.append(os.path.join(BASE_PATH, "reports"))
+    return [d for d in dirs if os.path.isdir(d)]
+
+
+def get_environment(module: Optional[str] = None) -> Environment:
+    """Environment de Jinja (uno por módulo) para las plantillas de reportes."""
+    env = _environments.get(module)
+    if env is not None:
+        return env
+    with _lock:
+        env = _environments.get(module)
+        if env is None:
+            env = Environment(
+                loader=FileSystemLoader(report_dirs(module), encoding="utf-8"),
+                autoescape=select_autoescape(["html", "htm"]),
+                auto_reload=True,
+                bytecode_cache=_get_bytecode_cache(),
+            )
+            _environments[module] = env
+    return env
+
+
+def get_report_template(name: str, module: Optional[str] = None):
+    """Plantilla compilada `name` (lanza jinja2.TemplateNotFound si no existe)."""
+    return get_environment(module).get_template(name)
+
+
+def get_report_path(name: str, module: Optional[str] = None) -> Optional[str]:
+    """Ruta del archivo que se usa para `name`, o None si no existe."""
+    for d in report_dirs(module):
+        path = os.path.join(d, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def render_report(name: str, module: Optional[str] = None, **context: Any) -> str:
+    """Renderiza el reporte `name` con el contexto dado."""
+    return get_report_template(name, module).render(**context)
+
+
+__all__ = [
+    "report_dirs",
+    "get_environment",
+    "get_report_template",
+    "get_report_path",
+    "render_report",
+]
@@ -0,0 +1,22 @@
+"""Redondeo de montos compartido por los cálculos de precios y presupuestos.
+
+`round()` de Python redondea al par (round(2.5) == 2) y trabaja sobre el valor
+binario del float (round(2.675, 2) == 2.67). Los precios se redondean como en
+el sistema administrativo: mitad hacia arriba sobre el valor decimal que se
+muestra, round_half_up(2.675, 2) == 2.68.
+"""
+from __future__ import annotations
+
+import math
+from decimal import ROUND_HALF_UP, Decimal
+
+
+def round_half_up(value: float, digits: int = 2) -> float:
+    """Redondea `value` a `digits` decimales, mitad alejándose de cero."""
+    if not math.isfinite(value):
+        return value
+    exponent = Decimal(1).scaleb(-int(digits))
+    return float(Decimal(str(value)).quantize(exponent, rounding=ROUND_HALF_UP))
+
+
+__all__ = ["round_half_up"]
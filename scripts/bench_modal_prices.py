@@ -0,0 +1,162 @@
+"""Compara las dos formas de calcular precios del modal de productos de compras.
+
+Ejecutar:
+  py scripts/bench_modal_prices.py [busqueda] [moneda] [repeticiones]
+
+Contra la base de datos configurada (.env) mide, para la misma página (50
+productos por defecto, REPOSTOCK_BENCH_LIMIT):
+ - sql:    products_for_modal_sql (la versión anterior, convert_value_to_coin
+           por fila en SQL; se conserva aquí solo para comparar)
+ - python: get_products_for_modal (consulta simple + modalPricing con la
+           instantánea de tasas ya cargada)
+y muestra mediana/p95 en ms y la diferencia máxima de maximum_price entre ambas.
+
+Con --offline solo mide modalPricing.apply_maximum_price sobre filas sintéticas
+(no necesita base de datos).
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.shopping.services import modalPricing
+
+LIMIT = int(os.environ.get("REPOSTOCK_BENCH_LIMIT", "50"))
+
+
+def measure(label, fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    p95 = times[min(len(times) - 1, int(round(len(times) * 0.95)) - 1)]
+    print(f"{label:<8} mediana {statistics.median(times):8.2f} ms   p95 {p95:8.2f} ms")
+    return result
+
+
+def sample_rows(n):
+    rnd = random.Random(7)
+    return [
+        {
+            "code": f"P{i:06d}",
+            "description": f"Producto {i}",
+            "coin": rnd.choice(["01", "02"]),
+            "rounding_type": rnd.choice([0, 2]),
+            "extract_net": rnd.random() < 0.5,
+            "unitary_cost": rnd.uniform(1, 500),
+            "tax_aliquot": rnd.choice([0, 8, 16]),
+            "stock": rnd.randint(0, 100),
+        }
+        for i in range(n)
+    ]
+
+
+def run_offline(repeat):
+    rates = {"01": 1.0, "02": 36.5}
+    for n in (LIMIT, 5000):
+        rows = sample_rows(n)
+        print(f"-- {n} filas sintéticas")
+        measure("python", lambda: modalPricing.apply_maximum_price([dict(r) for r in rows], "02", rates), repeat)
+
+
+def products_for_modal_sql(query, p_coin="02", limit=50, offset=0):
+    """Versión anterior de shoppingDb.get_products_for_modal (conversión en SQL)."""
+    from database import close_connection, get_connection
+
+    sql = """
+        select 
+        p.code,
+        p.description,
+        p.mark,
+        p.model,
+        case 
+        when p.extract_net_from_unit_cost_plus_tax
+        then
+        (SELECT convert_value_to_coin(
+           p.coin,
+            %s,
+            round(cast((pu.unitary_cost + (pu.unitary_cost * t.aliquot / 100)) as numeric),p.rounding_type) ,
+            'SHOPPING',
+            TRUE
+        ))  
+        else
+        (SELECT convert_value_to_coin(
+           p.coin,
+            %s,
+            pu.unitary_cost + (pu.unitary_cost *  t.aliquot / 100) ,
+            'SHOPPING',
+            TRUE
+        )) 
+        end as maximum_price,
+        coalesce ( sum(ps.stock) ,0) as stock 
+        from products p 
+        join products_units pu on (pu.product_code = p.code)
+        left join products_stock ps on (p.code = ps.product_code)
+        join taxes t on (t.code = p.buy_tax)
+        where 
+        pu.main_unit 
+        and p.code<>'SERVGAST'
+        and  p.status='01'
+        and product_type in ('T','S')
+        AND (p.code ILIKE %s OR p.description ILIKE %s)
+        group by 
+        p.code,
+        p.description,
+        p.mark,
+        p.model,
+        pu.unitary_cost,
+        t.aliquot,
+        p.extract_net_from_unit_cost_plus_tax,
+        p.coin,
+        p.rounding_type
+        order by description
+        LIMIT %s OFFSET %s
+    """
+    search_pattern = f"%{(query or '').replace('*', '%')}%"
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, (p_coin, p_coin, search_pattern, search_pattern, limit, offset))
+        columns = [desc[0] for desc in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        close_connection(conn)
+
+
+def run_db(query, coin, repeat):
+    from modules.shopping.services import shoppingDb
+
+    rates = modalPricing.rate_snapshot()
+    print(f"-- búsqueda '{query}', moneda {coin}, {LIMIT} filas, {repeat} repeticiones")
+    old = measure("sql", lambda: products_for_modal_sql(query, coin, LIMIT, 0), repeat)
+    new = measure("python", lambda: shoppingDb.get_products_for_modal(query, coin, LIMIT, 0, rates=rates), repeat)
+
+    old_by_code = {r["code"]: r for r in old}
+    diffs = [
+        abs(float(old_by_code[r["code"]]["maximum_price"] or 0) - float(r["maximum_price"] or 0))
+        for r in new
+        if r["code"] in old_by_code
+    ]
+    print(f"filas: sql {len(old)}, python {len(new)}; diferencia máxima de precio: {max(diffs or [0]):.6f}")
+
+
+def main(argv):
+    if "--offline" in argv:
+        args = [a for a in argv if a != "--offline"]
+        run_offline(int(args[0]) if args else 200)
+        return
+    query = argv[0] if len(argv) > 0 else ""
+    coin = argv[1] if len(argv) > 1 else "02"
+    repeat = int(argv[2]) if len(argv) > 2 else 20
+    run_db(query, coin, repeat)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,122 @@
+"""Compara latencia y memoria del generador de PDF nativo contra wkhtmltopdf.
+
+Ejecutar:
+  py scripts/bench_pdf.py [lineas] [repeticiones]
+
+Genera una orden de recolección sintética con `lineas` productos (por defecto
+60) y la renderiza `repeticiones` veces (por defecto 10) con:
+ - reporting.native (en proceso)
+ - wkhtmltopdf vía pdfkit, si está instalado
+ - wkhtmltopdf vía reporting.renderer (pool compartido)
+
+Muestra mediana/p95 en ms, tamaño del PDF y memoria: pico de Python
+(tracemalloc) para el nativo y RSS máximo de los procesos hijos para wkhtmltopdf.
+"""
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from reporting.native import render_collection_order
+from reporting.renderer import is_available, render_pdf, WKHTMLTOPDF_BIN
+from reporting.templates import render_report
+
+try:
+    import pdfkit
+except Exception:
+    pdfkit = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def sample_order(lines):
+    header = {
+        "correlative": 123456,
+        "document_no": "00123456",
+        "emission_date": "2026-01-15",
+        "origin_store_description": "DEPOSITO PRINCIPAL",
+        "destination_store_description": "TIENDA CENTRO",
+        "description": "Orden de prueba para benchmark",
+        "user_code": "ADMIN",
+        "user_description": "Administrador",
+    }
+    details = [
+        {
+            "code_product": f"P{i:06d}",
+            "description_product": f"Producto de prueba número {i} con descripción mediana",
+            "unit_description": "UNIDAD",
+            "location": f"A-{i % 40:02d}",
+            "amount": (i % 17) + 0.5,
+        }
+        for i in range(lines)
+    ]
+    return header, details
+
+
+def children_maxrss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    return rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def measure(label, fn, repeat):
+    times = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pdf = fn()
+        times.append((time.perf_counter() - start) * 1000)
+        size = len(pdf)
+    times.sort()
+    p95 = times[min(len(times) - 1, int(round(len(times) * 0.95)) - 1)]
+    print(
+        f"{label:<28} mediana {statistics.median(times):8.1f} ms   p95 {p95:8.1f} ms   "
+        f"PDF {size / 1024:7.1f} KB"
+    )
+
+
+def run():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    header, details = sample_order(lines)
+    generated_at = "2026-01-15 08:00:00"
+    print(f"Orden de {lines} líneas, {repeat} repeticiones\n")
+
+    tracemalloc.start()
+    measure("nativo", lambda: render_collection_order(header, details, generated_at), repeat)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'':<28} memoria pico Python {peak / 1024 / 1024:.2f} MB\n")
+
+    if not is_available():
+        print("wkhtmltopdf no está disponible; solo se midió el generador nativo.")
+        return
+
+    html = render_report(
+        "report_collection_order.html", "manager",
+        header=header, details=details, generated_at=generated_at,
+    )
+    if pdfkit is not None:
+        config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_BIN)
+        measure(
+            "wkhtmltopdf (pdfkit)",
+            lambda: pdfkit.from_string(html, False, configuration=config, options={"quiet": ""}),
+            repeat,
+        )
+    measure("wkhtmltopdf (pool)", lambda: render_pdf(html), repeat)
+    rss = children_maxrss_mb()
+    if rss is not None:
+        print(f"{'':<28} RSS máximo wkhtmltopdf {rss:.1f} MB")
+
+
+if __name__ == "__main__":
+    run()
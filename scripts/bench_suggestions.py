@@ -0,0 +1,75 @@
+"""Mide el cálculo de cantidades sugeridas de auto_order sobre un catálogo sintético.
+
+Ejecutar:
+  py scripts/bench_suggestions.py [productos] [repeticiones]
+
+Genera `productos` filas (por defecto 50000) con la forma que devuelve
+get_products_history_by_provider (stocks y parámetros en 4 depósitos, pedidos
+abiertos) más la cadencia de compras, y mide `repeticiones` veces (por defecto
+5) las dos etapas de modules.shopping.services.suggestions:
+ - build_columns: reducir stocks/parámetros/pedidos a columnas
+ - compute: la regla de sugerencia sobre las columnas
+Muestra mediana/p95 en ms y cuántos productos quedaron con sugerencia > 0.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.shopping.services import suggestions
+
+STORES = ["01", "02", "03", "04"]
+
+
+def sample_catalog(n):
+    rnd = random.Random(11)
+    products, cadence = [], {}
+    for i in range(n):
+        code = f"P{i:06d}"
+        products.append({
+            "product_code": code,
+            "stocks": [{"store": s, "stock": rnd.randint(0, 40)} for s in STORES],
+            "parameters": [
+                {"store_code": s, "minimal_stock": rnd.choice([0, 5, 10]), "maximum_stock": rnd.choice([0, 20, 40])}
+                for s in STORES
+            ],
+            "product_in_order": [{"amount": rnd.randint(1, 20), "pending": rnd.random() < 0.5}]
+            if rnd.random() < 0.1 else [],
+        })
+        if rnd.random() < 0.6:
+            cadence[code] = {"purchases": rnd.randint(1, 6), "quantity": rnd.randint(5, 300)}
+    return products, cadence
+
+
+def measure(label, fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    p95 = times[min(len(times) - 1, int(round(len(times) * 0.95)) - 1)]
+    print(f"{label:<14} mediana {statistics.median(times):9.2f} ms   p95 {p95:9.2f} ms")
+    return result
+
+
+def main(argv):
+    n = int(argv[0]) if len(argv) > 0 else 50000
+    repeat = int(argv[1]) if len(argv) > 1 else 5
+    products, cadence = sample_catalog(n)
+    print(f"-- {n} productos, {len(STORES)} depósitos, {repeat} repeticiones")
+
+    columns = measure("build_columns", lambda: suggestions.build_columns(products), repeat)
+    rates = suggestions.daily_rates(columns["code"], cadence)
+    suggested = measure("compute", lambda: suggestions.compute(columns, rates), repeat)
+    measure("total", lambda: suggestions.attach_suggestions(products, cadence), repeat)
+    print(f"productos con sugerencia: {sum(1 for q in suggested if q > 0)} de {n}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
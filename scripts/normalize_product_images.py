@@ -0,0 +1,36 @@
+"""Convierte a binario las imágenes de productos guardadas como texto base64.
+
+Ejecutar (una vez, o después de importar imágenes desde otro sistema):
+  py scripts/normalize_product_images.py [--dry-run] [--chunk 200]
+
+--dry-run  solo muestra cuántas imágenes se convertirían
+--chunk    imágenes revisadas por lote (cada lote se confirma por separado)
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from images.maintenance import normalize_base64_images
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--chunk", type=int, default=200)
+    args = parser.parse_args()
+
+    summary = normalize_base64_images(chunk_size=args.chunk, dry_run=args.dry_run)
+    action = "se convertirían" if args.dry_run else "convertidas"
+    print(
+        f"\nRevisadas: {summary['scanned']}  {action}: {summary['converted']}  "
+        f"({summary['bytes_before'] / 1024:.1f} KB -> {summary['bytes_after'] / 1024:.1f} KB)"
+    )
+    if summary["converted_ids"]:
+        print("image_id:", ", ".join(str(i) for i in summary["converted_ids"]))
+
+
+if __name__ == "__main__":
+    run()
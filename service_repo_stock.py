@@ -7,7 +7,7 @@ import win32event
 import servicemanager
 
 # Importar la app Flask
-from app import app
+from app import app, start_reference_warmup
 
 class RepoStockService(win32serviceutil.ServiceFramework):
     _svc_name_ = "RepoStockService"
@@ -45,6 +45,8 @@ class RepoStockService(win32serviceutil.ServiceFramework):
         except Exception:
             port = 5001
 
+        start_reference_warmup()
+
         # Ejecutar con waitress (WSGI producción). Si falla, fallback a Flask.
         try:
             from waitress import serve
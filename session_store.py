@@ -0,0 +1,218 @@
+"""Sesiones del lado del servidor para RepoStock.
+
+Con la sesión de Flask por defecto todo el contenido (usuario, listas de
+productos, depósitos) viaja firmado en la cookie y se vuelve a enviar y
+verificar en cada petición. Aquí la cookie solo lleva un id aleatorio y los
+datos se guardan en un archivo SQLite (modo WAL):
+
+- Archivo: REPOSTOCK_SESSION_DB (por defecto `sessions.db` junto a la app o al
+  ejecutable).
+- Vigencia: `app.permanent_session_lifetime` (31 días por defecto). La fecha de
+  vencimiento se renueva como mucho una vez cada REPOSTOCK_SESSION_TOUCH
+  segundos (por defecto 3600) para no escribir en cada petición.
+- Las sesiones vencidas se eliminan cada REPOSTOCK_SESSION_SWEEP segundos (por
+  defecto 600).
+- Al iniciar sesión se llama a `session.regenerate()`: se borra la fila del id
+  anterior y se emite uno nuevo, así un id plantado antes del login no sirve
+  después (fijación de sesión).
+
+Uso (app.py):
+    app.session_interface = SqliteSessionInterface()
+"""
+from __future__ import annotations
+
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+def _default_db_path() -> str:
+    if getattr(sys, "frozen", False):
+        base = os.path.dirname(sys.executable)
+    else:
+        base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, "sessions.db")
+
+
+SESSION_DB_PATH = os.environ.get("REPOSTOCK_SESSION_DB") or _default_db_path()
+SESSION_TOUCH_SECONDS = float(os.environ.get("REPOSTOCK_SESSION_TOUCH", "3600"))
+SESSION_SWEEP_SECONDS = float(os.environ.get("REPOSTOCK_SESSION_SWEEP", "600"))
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Sesión cuyo contenido vive en el servidor; solo `sid` va en la cookie."""
+
+    def __init__(self, initial=None, sid: Optional[str] = None, new: bool = False, expires: float = 0.0,
+                 on_regenerate: Optional[Callable[[str], None]] = None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires = expires
+        self.modified = False
+        self.accessed = False
+        self._on_regenerate = on_regenerate
+
+    def regenerate(self) -> None:
+        """Cambia el id de la sesión conservando su contenido y elimina el anterior."""
+        if self.sid and not self.new and self._on_regenerate is not None:
+            self._on_regenerate(self.sid)
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+
+class SqliteSessionInterface(SessionInterface):
+    """SessionInterface de Flask respaldada por SQLite."""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or SESSION_DB_PATH
+        self._local = threading.local()
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._init_db()
+
+    # --- almacenamiento ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._connect().execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires REAL NOT NULL
+            )
+            """
+        )
+        self._connect().execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires)")
+
+    def _load(self, sid: str) -> Optional[tuple[dict, float]]:
+        row = self._connect().execute(
+            "SELECT data, expires FROM sessions WHERE sid = ?", (sid,)
+        ).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        try:
+            return self.serializer.loads(row[0]), row[1]
+        except Exception as e:
+            print(f"Sesión corrupta {sid[:8]}...: {e}")
+            return None
+
+    def _store(self, session: ServerSideSession, expires: float) -> None:
+        self._connect().execute(
+            "INSERT INTO sessions (sid, data, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(sid) DO UPDATE SET data = excluded.data, expires = excluded.expires",
+            (session.sid, self.serializer.dumps(dict(session)), expires),
+        )
+
+    def _touch(self, sid: str, expires: float) -> None:
+        self._connect().execute("UPDATE sessions SET expires = ? WHERE sid = ?", (expires, sid))
+
+    def _delete(self, sid: str) -> None:
+        self._connect().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def _discard(self, sid: str) -> None:
+        try:
+            self._delete(sid)
+        except sqlite3.Error as e:
+            print(f"Error eliminando sesión anterior: {e}")
+
+    def sweep(self) -> int:
+        """Elimina las sesiones vencidas; retorna cuántas se eliminaron."""
+        cur = self._connect().execute("DELETE FROM sessions WHERE expires < ?", (time.time(),))
+        return cur.rowcount
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < SESSION_SWEEP_SECONDS:
+            return
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = now
+            removed = self.sweep()
+            if removed:
+                print(f"Sesiones vencidas eliminadas: {removed}")
+        except sqlite3.Error as e:
+            print(f"Error limpiando sesiones vencidas: {e}")
+        finally:
+            self._sweep_lock.release()
+
+    # --- SessionInterface ---
+
+    def open_session(self, app, request) -> ServerSideSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            try:
+                loaded = self._load(sid)
+            except sqlite3.Error as e:
+                print(f"Error leyendo sesión: {e}")
+                loaded = None
+            if loaded is not None:
+                data, expires = loaded
+                return ServerSideSession(data, sid=sid, expires=expires, on_regenerate=self._discard)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True, on_regenerate=self._discard)
+
+    def save_session(self, app, session: ServerSideSession, response) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self._delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        expires = now + lifetime
+        try:
+            if session.modified or session.new:
+                self._store(session, expires)
+            elif session.expires - now < lifetime - SESSION_TOUCH_SECONDS:
+                self._touch(session.sid, expires)
+            else:
+                expires = session.expires
+        except sqlite3.Error as e:
+            print(f"Error guardando sesión: {e}")
+            return
+        self._maybe_sweep()
+
+        if session.new or (session.permanent and self.should_set_cookie(app, session)):
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+
+__all__ = ["ServerSideSession", "SqliteSessionInterface", "SESSION_DB_PATH"]
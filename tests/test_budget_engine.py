@@ -0,0 +1,115 @@
+"""Prueba rápida del motor de presupuestos (`modules.sales.services.budgetEngine`).
+
+Ejecutar:
+  py tests/test_budget_engine.py
+
+No usa base de datos: valora líneas contra filas de unidades armadas a mano. Verifica:
+ - unidad principal por defecto y unidad indicada por correlativo
+ - impuesto, redondeo (extract_net, mitad hacia arriba) y conversión de moneda
+ - neto + impuesto = total por línea y en los totales
+ - líneas inválidas (producto/unidad inexistente, cantidad, NaN/infinito, sin tasa) van a `errors`
+"""
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+
+from modules.sales.services import budgetEngine
+
+ROWS = [
+    # producto en dólares (02), 16% de impuesto, precio con impuesto redondeado a entero
+    {"code": "P1", "description": "TORNILLO", "coin": "02", "rounding_type": 0, "extract_net": True,
+     "tax_aliquot": 16, "unit_correlative": 1, "main_unit": True, "offer_price": 10,
+     "unit_description": "UNIDAD"},
+    {"code": "P1", "description": "TORNILLO", "coin": "02", "rounding_type": 0, "extract_net": True,
+     "tax_aliquot": 16, "unit_correlative": 2, "main_unit": False, "offer_price": 100,
+     "unit_description": "CAJA"},
+    # producto en bolívares (01), exento
+    {"code": "P2", "description": "SERVICIO", "coin": "01", "rounding_type": 2, "extract_net": False,
+     "tax_aliquot": 0, "unit_correlative": 1, "main_unit": True, "offer_price": 80,
+     "unit_description": "UNIDAD"},
+    # moneda sin tasa
+    {"code": "P3", "description": "EURO", "coin": "03", "rounding_type": 2, "extract_net": False,
+     "tax_aliquot": 0, "unit_correlative": 1, "main_unit": True, "offer_price": 1,
+     "unit_description": "UNIDAD"},
+]
+RATES = {"01": 1.0, "02": 40.0}
+
+
+def run():
+    lines = budgetEngine.normalize_lines([
+        {"code": "P1", "quantity": 3},
+        {"code": "P1", "unit_correlative": 2, "quantity": "1"},
+        {"code": "P2", "quantity": 2},
+        {"code": "NOEXISTE", "quantity": 1},
+        {"code": "P1", "unit_correlative": 9, "quantity": 1},
+        {"code": "P2", "quantity": 0},
+        {"code": "P3", "quantity": 1},
+        {"code": "P1", "quantity": "nan"},
+        {"code": "P1", "quantity": "inf"},
+        {"code": "P1", "quantity": float("-inf")},
+    ])
+    result = budgetEngine.compute(lines, budgetEngine.index_units(ROWS), RATES, "02")
+
+    by_line = {l["line"]: l for l in result["lines"]}
+    assert sorted(by_line) == [1, 2, 3], by_line.keys()
+    # 10 * 1.16 = 11.6 -> redondeo a 12 en la moneda del producto
+    assert by_line[1]["unit_price"] == 12.0 and by_line[1]["total"] == 36.0, by_line[1]
+    assert by_line[2]["unit_price"] == 116.0 and by_line[2]["unit_description"] == "CAJA", by_line[2]
+    # 80 bolívares / 40 = 2 dólares
+    assert by_line[3]["unit_price"] == 2.0 and by_line[3]["tax"] == 0, by_line[3]
+    for l in result["lines"]:
+        assert round(l["net"] + l["tax"], 2) == l["total"], l
+
+    errors = {e["line"] for e in result["errors"]}
+    assert errors == {4, 5, 6, 7, 8, 9, 10}, result["errors"]
+    assert all(e["error"] == "Cantidad inválida" for e in result["errors"] if e["line"] >= 8), result["errors"]
+    # el resultado debe ser JSON válido (sin NaN/Infinity)
+    json.dumps(result, allow_nan=False)
+
+    totals = result["totals"]
+    assert totals["lines"] == 3
+    assert totals["total"] == 36.0 + 116.0 + 4.0, totals
+    assert round(totals["net"] + totals["tax"], 2) == totals["total"], totals
+
+    # misma valoración en bolívares
+    in_bs = budgetEngine.compute(lines, budgetEngine.index_units(ROWS), RATES, "01")
+    assert {l["line"]: l["unit_price"] for l in in_bs["lines"]}[1] == 480.0
+
+    # redondeo mitad hacia arriba: 2.5 -> 3 (round() daría 2) y 2.675 -> 2.68
+    half_rows = [
+        {"code": "H0", "description": "MITAD", "coin": "02", "rounding_type": 0, "extract_net": True,
+         "tax_aliquot": 0, "unit_correlative": 1, "main_unit": True, "offer_price": 2.5,
+         "unit_description": "UNIDAD"},
+        {"code": "H2", "description": "MITAD", "coin": "02", "rounding_type": 2, "extract_net": True,
+         "tax_aliquot": 0, "unit_correlative": 1, "main_unit": True, "offer_price": 2.675,
+         "unit_description": "UNIDAD"},
+    ]
+    half = budgetEngine.compute(
+        budgetEngine.normalize_lines([{"code": "H0", "quantity": 1}, {"code": "H2", "quantity": 1}]),
+        budgetEngine.index_units(half_rows), RATES, "02",
+    )
+    prices = [l["unit_price"] for l in half["lines"]]
+    assert prices == [3.0, 2.68], prices
+
+    try:
+        budgetEngine.compute(lines, {}, RATES, "02", price_field="cost")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("price_field desconocido debería fallar")
+
+    print('Prueba completada correctamente')
+
+
+if __name__ == '__main__':
+    try:
+        run()
+    except AssertionError as e:
+        print('FALLÓ:', e)
+        raise
+    except Exception as e:
+        print('Error:', e)
+        raise
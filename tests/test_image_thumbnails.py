@@ -0,0 +1,72 @@
+"""Prueba rápida de la caché de miniaturas (`images`).
+
+Ejecutar:
+  py tests/test_image_thumbnails.py
+
+Verifica:
+ - la primera petición carga la imagen y la guarda en caché por hash
+ - las siguientes (cualquier tamaño) se sirven sin llamar al cargador
+ - al olvidar el image_id se vuelve a cargar
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+os.environ['REPOSTOCK_IMAGE_CACHE_DIR'] = tempfile.mkdtemp(prefix='repostock_img_')
+
+from images import forget_image, get_thumbnail_path, image_cache, sniff_mime
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+def run():
+    calls = []
+
+    def load(image_id):
+        calls.append(image_id)
+        return (PNG, 'image/png') if image_id == 1 else None
+
+    print('Verificando firmas MIME...')
+    assert sniff_mime(PNG) == 'image/png'
+    assert sniff_mime(b'\xFF\xD8\xFF\xE0') == 'image/jpeg'
+    assert sniff_mime(b'texto') is None
+
+    print('Primera petición (carga desde el cargador)...')
+    path = get_thumbnail_path(1, 'md', load)
+    assert path and os.path.exists(path), 'no se generó la miniatura'
+    assert image_cache.lookup_id(1) == image_cache.content_hash(PNG)
+    assert calls == [1]
+
+    print('Peticiones siguientes (desde caché)...')
+    for size in ('md', 'sm', 'lg'):
+        assert get_thumbnail_path(1, size, load)
+    assert calls == [1], 'se consultó el cargador con la caché llena'
+
+    print('Imagen inexistente y tamaño inválido...')
+    assert get_thumbnail_path(2, 'md', load) is None
+    try:
+        get_thumbnail_path(1, 'xl', load)
+        raise AssertionError('se aceptó un tamaño inválido')
+    except ValueError:
+        pass
+
+    print('Olvidar image_id...')
+    forget_image(1)
+    calls.clear()
+    assert get_thumbnail_path(1, 'md', load)
+    assert calls == [1]
+
+    print('Prueba completada correctamente')
+
+
+if __name__ == '__main__':
+    try:
+        run()
+    except AssertionError as e:
+        print('FALLÓ:', e)
+        raise
+    except Exception as e:
+        print('Error:', e)
+        raise
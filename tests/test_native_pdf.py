@@ -0,0 +1,89 @@
+"""Prueba rápida del generador de PDF nativo (`reporting.native`).
+
+Ejecutar:
+  py tests/test_native_pdf.py
+
+Verifica:
+ - tabla Code 128 (cada símbolo suma 11 módulos, parada 13)
+ - ajuste de línea de textos largos
+ - estructura del PDF (cabecera, xref con offsets correctos, cantidad de páginas)
+ - orden de recolección de muchas líneas en varias páginas
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+
+from reporting import native
+
+
+def check_structure(pdf):
+    assert pdf.startswith(b'%PDF-1.4'), 'cabecera PDF inválida'
+    assert pdf.rstrip().endswith(b'%%EOF'), 'falta %%EOF'
+    xref = int(pdf.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+    assert pdf[xref:xref + 4] == b'xref', 'startxref no apunta a la tabla xref'
+    table = pdf[xref:].split(b'\n')
+    count = int(table[1].split()[1])
+    for i in range(1, count):
+        offset = int(table[2 + i][:10])
+        assert pdf[offset:].startswith(f'{i} 0 obj'.encode()), f'offset incorrecto del objeto {i}'
+    return pdf.count(b'/Type /Page ')
+
+
+def run():
+    print('Verificando tabla Code 128...')
+    assert len(native._CODE128) == 106
+    assert all(sum(int(w) for w in p) == 11 for p in native._CODE128)
+    assert sum(int(w) for w in native._CODE128_STOP) == 13
+
+    print('Verificando ajuste de línea...')
+    lines = native.wrap_text('palabra ' * 40, 100, 9)
+    assert len(lines) > 1
+    assert all(native.text_width(line, 9) <= 100 for line in lines)
+    assert native.wrap_text('', 100, 9) == ['']
+
+    print('Generando orden de recolección de 150 líneas...')
+    header = {
+        'correlative': 987,
+        'document_no': '000987',
+        'emission_date': '2026-01-15',
+        'origin_store_description': 'Depósito Principal',
+        'destination_store_description': 'Tienda (Centro)',
+        'description': 'Reposición semanal',
+    }
+    details = [
+        {
+            'code_product': f'P{i:05d}',
+            'description_product': 'Descripción larga del producto ' * (1 + i % 3),
+            'unit_description': 'UND',
+            'location': f'A-{i}',
+            'amount': i,
+        }
+        for i in range(150)
+    ]
+    pdf = native.render_collection_order(header, details, '2026-01-15 08:00:00')
+    pages = check_structure(pdf)
+    print('Páginas:', pages)
+    assert pages > 1, 'se esperaban varias páginas'
+
+    print('Generando orden de compra...')
+    pdf = native.render_shopping_operation(
+        '10', 'OC-10', '15/01/2026',
+        [{'codigo': 'A1', 'descripcion': 'Artículo', 'unidad': 'UND', 'cantidad': 2, 'costo': 3.5, 'subtotal': 7}],
+        7,
+    )
+    assert check_structure(pdf) == 1
+
+    print('Prueba completada correctamente')
+
+
+if __name__ == '__main__':
+    try:
+        run()
+    except AssertionError as e:
+        print('FALLÓ:', e)
+        raise
+    except Exception as e:
+        print('Error:', e)
+        raise
@@ -0,0 +1,128 @@
+"""Prueba rápida del mapa de permisos en memoria (`permissions`).
+
+Ejecutar:
+  py tests/test_permissions.py
+
+Usa una base SQLite temporal con los menús mínimos (no modifica repostock.db). Verifica:
+ - un usuario sin perfil puede entrar a todo (modo no estricto)
+ - con perfil, solo a los endpoints de sus menús
+ - las acciones de un blueprint protegido (bulk, API, exportación) dependen del
+   menú padre; sin menús del blueprint se niegan
+ - asignar menús o perfil invalida el mapa (sin reiniciar)
+ - los padres de un menú permitido se incluyen en la navegación
+ - los ids de usuario son texto, como en repostock.db ('7', 'U-123')
+ - si el mapa no se puede construir, can_access falla en lugar de permitir
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+
+import db_sqlite
+
+db_sqlite.DB_PATH = Path(tempfile.mkdtemp(prefix='repostock_perm_')) / 'repostock.db'
+
+SCHEMA = """
+CREATE TABLE users (id TEXT PRIMARY KEY, description TEXT NOT NULL UNIQUE, profile_id INTEGER);
+CREATE TABLE profile (id INTEGER PRIMARY KEY AUTOINCREMENT, description TEXT UNIQUE);
+CREATE TABLE menus (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE, label TEXT NOT NULL, url TEXT,
+    icon TEXT, parent_id INTEGER, position INTEGER DEFAULT 0, role TEXT, is_active INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE profile_menus (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, profile_id INTEGER NOT NULL, menu_id INTEGER NOT NULL,
+    UNIQUE(profile_id, menu_id)
+);
+CREATE TABLE user_profiles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, profile_id INTEGER NOT NULL, UNIQUE(user_id)
+);
+INSERT INTO menus (id, key, label, url, parent_id, position) VALUES
+    (1, 'home', 'Inicio', 'index', NULL, 0),
+    (2, 'operations', 'Operaciones', NULL, NULL, 1),
+    (3, 'manager.documents', 'Administrador de documentos', 'manager.document_manager', NULL, 2),
+    (4, 'operations.collect_auto', 'Orden de Recolección Automatica',
+        'inventory.select_store_destination_collection_order', 2, 1);
+"""
+
+import permissions
+
+
+def menu_id(key):
+    return next(m['id'] for m in db_sqlite.get_menus(active_only=False) if m['key'] == key)
+
+
+def run():
+    print('Preparando DB temporal...')
+    conn = db_sqlite.get_connection()
+    conn.executescript(SCHEMA)
+    conn.close()
+    permissions.invalidate()
+
+    print('Usuario sin perfil...')
+    assert permissions.can_access('7', 'manager.document_manager')
+    assert permissions.can_access(None, 'index')
+
+    print('Asignando perfil con un solo menú...')
+    pid = db_sqlite.create_profile('perfil-prueba')
+    db_sqlite.assign_menus_to_profile(pid, [menu_id('operations.collect_auto')])
+    db_sqlite.assign_profile_to_user('7', pid)
+
+    assert permissions.can_access('7', 'inventory.select_store_destination_collection_order')
+    assert not permissions.can_access('7', 'manager.document_manager'), 'debió negarse el acceso'
+    assert permissions.can_access('7', 'index'), 'index siempre permitido'
+    assert permissions.can_access('7', 'inventory.api_algo_no_listado'), 'tiene un menú de inventory'
+    assert permissions.can_access('7', 'sales.api_algo'), 'blueprint sin menús no se controla'
+    for ep in ('manager.bulk_inventory_operations', 'manager.api_documents',
+               'manager.collection_batch_pdf', 'manager.otro_endpoint'):
+        assert not permissions.can_access('7', ep), f'{ep} debió negarse sin el menú de documentos'
+
+    keys = {m['key'] for m in permissions.menus_for_user('7')}
+    assert keys == {'operations', 'operations.collect_auto'}, keys
+
+    print('Ids de usuario no numéricos...')
+    db_sqlite.assign_profile_to_user('U-123', pid)
+    assert not permissions.can_access('U-123', 'manager.document_manager')
+    assert permissions.can_access(' U-123 ', 'inventory.select_store_destination_collection_order')
+    assert permissions.can_access('U-999', 'manager.document_manager'), 'sin perfil: no estricto'
+
+    print('Cambiando menús del perfil...')
+    db_sqlite.assign_menus_to_profile(pid, [menu_id('manager.documents')])
+    assert permissions.can_access('7', 'manager.document_manager'), 'el mapa no se invalidó'
+    assert permissions.can_access('7', 'manager.bulk_inventory_operations'), 'acción del menú padre'
+    assert not permissions.can_access('7', 'inventory.api_algo_no_listado'), 'sin menús de inventory'
+    assert not permissions.can_access('7', 'inventory.select_store_destination_collection_order')
+
+    print('Usuario desde sesión...')
+    assert permissions.user_id_from_session({'code': ' U-123 '}) == 'U-123'
+    assert permissions.user_id_from_session({'code': '7'}) == '7'
+    assert permissions.user_id_from_session({'code': ''}) is None
+    assert permissions.user_id_from_session(None) is None
+
+    print('Error construyendo el mapa...')
+    conn = db_sqlite.get_connection()
+    conn.execute('ALTER TABLE user_profiles RENAME TO user_profiles_old')
+    conn.commit()
+    conn.close()
+    permissions.invalidate()
+    try:
+        permissions.can_access('7', 'manager.document_manager')
+    except permissions.PermissionMapError:
+        pass
+    else:
+        raise AssertionError('un mapa que no se puede construir no debe permitir el acceso')
+
+    print('Prueba completada correctamente')
+
+
+if __name__ == '__main__':
+    try:
+        run()
+    except AssertionError as e:
+        print('FALLÓ:', e)
+        raise
+    except Exception as e:
+        print('Error:', e)
+        raise
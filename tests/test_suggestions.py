@@ -0,0 +1,103 @@
+"""Prueba rápida de las cantidades sugeridas de auto_order (`modules.shopping.services.suggestions`).
+
+Ejecutar:
+  py tests/test_suggestions.py
+
+No usa base de datos: arma productos con la forma de get_products_history_by_provider. Verifica:
+ - con máximo y mínimo: se repone hasta el máximo cuando la posición llega al mínimo
+ - con máximo sin mínimo: se repone cuando la posición queda por debajo del máximo
+ - sin máximo: consumo diario (cadencia de compra) * días de cobertura - posición
+ - en pedido solo cuenta los pedidos abiertos (pending), no los ya recibidos
+ - filtro por depósitos y redondeo hacia arriba, nunca negativo
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+
+from modules.shopping.services import suggestions
+
+
+def product(code, stocks, parameters=(), orders=()):
+    return {
+        "product_code": code,
+        "stocks": [{"store": s, "stock": q} for s, q in stocks],
+        "parameters": [
+            {"store_code": s, "minimal_stock": lo, "maximum_stock": hi} for s, lo, hi in parameters
+        ],
+        "product_in_order": [{"amount": q, "pending": pending} for q, pending in orders],
+    }
+
+
+def run():
+    products = [
+        # máximo y mínimo: 3 en existencia + 2 en pedido abierto = 5 <= mínimo 5 -> 20 - 5
+        # (el pedido recibido de 10 ya está en la existencia y no cuenta)
+        product("MAXMIN", [("01", 3)], [("01", 5, 20)], [(2, True), (10, False)]),
+        # máximo y mínimo por encima del mínimo: no se sugiere
+        product("SOBRE_MIN", [("01", 6)], [("01", 5, 20)]),
+        # máximo sin mínimo: 7 < 10 -> 3
+        product("SOLO_MAX", [("01", 7)], [("01", 0, 10)]),
+        # máximo sin mínimo ya alcanzado
+        product("MAX_LLENO", [("01", 10)], [("01", 0, 10)]),
+        # sin máximo: 90 comprados en 90 días = 1 por día * 15 días - 4 = 11
+        product("CADENCIA", [("01", 4)]),
+        # sin máximo, consumo fraccional: 10/90*15 = 1.67 - 0 -> 2
+        product("FRACCION", []),
+        # sin máximo y sin compras: nunca negativo
+        product("SIN_COMPRAS", [("01", 5)]),
+        # dos depósitos: con filtro solo cuenta el 01
+        product("DEPOSITOS", [("01", 2), ("02", 30)], [("01", 4, 12), ("02", 0, 40)]),
+    ]
+    cadence = {
+        "CADENCIA": {"purchases": 3, "quantity": 90},
+        "FRACCION": {"purchases": 1, "quantity": 10},
+    }
+
+    columns = suggestions.build_columns(products)
+    on_order = dict(zip(columns["code"], columns["on_order"]))
+    assert on_order["MAXMIN"] == 2, f"en pedido solo debe contar los abiertos: {on_order['MAXMIN']}"
+
+    rates = suggestions.daily_rates(columns["code"], cadence, window_days=90)
+    suggested = dict(zip(columns["code"], suggestions.compute(columns, rates, cover_days=15)))
+    expected = {
+        "MAXMIN": 15.0,
+        "SOBRE_MIN": 0.0,
+        "SOLO_MAX": 3.0,
+        "MAX_LLENO": 0.0,
+        "CADENCIA": 11.0,
+        "FRACCION": 2.0,
+        "SIN_COMPRAS": 0.0,
+        # todos los depósitos: 32 en existencia, máximo 52, mínimo 4 -> por encima del mínimo
+        "DEPOSITOS": 0.0,
+    }
+    for code, qty in expected.items():
+        assert suggested[code] == qty, f"{code}: esperado {qty}, obtenido {suggested[code]}"
+
+    # filtro por depósito: solo el 01 (2 <= mínimo 4 -> 12 - 2)
+    filtered = suggestions.build_columns(products, stores=["01"])
+    index = filtered["code"].index("DEPOSITOS")
+    assert filtered["stock"][index] == 2, filtered["stock"][index]
+    assert filtered["maximum"][index] == 12, filtered["maximum"][index]
+    by_store = suggestions.compute(filtered, suggestions.daily_rates(filtered["code"], cadence))
+    assert by_store[index] == 10.0, by_store[index]
+
+    # attach_suggestions agrega las columnas a cada producto
+    items = suggestions.attach_suggestions([dict(p) for p in products[:1]], cadence)
+    assert items[0]["suggested_quantity"] == 15.0, items[0]
+    assert items[0]["on_order_quantity"] == 2, items[0]
+    assert items[0]["total_stock"] == 3, items[0]
+
+    print('Prueba completada correctamente')
+
+
+if __name__ == '__main__':
+    try:
+        run()
+    except AssertionError as e:
+        print('FALLÓ:', e)
+        raise
+    except Exception as e:
+        print('Error:', e)
+        raise